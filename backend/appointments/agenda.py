@@ -0,0 +1,93 @@
+"""
+Day and week agenda of one doctor for the front desk.
+
+`get_agenda()` lays the doctor's schedule for each day, compiled from the
+already-loaded doctor row (see appointments/availability.py), over that range's
+appointments, which come from a single query on (doctor, date) - a range
+scan on `appt_doctor_date_time_idx` already in (date, time) order. The
+result lists every slot of the working hours with its bookings, so the
+dashboard no longer rebuilds the day from the full appointment list.
+Appointments outside the hours (special bookings, or hours changed since)
+are listed separately rather than dropped. Cancelled appointments are shown
+but do not take a seat.
+
+Not cached: it carries patient details and must reflect every change.
+"""
+from datetime import timedelta
+
+from . import availability
+from .availability import RELEASED_STATUSES, SLOT_MINUTES, WEEKDAYS
+
+AGENDA_FIELDS = ['id', 'date', 'time', 'patient_name', 'phone', 'reason', 'status', 'seat']
+
+
+def week_start(day):
+    """The Monday of `day`'s week."""
+    return day - timedelta(days=day.weekday())
+
+
+def _entry(row):
+    return {
+        'id': row['id'],
+        'time': row['time'].strftime('%H:%M'),
+        'patient_name': row['patient_name'],
+        'phone': row['phone'],
+        'reason': row['reason'],
+        'status': row['status'],
+        'seat': row['seat'],
+    }
+
+
+def _day(doctor, day, rows):
+    schedule = availability.compile_schedule(doctor, day.weekday())
+    working = availability.works_on(schedule, day) and bool(schedule.slot_count)
+    slots = []
+    if working:
+        slots = [
+            {
+                'time': availability.slot_time(schedule, i).strftime('%H:%M'),
+                'capacity': doctor.slot_capacity,
+                'booked': 0,
+                'appointments': [],
+            }
+            for i in range(schedule.slot_count)
+        ]
+    outside_hours = []
+    for row in rows:
+        index = availability.slot_index(schedule, row['time']) if working else None
+        if index is None:
+            outside_hours.append(_entry(row))
+            continue
+        slot = slots[index]
+        slot['appointments'].append(_entry(row))
+        if row['status'] not in RELEASED_STATUSES:
+            slot['booked'] += 1
+    return {
+        'date': day.isoformat(),
+        'weekday': WEEKDAYS[day.weekday()],
+        'working': working,
+        'slots': slots,
+        'outside_hours': outside_hours,
+    }
+
+
+def get_agenda(doctor, start, days=1):
+    """Slot-ordered agenda for `days` days from `start`, as a JSON-ready dict."""
+    from .models import Appointment
+
+    end = start + timedelta(days=days)
+    by_day = {start + timedelta(days=offset): [] for offset in range(days)}
+    rows = (
+        Appointment.objects
+        .filter(doctor=doctor, date__gte=start, date__lt=end)
+        .order_by('date', 'time', 'id')
+        .values(*AGENDA_FIELDS)
+    )
+    for row in rows:
+        by_day[row['date']].append(row)
+    return {
+        'doctor': doctor.slug,
+        'doctor_name': doctor.name,
+        'slot_minutes': SLOT_MINUTES,
+        'days': [_day(doctor, day, day_rows) for day, day_rows in by_day.items()],
+    }
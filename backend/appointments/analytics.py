@@ -0,0 +1,201 @@
+"""
+Daily appointment rollups behind /api/analytics/.
+
+`AppointmentDailyRollup` holds one count per (date, department, doctor,
+status). The signals in appointments.signals move an appointment's +1
+between rows as it is booked, changes status (or is rescheduled) and is
+deleted; like the /api/stats/ counters, the writes run after the booking's
+transaction commits. Archived appointments keep being counted. Paths that
+skip the signals (bulk import, bulk status changes) record their deltas
+themselves; `manage.py rebuild_analytics` recomputes any date range from the
+appointment and archive tables if the rollups ever drift.
+
+`report()` reads only the rollup table: three grouped queries over the
+requested date range, whatever the size of the Appointment table.
+"""
+from collections import Counter
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+MAX_ANALYTICS_DAYS = 731
+# Still open once their day has passed: the patient never showed up.
+NO_SHOW_STATUSES = ('Pending', 'Confirmed')
+CANCELLED = 'Cancelled'
+
+ROLLUP_FIELDS = ('date', 'department_id', 'doctor_id', 'status')
+
+
+def snapshot(instance):
+    """The rollup fields as loaded on `instance`, None for deferred ones."""
+    # Read from __dict__ so deferred fields (.only()/.defer()) don't trigger queries.
+    return tuple(instance.__dict__.get(field) for field in ROLLUP_FIELDS)
+
+
+def rollup_key(instance):
+    """(date, department_id, doctor_id, status) of an appointment."""
+    return tuple(getattr(instance, field) for field in ROLLUP_FIELDS)
+
+
+def previous_key(loaded, key):
+    """
+    The key a just-saved appointment was counted under, from its `snapshot()`
+    at load time: a field that was deferred is taken as unchanged.
+    """
+    return tuple(current if old is None else old for old, current in zip(loaded, key))
+
+
+def _apply(key, delta):
+    from .models import AppointmentDailyRollup
+
+    day, department_id, doctor_id, status = key
+    filters = {'date': day, 'department_id': department_id, 'doctor_id': doctor_id, 'status': status}
+    if AppointmentDailyRollup.objects.filter(**filters).update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            AppointmentDailyRollup.objects.create(count=delta, **filters)
+    except IntegrityError:
+        # Another worker created the row in the meantime.
+        AppointmentDailyRollup.objects.filter(**filters).update(count=F('count') + delta)
+
+
+def record(key, delta=1):
+    if None in key or not delta:
+        return
+    # robust: a failed rollup update is logged, never surfaced to the booking request.
+    transaction.on_commit(lambda: _apply(key, delta), robust=True)
+
+
+def key_of(values):
+    """The rollup key of a dict with the ROLLUP_FIELDS (e.g. a .values() row)."""
+    return tuple(values[field] for field in ROLLUP_FIELDS)
+
+
+def _key_filter(key):
+    return Q(**dict(zip(ROLLUP_FIELDS, key)))
+
+
+def _apply_many(deltas):
+    from .models import AppointmentDailyRollup
+
+    # Two queries for any number of keys: make sure every row exists, then
+    # shift them all in one UPDATE ... SET count = count + CASE ... END.
+    AppointmentDailyRollup.objects.bulk_create(
+        [AppointmentDailyRollup(count=0, **dict(zip(ROLLUP_FIELDS, key))) for key in deltas],
+        ignore_conflicts=True,
+    )
+    condition = Q()
+    for key in deltas:
+        condition |= _key_filter(key)
+    shift = Case(
+        *(When(_key_filter(key), then=Value(delta)) for key, delta in deltas.items()),
+        default=Value(0),
+    )
+    AppointmentDailyRollup.objects.filter(condition).update(count=F('count') + shift)
+
+
+def record_many(deltas):
+    """Applies a Counter of {rollup key: delta} from a bulk operation in a fixed number of queries."""
+    deltas = {key: delta for key, delta in deltas.items() if None not in key and delta}
+    if deltas:
+        transaction.on_commit(lambda: _apply_many(deltas), robust=True)
+
+
+def rebuild(start, end):
+    """
+    Recomputes the rollups for start <= date <= end from the appointment and
+    archive tables, replacing what is stored. Returns the number of rows written.
+    """
+    from .models import Appointment, AppointmentArchive, AppointmentDailyRollup
+
+    totals = Counter()
+    with transaction.atomic():
+        for model in (Appointment, AppointmentArchive):
+            rows = (
+                model.objects.filter(date__gte=start, date__lte=end)
+                .values(*ROLLUP_FIELDS).annotate(total=Count('id')).order_by()
+            )
+            for row in rows:
+                totals[key_of(row)] += row['total']
+        AppointmentDailyRollup.objects.filter(date__gte=start, date__lte=end).delete()
+        AppointmentDailyRollup.objects.bulk_create(
+            [
+                AppointmentDailyRollup(date=day, department_id=department_id, doctor_id=doctor_id, status=status, count=count)
+                for (day, department_id, doctor_id, status), count in totals.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+class _Summary:
+    def __init__(self):
+        self.by_status = Counter()
+        self.past = Counter()
+
+    def add(self, status, total, past):
+        self.by_status[status] += total or 0
+        self.past[status] += past or 0
+
+    def as_dict(self):
+        from .models import Appointment
+
+        appointments = sum(self.by_status.values())
+        no_shows = sum(self.past[status] for status in NO_SHOW_STATUSES)
+        attended_or_missed = sum(self.past.values()) - self.past[CANCELLED]
+        return {
+            'appointments': appointments,
+            'by_status': {status: self.by_status[status] for status, _label in Appointment.STATUS_CHOICES},
+            'no_shows': no_shows,
+            'cancellation_rate': round(self.by_status[CANCELLED] / appointments, 4) if appointments else None,
+            'no_show_rate': round(no_shows / attended_or_missed, 4) if attended_or_missed else None,
+        }
+
+
+def _grouped(queryset, fields, today):
+    return (
+        queryset.values(*fields, 'status')
+        .annotate(total=Sum('count'), past=Sum('count', filter=Q(date__lt=today)))
+        .order_by()
+    )
+
+
+def _breakdown(queryset, id_field, name_field, today):
+    summaries = {}
+    names = {}
+    for row in _grouped(queryset, (id_field, name_field), today):
+        key = row[id_field]
+        names[key] = row[name_field]
+        summaries.setdefault(key, _Summary()).add(row['status'], row['total'], row['past'])
+    result = [{'id': key, 'name': names[key], **summary.as_dict()} for key, summary in summaries.items()]
+    result.sort(key=lambda item: (-item['appointments'], item['name']))
+    return result
+
+
+def report(start, end, department_id=None, doctor_id=None, today=None):
+    """Totals, a per-day series and per-department/per-doctor breakdowns for start..end."""
+    from .models import AppointmentDailyRollup
+
+    today = today or date.today()
+    queryset = AppointmentDailyRollup.objects.filter(date__gte=start, date__lte=end)
+    if department_id:
+        queryset = queryset.filter(department_id=department_id)
+    if doctor_id:
+        queryset = queryset.filter(doctor_id=doctor_id)
+
+    totals = _Summary()
+    days = {start + timedelta(days=offset): _Summary() for offset in range((end - start).days + 1)}
+    for row in _grouped(queryset, ('date',), today):
+        days[row['date']].add(row['status'], row['total'], row['past'])
+        totals.add(row['status'], row['total'], row['past'])
+
+    return {
+        'date_from': start.isoformat(),
+        'date_to': end.isoformat(),
+        'totals': totals.as_dict(),
+        'series': [{'date': day.isoformat(), **summary.as_dict()} for day, summary in days.items()],
+        'by_department': _breakdown(queryset, 'department_id', 'department__name', today),
+        'by_doctor': _breakdown(queryset, 'doctor_id', 'doctor__name', today),
+    }
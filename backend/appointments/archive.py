@@ -0,0 +1,76 @@
+"""
+Archival of old Completed/Cancelled appointments.
+
+`archive_batches()` walks the rows to archive one status at a time in
+(date, time, id) order - a range scan on `appt_status_date_time_idx` - and
+moves each batch in its own short transaction: lock the batch, copy it into
+AppointmentArchive, delete it from Appointment. Between batches it sleeps so
+the booking path and the dashboard never wait behind the job.
+
+Archiving is not deleting: the /api/stats/ counters keep counting archived
+appointments (stats.compute_actual adds the archive back in), so the rows
+are removed without firing the delete signals.
+"""
+import time as _time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Appointment, AppointmentArchive
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'APPOINTMENT_ARCHIVE_AFTER_DAYS', 365)
+ARCHIVE_BATCH_SIZE = getattr(settings, 'APPOINTMENT_ARCHIVE_BATCH_SIZE', 500)
+ARCHIVABLE_STATUSES = ('Completed', 'Cancelled')
+
+ARCHIVED_FIELDS = ['id', 'patient_name', 'phone', 'department_id', 'doctor_id', 'date', 'time', 'reason', 'status']
+
+
+def default_cutoff():
+    return date.today() - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+def _after(position):
+    """Keyset condition: rows strictly after (date, time, id) = `position`."""
+    day, at, pk = position
+    return Q(date__gt=day) | Q(date=day, time__gt=at) | Q(date=day, time=at, id__gt=pk)
+
+
+def _move(rows):
+    """Copies `rows` into the archive and deletes them; runs inside the batch's transaction."""
+    archived = [AppointmentArchive(**row) for row in rows]
+    # ignore_conflicts: a batch copied by an interrupted run is simply copied again.
+    AppointmentArchive.objects.bulk_create(archived, ignore_conflicts=True)
+    # Plain SQL, so no post_delete signals fire (see module docstring).
+    ids = [row['id'] for row in rows]
+    table = connection.ops.quote_name(Appointment._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+
+
+def archive_batches(cutoff=None, statuses=ARCHIVABLE_STATUSES, batch_size=ARCHIVE_BATCH_SIZE, pause=0.0, dry_run=False):
+    """
+    Moves appointments dated before `cutoff` with one of `statuses` into the
+    archive, yielding (status, rows_in_batch) after every batch.
+    """
+    cutoff = cutoff or default_cutoff()
+    for status in statuses:
+        position = None
+        while True:
+            queryset = Appointment.objects.filter(status=status, date__lt=cutoff).order_by('date', 'time', 'id')
+            if position is not None:
+                queryset = queryset.filter(_after(position))
+            with transaction.atomic():
+                rows = list(queryset.select_for_update().values(*ARCHIVED_FIELDS)[:batch_size])
+                if rows and not dry_run:
+                    _move(rows)
+            if not rows:
+                break
+            last = rows[-1]
+            position = (last['date'], last['time'], last['id'])
+            yield status, len(rows)
+            if len(rows) < batch_size:
+                break
+            if pause:
+                _time.sleep(pause)
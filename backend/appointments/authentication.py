@@ -0,0 +1,103 @@
+"""
+Token authentication without a database round trip per request.
+
+`CachedTokenAuthentication` is DRF's TokenAuthentication with the
+Token + User lookup kept for AUTH_TOKEN_CACHE_TTL seconds in the 'shared'
+cache, which every worker process on the host reads. That cache is a
+directory on disk, so the entry holds only what the check needs (the user's
+id, username, flags and the token's creation time), never the key or the
+password hash; the Token and User are rebuilt from it with every other
+field deferred, so reading one loads it from the database. The signals in
+appointments.signals drop the entry when the token is deleted (logout,
+rotation) or its user is saved (deactivation, permission changes), so a
+revoked token stops working in all workers on their next request.
+
+If AUTH_TOKEN_EXPIRY (seconds) is set, tokens older than that are rejected
+and deleted; the next login issues a fresh one.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+AUTH_TOKEN_CACHE_TTL = getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 60)
+AUTH_TOKEN_EXPIRY = getattr(settings, 'AUTH_TOKEN_EXPIRY', None)
+
+token_cache = caches['shared']
+
+# The user fields kept in the cache entry.
+CACHED_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _cache_key(key):
+    # Hashed so raw tokens never end up as cache keys.
+    return f'auth-token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def invalidate_token(key):
+    token_cache.delete(_cache_key(key))
+
+
+def invalidate_user_tokens(user):
+    for key in Token.objects.filter(user=user).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+def is_expired(token):
+    if AUTH_TOKEN_EXPIRY is None:
+        return False
+    return (timezone.now() - token.created).total_seconds() > AUTH_TOKEN_EXPIRY
+
+
+def rotate_token(user):
+    """Replaces the user's token with a new one (the old key stops working at once)."""
+    Token.objects.filter(user=user).delete()
+    return Token.objects.create(user=user)
+
+
+def _entry(token):
+    """The cache entry for `token`: no key and no credentials."""
+    user = token.user
+    return {
+        'user': {field: getattr(user, field) for field in CACHED_USER_FIELDS},
+        'created': token.created,
+    }
+
+
+def _from_entry(key, entry):
+    """(user, token) rebuilt from a cache entry; the fields it lacks load on first access."""
+    fields = entry['user']
+    # from_db() wants the values in the model's field order.
+    names = [field.attname for field in get_user_model()._meta.concrete_fields if field.attname in fields]
+    user = get_user_model().from_db(None, names, [fields[name] for name in names])
+    token = Token.from_db(None, ['key', 'user_id', 'created'], [key, user.pk, entry['created']])
+    token.user = user
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        entry = token_cache.get(cache_key)
+        if entry is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            entry = _entry(token)
+            if entry['user']['is_active']:
+                token_cache.set(cache_key, entry, AUTH_TOKEN_CACHE_TTL)
+
+        if not entry['user']['is_active']:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        user, token = _from_entry(key, entry)
+        if is_expired(token):
+            token.delete()
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        return (user, token)
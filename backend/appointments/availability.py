@@ -0,0 +1,246 @@
+"""
+Slot-availability engine.
+
+A doctor's schedule is stored in structured form: `weekday_mask` (Monday is
+bit 0, derived from the free-text `available_days` on save), default hours
+(`start_time`, `end_time`) and optional per-weekday overrides in
+`weekday_hours`. For each weekday it is compiled into a compact
+`Schedule`: the weekday bitmask plus a per-day slot bitmap where bit *i* is
+the slot starting `i * SLOT_MINUTES` after that day's start time. Free slots
+for a date window are that bitmap minus the slots already full
+(`doctor.slot_capacity` active bookings), which are fetched in a single
+query on (doctor, date, time) - see `appt_doctor_date_time_idx`.
+
+Compiling is a little arithmetic on fields already loaded, so schedules are
+not cached. The computed windows are, per doctor, and dropped by the signals
+in `appointments.signals` whenever the doctor or one of their appointments
+is saved or deleted.
+"""
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+import time as _time
+
+from django.conf import settings
+from django.core.cache import cache
+
+SLOT_MINUTES = getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 15)
+AVAILABILITY_CACHE_TTL = getattr(settings, 'AVAILABILITY_CACHE_TTL', 300)
+MAX_AVAILABILITY_DAYS = 60
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+_WEEKDAY_LOOKUP = {}
+for _index, _name in enumerate(WEEKDAYS):
+    _WEEKDAY_LOOKUP[_name.lower()] = _index
+    _WEEKDAY_LOOKUP[_name[:3].lower()] = _index
+
+MONDAY_TO_SATURDAY = 0b0111111
+
+# Appointments in these states no longer hold their slot.
+RELEASED_STATUSES = ('Cancelled',)
+
+Schedule = namedtuple('Schedule', ['weekday_mask', 'start_time', 'slot_count', 'day_mask'])
+
+
+def parse_weekday(value):
+    """'Thursday' / 'thu' -> 3, or None if it names no weekday."""
+    return _WEEKDAY_LOOKUP.get((value or '').strip().lower())
+
+
+def parse_weekday_mask(available_days):
+    """'Monday, Wednesday,fri' -> bitmask with Monday as bit 0."""
+    mask = 0
+    for token in (available_days or '').split(','):
+        index = parse_weekday(token)
+        if index is not None:
+            mask |= 1 << index
+    return mask
+
+
+def masks_including(weekday):
+    """Every weekday_mask value that has `weekday` set (64 of the 127)."""
+    bit = 1 << weekday
+    return [mask for mask in range(1, 1 << len(WEEKDAYS)) if mask & bit]
+
+
+def weekday_label(mask, available_days=''):
+    """Display text for a weekday mask, e.g. 'Monday to Saturday' or 'Monday, Thursday'."""
+    if mask == MONDAY_TO_SATURDAY:
+        return "Monday to Saturday"
+    if mask:
+        return ", ".join(name for index, name in enumerate(WEEKDAYS) if mask >> index & 1)
+    # Text naming no weekday at all ("By appointment") is shown as entered.
+    return ", ".join(day.strip().capitalize() for day in (available_days or '').split(',') if day.strip())
+
+
+def _parse_time(value):
+    if isinstance(value, time):
+        return value
+    return datetime.strptime(str(value).strip(), '%H:%M').time()
+
+
+def parse_weekday_hours(weekday_hours):
+    """
+    {"Saturday": ["09:00", "13:00"]} -> {5: (time(9, 0), time(13, 0))}.
+    Raises ValueError on an unknown day, a malformed time or end <= start.
+    """
+    if not weekday_hours:
+        return {}
+    if not isinstance(weekday_hours, dict):
+        raise ValueError("Expected an object mapping weekday names to [start, end].")
+    hours = {}
+    for day, span in weekday_hours.items():
+        index = parse_weekday(day)
+        if index is None:
+            raise ValueError(f"'{day}' is not a weekday.")
+        if not isinstance(span, (list, tuple)) or len(span) != 2:
+            raise ValueError(f"Hours for {WEEKDAYS[index]} must be [start, end].")
+        try:
+            start, end = _parse_time(span[0]), _parse_time(span[1])
+        except ValueError:
+            raise ValueError(f"Hours for {WEEKDAYS[index]} must be HH:MM times.")
+        if end <= start:
+            raise ValueError(f"Hours for {WEEKDAYS[index]} must end after they start.")
+        hours[index] = (start, end)
+    return hours
+
+
+def normalize_weekday_hours(weekday_hours):
+    """Canonical stored form: full weekday names, 'HH:MM' strings, Monday first."""
+    return {
+        WEEKDAYS[index]: [start.strftime('%H:%M'), end.strftime('%H:%M')]
+        for index, (start, end) in sorted(parse_weekday_hours(weekday_hours).items())
+    }
+
+
+def hours_for(doctor, weekday):
+    """(start, end) consultation hours on `weekday`; (None, None) means by appointment only."""
+    try:
+        overrides = parse_weekday_hours(doctor.weekday_hours)
+    except ValueError:
+        overrides = {}
+    return overrides.get(weekday, (doctor.start_time, doctor.end_time))
+
+
+def compile_schedule(doctor, weekday=None):
+    """
+    Turns the doctor's schedule fields into a `Schedule` for `weekday` (or for
+    the default hours when None). No DB access.
+    """
+    start_time, end_time = hours_for(doctor, weekday) if weekday is not None else (doctor.start_time, doctor.end_time)
+    slot_count = 0
+    if start_time and end_time:
+        start = start_time.hour * 60 + start_time.minute
+        end = end_time.hour * 60 + end_time.minute
+        if end > start:
+            slot_count = -(-(end - start) // SLOT_MINUTES)  # ceil: last slot may start before end
+    return Schedule(doctor.weekday_mask, start_time, slot_count, (1 << slot_count) - 1)
+
+
+def works_on(schedule, day):
+    return bool(schedule.weekday_mask & (1 << day.weekday()))
+
+
+def slot_index(schedule, value):
+    """Index of the slot containing `value` (a time), or None if outside hours."""
+    if not schedule.slot_count:
+        return None
+    offset = (value.hour * 60 + value.minute) - (schedule.start_time.hour * 60 + schedule.start_time.minute)
+    if offset < 0:
+        return None
+    index = offset // SLOT_MINUTES
+    return index if index < schedule.slot_count else None
+
+
+def slot_time(schedule, index):
+    start = datetime.combine(date.min, schedule.start_time)
+    return (start + timedelta(minutes=index * SLOT_MINUTES)).time()
+
+
+def _version_key(doctor_id):
+    return f'availability:version:{doctor_id}'
+
+
+def _version(doctor_id):
+    version = cache.get(_version_key(doctor_id))
+    if version is None:
+        version = _time.time_ns()
+        cache.set(_version_key(doctor_id), version, None)
+    return version
+
+
+def invalidate_doctor(doctor_id):
+    """Drops every cached availability window for this doctor."""
+    cache.set(_version_key(doctor_id), _time.time_ns(), None)
+
+
+def booked_masks(doctor, start, end):
+    """
+    {date: bitmap of full slots} for start <= date < end, in one query. A slot
+    is full once it holds `doctor.slot_capacity` active appointments.
+    """
+    from .models import Appointment
+
+    schedules = [compile_schedule(doctor, weekday) for weekday in range(len(WEEKDAYS))]
+    counts = {}
+    rows = (
+        Appointment.objects
+        .filter(doctor=doctor, date__gte=start, date__lt=end)
+        .exclude(status__in=RELEASED_STATUSES)
+        .values_list('date', 'time')
+    )
+    for day, booked_time in rows:
+        index = slot_index(schedules[day.weekday()], booked_time)
+        if index is not None:
+            counts[day, index] = counts.get((day, index), 0) + 1
+
+    masks = {}
+    for (day, index), count in counts.items():
+        if count >= doctor.slot_capacity:
+            masks[day] = masks.get(day, 0) | (1 << index)
+    return masks
+
+
+def get_availability(doctor, days=14, start=None):
+    """
+    Free slots for the next `days` days (starting tomorrow, matching the
+    one-day-advance booking rule), as a JSON-ready dict.
+    """
+    start = start or date.today() + timedelta(days=1)
+    days = max(1, min(days, MAX_AVAILABILITY_DAYS))
+    key = f'availability:window:{doctor.pk}:{_version(doctor.pk)}:{start.isoformat()}:{days}'
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    schedules = [compile_schedule(doctor, weekday) for weekday in range(len(WEEKDAYS))]
+    # Working weekdays that have consultation hours; the rest are by appointment only.
+    hours_mask = sum(1 << weekday for weekday, schedule in enumerate(schedules) if schedule.slot_count)
+    bookable = doctor.active and doctor.weekday_mask & hours_mask
+    end = start + timedelta(days=days)
+    taken = booked_masks(doctor, start, end) if bookable else {}
+
+    result_days = []
+    if bookable:
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            schedule = schedules[day.weekday()]
+            if not works_on(schedule, day) or not schedule.slot_count:
+                continue
+            free = schedule.day_mask & ~taken.get(day, 0)
+            result_days.append({
+                'date': day.isoformat(),
+                'weekday': WEEKDAYS[day.weekday()],
+                'slots': [
+                    slot_time(schedule, i).strftime('%H:%M')
+                    for i in range(schedule.slot_count) if free >> i & 1
+                ],
+            })
+
+    payload = {
+        'doctor': doctor.slug,
+        'slot_minutes': SLOT_MINUTES,
+        'by_appointment_only': bool(doctor.active and not hours_mask),
+        'days': result_days,
+    }
+    cache.set(key, payload, AVAILABILITY_CACHE_TTL)
+    return payload
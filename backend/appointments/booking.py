@@ -0,0 +1,96 @@
+"""
+Concurrency-safe booking.
+
+Every active appointment holds a numbered seat (1..doctor.slot_capacity) in
+its slot, and the `appt_unique_slot_seat` constraint on
+(doctor, date, time, seat) makes the database reject a second booking of the
+same seat no matter how requests interleave. On MySQL the doctor row is also
+locked with SELECT ... FOR UPDATE while a seat is picked, so concurrent
+bookings for one doctor queue up instead of racing for the constraint.
+Cancelled appointments give their seat back (seat = NULL).
+"""
+import time as _time
+
+from django.db import IntegrityError, OperationalError, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import availability
+from .models import Appointment, Doctor
+
+BOOKING_ATTEMPTS = 5
+
+
+class SlotUnavailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This time slot has just been booked by another patient. Please choose a different time."
+    default_code = 'slot_unavailable'
+
+
+def is_active(status_value):
+    return status_value not in availability.RELEASED_STATUSES
+
+
+def snap_to_slot(doctor, day, value):
+    """Rounds a requested time down to the start of its slot (if the doctor has fixed hours that day)."""
+    schedule = availability.compile_schedule(doctor, day.weekday())
+    index = availability.slot_index(schedule, value)
+    if index is None:
+        return value
+    return availability.slot_time(schedule, index)
+
+
+def _claim_seat(appointment):
+    """Picks the lowest free seat for the appointment's slot, or raises SlotUnavailable."""
+    doctor = Doctor.objects.select_for_update().only('id', 'slot_capacity').get(pk=appointment.doctor_id)
+    taken = list(
+        Appointment.objects
+        .filter(doctor_id=doctor.pk, date=appointment.date, time=appointment.time)
+        .exclude(status__in=availability.RELEASED_STATUSES)
+        .exclude(pk=appointment.pk)
+        .values_list('seat', flat=True)
+    )
+    if len(taken) >= doctor.slot_capacity:
+        raise SlotUnavailable()
+    used = set(taken)
+    return next(seat for seat in range(1, doctor.slot_capacity + 1) if seat not in used)
+
+
+def needs_new_seat(instance, data):
+    """True when an update moves the appointment to another slot or re-activates it."""
+    if not is_active(data.get('status', instance.status)):
+        return False
+    if not is_active(instance.status) or instance.seat is None:
+        return True
+    return any(
+        name in data and data[name] != getattr(instance, name)
+        for name in ('doctor', 'date', 'time')
+    )
+
+
+def save_booking(appointment, on_saved=None):
+    """
+    Saves `appointment`, claiming a seat in its slot first when it is active.
+    Retries briefly on constraint/lock conflicts and gives up with a 409.
+    `on_saved(appointment)` runs in the same transaction as the save.
+    """
+    appointment.time = snap_to_slot(appointment.doctor, appointment.date, appointment.time)
+    if not is_active(appointment.status):
+        with transaction.atomic():  # together with its outbox event
+            appointment.save()  # Appointment.save() releases the seat
+            if on_saved:
+                on_saved(appointment)
+        return appointment
+
+    for attempt in range(BOOKING_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                appointment.seat = _claim_seat(appointment)
+                appointment.save()
+                if on_saved:
+                    on_saved(appointment)
+            return appointment
+        except (IntegrityError, OperationalError):
+            # Another request took the seat (or held the lock past the wait timeout) first - look again.
+            _time.sleep(0.01 * (attempt + 1))
+    raise SlotUnavailable()
@@ -0,0 +1,335 @@
+"""
+Streaming CSV/JSONL export and batched bulk import for appointments and doctors.
+
+Exports page through the table with keyset batches of EXPORT_CHUNK_SIZE
+rows (`WHERE (date, time, id) > last row ORDER BY ... LIMIT n`) and yield
+one encoded line at a time, so memory stays flat however many rows are
+exported. Plain `.iterator()` would not do that on MySQL, whose driver
+fetches the whole result client-side. With include_archived the live and
+archived tables are paged separately and merged in (date, time, id) order.
+
+Imports parse the file lazily, validate rows a batch at a time (foreign keys
+are checked against one query per batch, not per row) and write each valid
+batch with a single `bulk_create` inside its own transaction. Imported
+appointments take seats in their slot like any booking; an active row whose
+slot is already at the doctor's slot_capacity is rejected.
+
+Used by the /api/export/... and /api/import/... views and by the
+`export_data` / `import_data` management commands.
+"""
+import codecs
+import csv
+import heapq
+import io
+import json
+from collections import Counter, defaultdict
+from datetime import date, datetime, time
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from . import analytics, availability, booking, http_cache, search, stats
+from .models import Appointment, AppointmentArchive, Department, Doctor
+from .serializers import AppointmentImportSerializer, DoctorImportSerializer
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+IMPORT_BATCH_SIZE = getattr(settings, 'IMPORT_BATCH_SIZE', 500)
+MAX_REPORTED_ERRORS = 100
+FORMATS = ('csv', 'jsonl')
+
+APPOINTMENT_FIELDS = ['id', 'patient_name', 'phone', 'department', 'doctor', 'date', 'time', 'reason', 'status']
+DOCTOR_FIELDS = [
+    'id', 'slug', 'name', 'department', 'degrees', 'experience_years', 'mmc_registration', 'photo',
+    'description', 'available_days', 'start_time', 'end_time', 'weekday_hours', 'active', 'display_order',
+    'slot_capacity',
+]
+
+
+# --- Export ---
+
+APPOINTMENT_ORDER = ('date', 'time', 'id')
+
+
+def _after(order, position):
+    """Keyset condition: rows strictly after `position` in `order`."""
+    condition = Q(**{f'{order[-1]}__gt': position[-1]})
+    for field, value in zip(order[-2::-1], position[-2::-1]):
+        condition = Q(**{f'{field}__gt': value}) | (Q(**{field: value}) & condition)
+    return condition
+
+
+def keyset_rows(queryset, fields, order, chunk_size=None):
+    """
+    Yields `fields` tuples for `queryset` in `order`, one keyset batch of
+    `chunk_size` rows at a time. Every name in `order` must be in `fields`.
+    """
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    key = [fields.index(field) for field in order]
+    queryset = queryset.order_by(*order)
+    position = None
+    while True:
+        page = queryset if position is None else queryset.filter(_after(order, position))
+        rows = list(page.values_list(*fields)[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        position = [rows[-1][index] for index in key]
+
+
+def appointment_export_rows(date_from=None, date_to=None, include_archived=False):
+    filters = {}
+    if date_from:
+        filters['date__gte'] = date_from
+    if date_to:
+        filters['date__lte'] = date_to
+    fields = APPOINTMENT_FIELDS
+    live = keyset_rows(Appointment.objects.filter(**filters), fields, APPOINTMENT_ORDER)
+    if not include_archived:
+        return live
+    # Archived rows keep their original id, so the two streams never share a key.
+    archived = keyset_rows(AppointmentArchive.objects.filter(**filters), fields, APPOINTMENT_ORDER)
+    order = [fields.index(field) for field in APPOINTMENT_ORDER]
+    return heapq.merge(live, archived, key=lambda row: [row[index] for index in order])
+
+
+def doctor_export_rows():
+    return keyset_rows(Doctor.objects.all(), DOCTOR_FIELDS, ('id',))
+
+
+# A CSV cell starting with one of these is run as a formula by Excel and Sheets.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _plain(value, fmt='jsonl'):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if fmt == 'csv':
+        if isinstance(value, dict):
+            return json.dumps(value)
+        if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+            # Patient-supplied text: the quote makes the spreadsheet show it as text.
+            return "'" + value
+    return value
+
+
+class _Echo:
+    """csv.writer target that hands each formatted line straight back."""
+    def write(self, value):
+        return value
+
+
+def stream_rows(rows, fields, fmt):
+    """Yields `rows` (tuples of `fields`) as CSV (with a header row) or JSON Lines."""
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([_plain(value, fmt) for value in row])
+    else:
+        for row in rows:
+            yield json.dumps({field: _plain(value) for field, value in zip(fields, row)}) + '\n'
+
+
+# --- Import ---
+
+def read_records(handle, fmt):
+    """
+    Lazily yields (line_number, dict) from a binary file object. Blank
+    lines are skipped; undecodable JSON yields (line_number, None).
+    """
+    text = codecs.getreader('utf-8-sig')(handle) if not isinstance(handle, io.TextIOBase) else handle
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, {key: value for key, value in record.items() if key}
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+
+
+class BulkImporter:
+    """
+    Validates rows with `serializer_class` in batches and bulk-creates the
+    valid ones. Subclasses preload whatever a batch needs in `prepare()`.
+    """
+    model = None
+    serializer_class = None
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.created = 0
+        self.errors = []
+        self.error_count = 0
+
+    def prepare(self, records):
+        return {}
+
+    def build(self, validated_data, context):
+        return self.model(**validated_data)
+
+    def place(self, rows, context):
+        """
+        Last check of the batch's [(line_number, obj)], run inside the
+        transaction that inserts them; returns the rows to insert and
+        reports the others with `self._error()`.
+        """
+        return rows
+
+    def finish(self, objects):
+        pass
+
+    def run(self, records):
+        records = iter(records)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            self._import_batch(batch)
+        return self.report()
+
+    def report(self):
+        self.errors.sort(key=lambda error: error['line'])
+        return {'created': self.created, 'error_count': self.error_count, 'errors': self.errors}
+
+    def _error(self, line_number, detail):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'errors': detail})
+
+    def _import_batch(self, batch):
+        valid_records = []
+        for line_number, record in batch:
+            if record is None:
+                self._error(line_number, "Not valid JSON.")
+            elif not isinstance(record, dict):
+                self._error(line_number, "Each line must be a JSON object.")
+            else:
+                valid_records.append((line_number, record))
+
+        context = self.prepare([record for _, record in valid_records])
+        rows = []
+        for line_number, record in valid_records:
+            serializer = self.serializer_class(data=record, context=context)
+            if serializer.is_valid():
+                rows.append((line_number, self.build(serializer.validated_data, context)))
+            else:
+                self._error(line_number, serializer.errors)
+
+        if not rows:
+            return
+        with transaction.atomic():
+            objects = [obj for _, obj in self.place(rows, context)]
+            if objects:
+                self.model.objects.bulk_create(objects, batch_size=self.batch_size)
+        if objects:
+            self.created += len(objects)
+            self.finish(objects)
+
+
+class AppointmentImporter(BulkImporter):
+    model = Appointment
+    serializer_class = AppointmentImportSerializer
+
+    def prepare(self, records):
+        doctor_ids = {_as_int(record.get('doctor')) for record in records} - {None}
+        department_ids = {_as_int(record.get('department')) for record in records} - {None}
+        return {
+            'doctor_departments': dict(Doctor.objects.filter(pk__in=doctor_ids).values_list('pk', 'department_id')),
+            'department_ids': set(Department.objects.filter(pk__in=department_ids).values_list('pk', flat=True)),
+        }
+
+    def place(self, rows, context):
+        """
+        Gives each active row the lowest free seat in its slot, as
+        booking.save_booking would, and rejects the rows whose slot is full.
+        The doctors are locked first, so live bookings wait for the batch.
+        """
+        active = [(line_number, obj) for line_number, obj in rows if booking.is_active(obj.status)]
+        if not active:
+            return rows
+        doctor_ids = {obj.doctor_id for _, obj in active}
+        capacities = dict(
+            Doctor.objects.select_for_update().filter(pk__in=doctor_ids).order_by('pk').values_list('pk', 'slot_capacity')
+        )
+        taken = defaultdict(set)
+        booked = (
+            Appointment.objects
+            .filter(doctor_id__in=doctor_ids, date__in={obj.date for _, obj in active})
+            .exclude(status__in=availability.RELEASED_STATUSES)
+            .values_list('doctor_id', 'date', 'time', 'seat')
+        )
+        for doctor_id, day, at, seat in booked:
+            taken[doctor_id, day, at].add(seat)
+
+        placed = []
+        for line_number, obj in rows:
+            if booking.is_active(obj.status):
+                seats = taken[obj.doctor_id, obj.date, obj.time]
+                free = [seat for seat in range(1, capacities[obj.doctor_id] + 1) if seat not in seats]
+                if not free:
+                    self._error(line_number, {'time': ["This time slot is already fully booked."]})
+                    continue
+                obj.seat = free[0]
+                seats.add(obj.seat)
+            placed.append((line_number, obj))
+        return placed
+
+    def finish(self, objects):
+        # bulk_create skips save signals: do what they would have done.
+        for doctor_id in {obj.doctor_id for obj in objects}:
+            availability.invalidate_doctor(doctor_id)
+        stats.bump(stats.APPOINTMENTS, len(objects))
+        for status in {obj.status for obj in objects}:
+            stats.bump(stats.status_counter(status), sum(1 for obj in objects if obj.status == status))
+        analytics.record_many(Counter(analytics.rollup_key(obj) for obj in objects))
+
+
+class DoctorImporter(BulkImporter):
+    model = Doctor
+    serializer_class = DoctorImportSerializer
+
+    def prepare(self, records):
+        department_ids = {_as_int(record.get('department')) for record in records} - {None}
+        departments = dict(Department.objects.filter(pk__in=department_ids).values_list('pk', 'name'))
+        wanted_slugs = set()
+        for record in records:
+            department_name = departments.get(_as_int(record.get('department')), '')
+            wanted_slugs.add(record.get('slug') or slugify(f"{record.get('name')}-{department_name}"))
+        return {
+            'department_names': departments,
+            'taken_slugs': set(Doctor.objects.filter(slug__in=wanted_slugs).values_list('slug', flat=True)),
+        }
+
+    def build(self, validated_data, context):
+        # The serializer settled the slug; reserve it for the rest of the batch.
+        context['taken_slugs'].add(validated_data['slug'])
+        doctor = Doctor(**validated_data)
+        doctor.refresh_schedule_fields()  # bulk_create skips Doctor.save()
+        return doctor
+
+    def finish(self, objects):
+        http_cache.invalidate('catalog')
+        http_cache.invalidate('sitemap')
+        search.invalidate()
+        stats.bump(stats.DOCTORS, len(objects))
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+IMPORTERS = {
+    'appointments': AppointmentImporter,
+    'doctors': DoctorImporter,
+}
@@ -0,0 +1,118 @@
+"""
+Response cache for the public, read-heavy catalog endpoints.
+
+Serialized responses are cached per group ('catalog' for departments and
+doctors, 'testimonials' for the testimonial feed), keyed by scheme, host,
+path and query string (bodies carry absolute photo/image URLs). Each group
+carries a version stamp that model signals bump on every save/delete, which
+orphans all of its cached entries at once. The bodies sit in each worker's
+own cache, but the versions are kept in the 'shared' cache, so a save made
+through one Passenger worker is seen by all of them on their next request.
+The version is bumped again once the transaction commits, so an entry
+rebuilt from the old rows in between is orphaned as well.
+
+Every cached response carries a strong ETag (hash of the JSON body) and a
+Last-Modified taken from the group's version, so a repeat visitor sending
+If-None-Match / If-Modified-Since gets a 304 straight from the cache,
+without touching the database.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+CATALOG_CACHE_TTL = getattr(settings, 'CATALOG_CACHE_TTL', 300)
+
+
+def _version_key(group):
+    return f'http-cache:version:{group}'
+
+
+def get_version(group):
+    versions = caches['shared']
+    version = versions.get(_version_key(group))
+    if version is None:
+        # add(): when several workers start at once, they all end up on the first one's version.
+        versions.add(_version_key(group), time.time_ns(), None)
+        version = versions.get(_version_key(group))
+    return version
+
+
+def _bump(group):
+    caches['shared'].set(_version_key(group), time.time_ns(), None)
+
+
+def invalidate(group):
+    _bump(group)
+    transaction.on_commit(lambda: _bump(group), robust=True)
+
+
+class CachedResponseMixin:
+    """
+    Serves GET list/retrieve responses from the cache. Views set
+    `cache_group` and may override `should_cache()` to bypass it.
+    """
+    cache_group = None
+    # Response headers stored along with the body (pagination cursors).
+    cached_headers = ('Link', 'X-Next-Cursor', 'X-Previous-Cursor')
+
+    def should_cache(self, request):
+        return request.method == 'GET'
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+    def get_cache_key(self, request, version):
+        query = sorted(request.query_params.lists())
+        raw = f'{request.scheme}|{request.get_host()}|{request.path}|{query}'
+        return f'http-cache:{self.cache_group}:{version}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+    def cached_response(self, request, build_response):
+        if not self.should_cache(request):
+            return build_response()
+
+        version = get_version(self.cache_group)
+        key = self.get_cache_key(request, version)
+        entry = cache.get(key)
+        if entry is None:
+            response = build_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = JSONRenderer().render(response.data)
+            entry = {
+                # Stored as plain JSON data so it pickles cleanly and still goes through content negotiation.
+                'data': json.loads(body),
+                'etag': f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+                'last_modified': version // 1_000_000_000,
+                'headers': {name: response[name] for name in self.cached_headers if response.has_header(name)},
+            }
+            cache.set(key, entry, CATALOG_CACHE_TTL)
+
+        headers = {
+            **entry['headers'],
+            'ETag': entry['etag'],
+            'Last-Modified': http_date(entry['last_modified']),
+            'Cache-Control': 'public, no-cache',
+        }
+        if self._not_modified(request, entry):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(entry['data'], headers=headers)
+
+    @staticmethod
+    def _not_modified(request, entry):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or entry['etag'] in etags
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+        return if_modified_since is not None and entry['last_modified'] <= if_modified_since
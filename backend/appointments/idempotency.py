@@ -0,0 +1,216 @@
+"""
+`Idempotency-Key` support for POST /api/appointments/.
+
+The booking form sends a random key with each booking and reuses it when it
+retries. The first request with a key inserts an IdempotencyKey row; the
+unique `key_hash` makes that insert the lock, so of two workers racing on the
+same key exactly one runs the booking. Its final response (a success or a
+validation error) is stored on the row, and every later request with that
+key gets the stored response back, marked `Idempotent-Replayed: true`,
+without validating or touching the Appointment table. A 409 (the slot was
+just taken) or a server error is not stored: it frees the key, so a retry
+is booked afresh. A retry that arrives while the first request is still
+running gets 409; the same key with a different body gets 422.
+
+The booking links itself to its key (`IdempotencyKey.appointment`) in the
+same transaction that saves it. A key left pending for PENDING_TIMEOUT
+seconds belongs to a request whose worker died: with no booking linked,
+nothing was booked and a retry takes the key over; with one linked, the
+booking committed and the retry is answered with it (and the response
+stored) instead of booking a second time.
+
+Keys expire after IDEMPOTENCY_KEY_TTL seconds. Nothing in the request path
+deletes them: `manage.py prune_idempotency_keys`, run from cron, deletes the
+expired rows and, past IDEMPOTENCY_MAX_KEYS, the oldest ones. The table is
+only as bounded as that schedule keeps it.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24)
+IDEMPOTENCY_MAX_KEYS = getattr(settings, 'IDEMPOTENCY_MAX_KEYS', 50000)
+# A first request still unfinished after this long is taken to have died with its worker.
+PENDING_TIMEOUT = 60
+MAX_KEY_LENGTH = 255
+# Outcomes a retry should not be stuck with: the slot may free up, the server may recover.
+UNSTORED_STATUSES = (status.HTTP_409_CONFLICT,)
+
+
+class RequestInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed. Please retry shortly."
+    default_code = 'idempotency_in_progress'
+
+
+class KeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request."
+    default_code = 'idempotency_key_reused'
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _is_abandoned(record, now):
+    """Still pending after PENDING_TIMEOUT: the first request's worker died."""
+    return record.response_status is None and record.created_at < now - timedelta(seconds=PENDING_TIMEOUT)
+
+
+def _is_stale(record, now):
+    """A key that can be taken over: expired, or abandoned before anything was booked."""
+    if record.response_status is None:
+        return record.appointment_id is None and _is_abandoned(record, now)
+    return record.created_at < now - timedelta(seconds=IDEMPOTENCY_KEY_TTL)
+
+
+def _hashes(request, key):
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValidationError({IDEMPOTENCY_HEADER: f"Must be at most {MAX_KEY_LENGTH} characters."})
+    key_hash = _digest(f'{request.method}\n{request.path}\n{key}')
+    fingerprint = _digest(json.dumps(request.data, sort_keys=True, default=str))
+    return key_hash, fingerprint
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def is_replay(request, key):
+    """True when `key` already has a stored, unexpired response for this same request."""
+    key_hash, fingerprint = _hashes(request, key)
+    record = IdempotencyKey.objects.filter(key_hash=key_hash).first()
+    return (
+        record is not None and record.response_status is not None
+        and record.fingerprint == fingerprint and not _is_stale(record, timezone.now())
+    )
+
+
+def begin(request, key):
+    """
+    (record, None) when this request should run (the caller then calls
+    complete() or abandon()), or (None, stored response) for a repeat. A
+    returned record with `appointment_id` set was abandoned after its
+    booking committed: the caller answers with that booking instead.
+    """
+    key_hash, fingerprint = _hashes(request, key)
+
+    for _attempt in range(3):
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(key_hash=key_hash, fingerprint=fingerprint)
+        except IntegrityError:
+            pass
+        else:
+            return record, None
+
+        record = IdempotencyKey.objects.filter(key_hash=key_hash).first()
+        if record is None:
+            continue  # expired and pruned in between: claim it again
+        now = timezone.now()
+        if _is_stale(record, now):
+            IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+            continue
+        if record.fingerprint != fingerprint:
+            raise KeyReused()
+        if record.response_status is None:
+            if _is_abandoned(record, now):
+                return record, None
+            raise RequestInProgress()
+        return None, _replay(record)
+    raise RequestInProgress()
+
+
+def complete(record, response):
+    """Stores the final response for replays; a 409 or a server error frees the key instead."""
+    if response.status_code >= 500 or response.status_code in UNSTORED_STATUSES:
+        abandon(record)
+        return
+    body = json.loads(JSONRenderer().render(response.data)) if response.data is not None else None
+    IdempotencyKey.objects.filter(pk=record.pk).update(response_status=response.status_code, response_body=body)
+
+
+def abandon(record):
+    """Frees the key, unless a booking was already linked to it (a retry must then get that booking)."""
+    IdempotencyKey.objects.filter(pk=record.pk, appointment__isnull=True).delete()
+
+
+def attach(record, appointment):
+    """Links the booking to its key; runs inside the booking's transaction."""
+    IdempotencyKey.objects.filter(pk=record.pk).update(appointment=appointment)
+
+
+def prune():
+    """Deletes expired keys and then the oldest beyond IDEMPOTENCY_MAX_KEYS; returns the number deleted."""
+    cutoff = timezone.now() - timedelta(seconds=IDEMPOTENCY_KEY_TTL)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    oldest_kept = list(
+        IdempotencyKey.objects.order_by('-created_at')
+        .values_list('created_at', flat=True)[IDEMPOTENCY_MAX_KEYS - 1:IDEMPOTENCY_MAX_KEYS]
+    )
+    if oldest_kept:
+        deleted += IdempotencyKey.objects.filter(created_at__lt=oldest_kept[0]).delete()[0]
+    return deleted
+
+
+class IdempotentCreateMixin:
+    """
+    Makes a view's create() honour the Idempotency-Key header. Requests
+    without the header are unaffected.
+    """
+    def check_throttles(self, request):
+        # A retry answered from the store books nothing, so it spends no booking quota.
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if request.method == 'POST' and key and is_replay(request, key):
+            return
+        super().check_throttles(request)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        record = getattr(self, 'idempotency_record', None)
+        if record is not None:
+            context['on_booked'] = lambda appointment: attach(record, appointment)
+        return context
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        record, stored = begin(request, key)
+        if stored is not None:
+            return stored
+        if record.appointment_id is not None:
+            return self.recovered_response(record)
+        self.idempotency_record = record
+        try:
+            response = super().create(request, *args, **kwargs)
+        except APIException as exc:
+            # Validation errors are outcomes too: a retry gets the same answer (complete() drops 409s).
+            response = self.handle_exception(exc)
+        except BaseException:
+            abandon(record)
+            raise
+        complete(record, response)
+        return response
+
+    def recovered_response(self, record):
+        """The 201 for a booking whose request died after committing it, stored for later retries."""
+        data = self.get_serializer(record.appointment).data
+        response = Response(data, status=status.HTTP_201_CREATED, headers=self.get_success_headers(data))
+        complete(record, response)
+        response['Idempotent-Replayed'] = 'true'
+        return response
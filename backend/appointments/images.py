@@ -0,0 +1,141 @@
+"""
+Resized/WebP derivatives for uploaded photos.
+
+For every width in IMAGE_VARIANT_WIDTHS that is smaller than the upload, a
+WebP and a fallback (JPEG, or PNG when the image has transparency) copy is
+written next to the original under `<upload dir>/variants/`. The generated
+file names are recorded on the model (e.g. `Doctor.photo_variants`) so
+serializers can build size-keyed maps and `srcset` strings without touching
+storage:
+
+    {"source": "doctors/a.png",
+     "sizes": {"320": {"webp": "doctors/variants/a-320w.webp", "png": "..."}}}
+
+Variants are produced on upload by the post_save signals and for existing
+media by `manage.py generate_image_variants`. When the upload changes, the
+previous variants are deleted by their recorded names (under
+HashedMediaStorage those carry a content hash), unless another row still
+uses the same source file. A missing or unreadable upload is recorded with
+no sizes, so it is not retried on every save; `--force` tries again.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANT_WIDTHS = getattr(settings, 'IMAGE_VARIANT_WIDTHS', (160, 320, 640))
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+
+def variants_are_current(field_file, variants):
+    return bool(field_file) and (variants or {}).get('source') == field_file.name
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+    elif fmt == 'png':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return ContentFile(buffer.getvalue())
+
+
+def build_variants(field_file, widths=IMAGE_VARIANT_WIDTHS):
+    """
+    Writes the derivatives for `field_file` and returns the variants dict,
+    or None when the file is missing or not a readable image.
+    """
+    if not field_file:
+        return None
+    try:
+        with field_file.storage.open(field_file.name, 'rb') as handle:
+            image = Image.open(handle)
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError) as exc:
+        logger.warning("Skipping image variants for %s: %s", field_file.name, exc)
+        return None
+
+    fallback = 'png' if _has_alpha(image) else 'jpeg'
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if fallback == 'png' else 'RGB')
+
+    directory, filename = os.path.split(field_file.name)
+    stem = os.path.splitext(filename)[0]
+    targets = [w for w in widths if w < image.width] or [image.width]
+
+    sizes = {}
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        entry = {}
+        for fmt in ('webp', fallback):
+            extension = 'jpg' if fmt == 'jpeg' else fmt
+            name = f'{directory}/variants/{stem}-{width}w.{extension}'
+            entry[fmt] = default_storage.save(name, _encode(resized, fmt))
+        sizes[str(width)] = entry
+    return {'source': field_file.name, 'sizes': sizes}
+
+
+def variant_names(variants):
+    """Every stored file name in a variants dict."""
+    sizes = (variants or {}).get('sizes') or {}
+    return {name for entry in sizes.values() for name in entry.values()}
+
+
+def refresh_variants(instance, file_field, variants_field, force=False):
+    """
+    Regenerates the variants if the upload changed (or `force`), deletes the
+    ones they replace and stores the new dict with a queryset update so no
+    further save signals fire. Returns True when the stored dict changed.
+    """
+    field_file = getattr(instance, file_field)
+    current = getattr(instance, variants_field) or {}
+    if not force and (variants_are_current(field_file, current) or (not field_file and not current)):
+        return False
+    variants = {}
+    if field_file:
+        variants = build_variants(field_file) or {'source': field_file.name, 'sizes': {}}
+
+    stale = variant_names(current) - variant_names(variants)
+    model = type(instance)
+    # Identical uploads share one stored file, and so its variants.
+    if stale and not model.objects.filter(**{file_field: current.get('source')}).exclude(pk=instance.pk).exists():
+        for name in stale:
+            default_storage.delete(name)
+
+    if variants == current:
+        return False
+    setattr(instance, variants_field, variants)
+    model.objects.filter(pk=instance.pk).update(**{variants_field: variants})
+    return True
+
+
+def variant_urls(variants, build_url):
+    """
+    Serializer helper: ({"320": {"webp": url, ...}}, {"webp": "url 320w, ...", ...})
+    with `build_url(storage_name)` turning names into (absolute) URLs.
+    """
+    sizes = (variants or {}).get('sizes') or {}
+    by_size = {}
+    srcset = {}
+    for width in sorted(sizes, key=int):
+        by_size[width] = {}
+        for fmt, name in sizes[width].items():
+            url = build_url(default_storage.url(name))
+            by_size[width][fmt] = url
+            srcset.setdefault(fmt, []).append(f'{url} {width}w')
+    return by_size, {fmt: ', '.join(entries) for fmt, entries in srcset.items()}
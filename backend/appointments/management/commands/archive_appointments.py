@@ -0,0 +1,56 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from appointments import archive
+
+
+class Command(BaseCommand):
+    help = "Moves old Completed/Cancelled appointments into AppointmentArchive in small, throttled batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help="Archive appointments dated before YYYY-MM-DD")
+        parser.add_argument(
+            '--older-than-days', type=int, default=archive.ARCHIVE_AFTER_DAYS,
+            help="Archive appointments older than this many days (ignored with --before)",
+        )
+        parser.add_argument('--status', action='append', choices=archive.ARCHIVABLE_STATUSES,
+                            help="Only this status (repeatable; default: Completed and Cancelled)")
+        parser.add_argument('--batch-size', type=int, default=archive.ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=0.2, help="Seconds to pause between batches")
+        parser.add_argument('--dry-run', action='store_true', help="Count what would be archived without moving it")
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                cutoff = parse_date(options['before'])
+            except ValueError:  # well formed but impossible, e.g. 2026-02-30
+                cutoff = None
+            if cutoff is None:
+                raise CommandError(f"Invalid date '{options['before']}', use YYYY-MM-DD.")
+        else:
+            cutoff = date.today() - timedelta(days=options['older_than_days'])
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size must be positive.")
+
+        started = time.monotonic()
+        totals = {}
+        batches = archive.archive_batches(
+            cutoff=cutoff,
+            statuses=options['status'] or archive.ARCHIVABLE_STATUSES,
+            batch_size=options['batch_size'],
+            pause=options['sleep'],
+            dry_run=options['dry_run'],
+        )
+        for status, count in batches:
+            totals[status] = totals.get(status, 0) + count
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{status}: +{count} (total {totals[status]})")
+
+        verb = "Would archive" if options['dry_run'] else "Archived"
+        summary = ", ".join(f"{count} {status}" for status, count in totals.items()) or "nothing"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary} dated before {cutoff.isoformat()} in {time.monotonic() - started:.1f}s."
+        ))
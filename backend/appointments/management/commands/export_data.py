@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from appointments import exports
+
+
+class Command(BaseCommand):
+    help = "Streams appointments or doctors to CSV/JSONL without loading the table into memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['appointments', 'doctors'])
+        parser.add_argument('--format', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--date-from', help="YYYY-MM-DD (appointments only)")
+        parser.add_argument('--date-to', help="YYYY-MM-DD (appointments only)")
+        parser.add_argument('--include-archived', action='store_true', help="Also export archived appointments")
+        parser.add_argument('--output', '-o', help="File to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        if options['kind'] == 'appointments':
+            rows = exports.appointment_export_rows(
+                date_from=self._date(options['date_from']),
+                date_to=self._date(options['date_to']),
+                include_archived=options['include_archived'],
+            )
+            fields = exports.APPOINTMENT_FIELDS
+        else:
+            rows = exports.doctor_export_rows()
+            fields = exports.DOCTOR_FIELDS
+
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for chunk in exports.stream_rows(rows, fields, options['format']):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+    @staticmethod
+    def _date(value):
+        if not value:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:  # well formed but impossible, e.g. 2026-02-30
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"Invalid date '{value}', use YYYY-MM-DD.")
+        return parsed
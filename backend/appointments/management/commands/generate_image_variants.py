@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from appointments import images
+from appointments.models import Doctor
+from testimonials.models import Testimonial
+
+TARGETS = [
+    (Doctor, 'photo', 'photo_variants'),
+    (Testimonial, 'image_file', 'image_variants'),
+]
+
+
+class Command(BaseCommand):
+    help = "Generates resized and WebP variants for existing doctor photos and testimonial images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild variants even if they are up to date.")
+
+    def handle(self, *args, **options):
+        for model, file_field, variants_field in TARGETS:
+            updated = 0
+            rows = model.objects.only('pk', file_field, variants_field).iterator(chunk_size=200)
+            for instance in rows:
+                if images.refresh_variants(instance, file_field, variants_field, force=options['force']):
+                    updated += 1
+            self.stdout.write(f"{model.__name__}: {updated} updated")
+        self.stdout.write(self.style.SUCCESS("Image variants are up to date."))
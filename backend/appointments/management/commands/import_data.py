@@ -0,0 +1,32 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appointments import exports
+
+
+class Command(BaseCommand):
+    help = "Bulk-imports appointments or doctors from a CSV/JSONL file, validating and inserting in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(exports.IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=exports.FORMATS, help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=exports.IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if fmt not in exports.FORMATS:
+            raise CommandError("Cannot tell the file format; pass --format csv or --format jsonl.")
+
+        importer = exports.IMPORTERS[options['kind']](batch_size=options['batch_size'])
+        with open(options['path'], 'rb') as handle:
+            report = importer.run(exports.read_records(handle, fmt))
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        if report['error_count'] > len(report['errors']):
+            self.stderr.write(f"... and {report['error_count'] - len(report['errors'])} more rejected rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} {options['kind']} ({report['error_count']} rejected)."
+        ))
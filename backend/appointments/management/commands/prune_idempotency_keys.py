@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from appointments import idempotency
+
+
+class Command(BaseCommand):
+    help = "Deletes expired Idempotency-Key records, and the oldest ones past IDEMPOTENCY_MAX_KEYS."
+
+    def handle(self, *args, **options):
+        deleted = idempotency.prune()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} idempotency key(s)."))
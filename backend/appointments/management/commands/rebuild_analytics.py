@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from appointments import analytics
+from appointments.models import Appointment, AppointmentArchive
+
+
+class Command(BaseCommand):
+    help = "Recomputes the /api/analytics/ daily rollups for a date range from the appointment and archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help="First date (YYYY-MM-DD); default: the earliest appointment")
+        parser.add_argument('--to', dest='date_to', help="Last date (YYYY-MM-DD); default: the latest appointment")
+        parser.add_argument('--chunk-days', type=int, default=31, help="Days rebuilt per transaction")
+
+    def handle(self, *args, **options):
+        date_from, date_to = (self._date(options[name]) for name in ('date_from', 'date_to'))
+        if options['chunk_days'] <= 0:
+            raise CommandError("--chunk-days must be positive.")
+        if date_from is None or date_to is None:
+            bounds = [
+                value
+                for model in (Appointment, AppointmentArchive)
+                for value in (model.objects.order_by('date').values_list('date', flat=True).first(),
+                              model.objects.order_by('-date').values_list('date', flat=True).first())
+                if value is not None
+            ]
+            if not bounds:
+                self.stdout.write("No appointments to roll up.")
+                return
+            date_from = date_from or min(bounds)
+            date_to = date_to or max(bounds)
+        if date_from > date_to:
+            raise CommandError("--from must not be after --to.")
+
+        rows = 0
+        start = date_from
+        step = timedelta(days=options['chunk_days'])
+        while start <= date_to:
+            end = min(start + step - timedelta(days=1), date_to)
+            rows += analytics.rebuild(start, end)
+            self.stdout.write(f"{start} .. {end}: rebuilt")
+            start = end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup row(s) for {date_from} .. {date_to}."))
+
+    @staticmethod
+    def _date(value):
+        if not value:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:  # well formed but impossible, e.g. 2026-02-30
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"Invalid date '{value}', use YYYY-MM-DD.")
+        return parsed
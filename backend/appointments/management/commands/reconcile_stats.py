@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from appointments import stats
+
+
+class Command(BaseCommand):
+    help = "Recounts departments, doctors and appointments and fixes any drift in the /api/stats/ counters."
+
+    def handle(self, *args, **options):
+        drift = stats.reconcile()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All counters are accurate."))
+            return
+        for name, (old, new) in sorted(drift.items()):
+            self.stdout.write(f"{name}: {old} -> {new}")
+        self.stdout.write(self.style.SUCCESS(f"Fixed {len(drift)} counter(s)."))
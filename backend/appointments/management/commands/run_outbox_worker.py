@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appointments import notifications, outbox
+
+
+class Command(BaseCommand):
+    help = "Delivers pending appointment notifications from the outbox, retrying failed ones with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--once', action='store_true', help="Deliver what is due now and exit instead of polling")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when nothing is due")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size must be positive.")
+        senders = notifications.get_senders()
+        self.stdout.write(f"Outbox worker using: {', '.join(sender.name for sender in senders)}")
+
+        started = time.monotonic()
+        totals = {}
+        next_prune = started
+        try:
+            while True:
+                if time.monotonic() >= next_prune:
+                    pruned = outbox.prune()
+                    if pruned and options['verbosity'] > 1:
+                        self.stdout.write(f"Pruned {pruned} delivered/failed event(s)")
+                    next_prune = time.monotonic() + outbox.OUTBOX_PRUNE_INTERVAL
+                outcomes = outbox.process_batch(senders, batch_size=options['batch_size'])
+                for outcome, count in outcomes.items():
+                    totals[outcome] = totals.get(outcome, 0) + count
+                if outcomes and options['verbosity'] > 1:
+                    self.stdout.write(", ".join(f"{count} {outcome}" for outcome, count in outcomes.items()))
+                if sum(outcomes.values()) < options['batch_size']:
+                    # Caught up with what is due.
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass  # a claimed batch was fully recorded before the next claim; nothing to clean up
+
+        summary = ", ".join(f"{count} {outcome}" for outcome, count in totals.items()) or "nothing"
+        self.stdout.write(self.style.SUCCESS(f"Delivered {summary} in {time.monotonic() - started:.1f}s."))
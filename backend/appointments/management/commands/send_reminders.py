@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from appointments import notifications, reminders
+
+
+class Command(BaseCommand):
+    help = "Sends the day-before reminder to patients with an appointment tomorrow; safe to re-run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Remind appointments on this day (YYYY-MM-DD) instead of tomorrow")
+        parser.add_argument('--batch-size', type=int, default=reminders.REMINDER_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=reminders.REMINDER_WORKERS, help="Reminders sent in parallel")
+        parser.add_argument('--dry-run', action='store_true', help="Count the reminders due without sending them")
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = parse_date(options['date'])
+            except ValueError:  # well formed but impossible, e.g. 2026-02-30
+                day = None
+            if day is None:
+                raise CommandError(f"Invalid date '{options['date']}', use YYYY-MM-DD.")
+        else:
+            day = reminders.reminder_day()
+        if options['batch_size'] <= 0 or options['workers'] <= 0:
+            raise CommandError("--batch-size and --workers must be positive.")
+
+        if options['dry_run']:
+            self.stdout.write(f"{reminders.due(day).count()} reminder(s) due for {day.isoformat()}.")
+            return
+
+        def progress(run):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"batch {run.batches}: {run.sent} sent, {run.failed} failed, {run.per_second:.1f}/s")
+
+        run = reminders.send_reminders(
+            day,
+            notifications.get_senders(),
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            on_batch=progress,
+        )
+        style = self.style.SUCCESS if not run.failed else self.style.WARNING
+        self.stdout.write(style(f"Reminders for {day.isoformat()}: {run.summary()}"))
@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+def assign_seats(apps, schema_editor):
+    """
+    Numbers the existing active appointments 1..n within each
+    (doctor, date, time) slot so the unique constraint can be added.
+    Historical double-bookings keep distinct seats above the capacity.
+    """
+    Appointment = apps.get_model('appointments', 'Appointment')
+    last_slot, seat = None, 0
+    batch = []
+    active = Appointment.objects.exclude(status='Cancelled').order_by('doctor_id', 'date', 'time', 'id')
+    for appointment in active.only('id', 'doctor_id', 'date', 'time').iterator(chunk_size=2000):
+        slot = (appointment.doctor_id, appointment.date, appointment.time)
+        seat = seat + 1 if slot == last_slot else 1
+        last_slot = slot
+        appointment.seat = seat
+        batch.append(appointment)
+        if len(batch) >= 500:
+            Appointment.objects.bulk_update(batch, ['seat'])
+            batch = []
+    if batch:
+        Appointment.objects.bulk_update(batch, ['seat'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='seat',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='slot_capacity',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Patients that can be booked into the same time slot.'),
+        ),
+        migrations.RunPython(assign_seats, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(fields=('doctor', 'date', 'time', 'seat'), name='appt_unique_slot_seat'),
+        ),
+    ]
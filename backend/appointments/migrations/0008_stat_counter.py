@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-18 16:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_counters(apps, schema_editor):
+    Department = apps.get_model('appointments', 'Department')
+    Doctor = apps.get_model('appointments', 'Doctor')
+    Appointment = apps.get_model('appointments', 'Appointment')
+    StatCounter = apps.get_model('appointments', 'StatCounter')
+
+    totals = {
+        'departments': Department.objects.count(),
+        'doctors': Doctor.objects.count(),
+        'appointments': Appointment.objects.count(),
+    }
+    for status in ('Pending', 'Confirmed', 'Completed', 'Cancelled'):
+        totals[f'appointments:{status}'] = 0
+    for row in Appointment.objects.values('status').annotate(total=Count('id')).order_by():
+        totals[f"appointments:{row['status']}"] = row['total']
+    StatCounter.objects.bulk_create([StatCounter(name=name, value=value) for name, value in totals.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_slot_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
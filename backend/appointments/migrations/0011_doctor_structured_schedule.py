@@ -0,0 +1,74 @@
+# Generated by Django 6.0 on 2026-10-18 16:07
+
+from django.db import migrations, models
+
+# Frozen copies of the appointments.availability helpers as of this migration,
+# so later changes to that module can't change what it writes.
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+WEEKDAY_LOOKUP = {}
+for _index, _name in enumerate(WEEKDAYS):
+    WEEKDAY_LOOKUP[_name.lower()] = _index
+    WEEKDAY_LOOKUP[_name[:3].lower()] = _index
+MONDAY_TO_SATURDAY = 0b0111111
+
+
+def parse_weekday_mask(available_days):
+    mask = 0
+    for token in (available_days or '').split(','):
+        index = WEEKDAY_LOOKUP.get(token.strip().lower())
+        if index is not None:
+            mask |= 1 << index
+    return mask
+
+
+def weekday_label(mask, available_days=''):
+    if mask == MONDAY_TO_SATURDAY:
+        return "Monday to Saturday"
+    if mask:
+        return ", ".join(name for index, name in enumerate(WEEKDAYS) if mask >> index & 1)
+    return ", ".join(day.strip().capitalize() for day in (available_days or '').split(',') if day.strip())
+
+
+def derive_schedule_fields(apps, schema_editor):
+    """Fills weekday_mask and available_days_label from the existing available_days strings."""
+    Doctor = apps.get_model('appointments', 'Doctor')
+    batch = []
+    for doctor in Doctor.objects.only('id', 'available_days').iterator(chunk_size=500):
+        doctor.weekday_mask = parse_weekday_mask(doctor.available_days)
+        doctor.available_days_label = weekday_label(doctor.weekday_mask, doctor.available_days)
+        batch.append(doctor)
+        if len(batch) >= 500:
+            Doctor.objects.bulk_update(batch, ['weekday_mask', 'available_days_label'])
+            batch = []
+    if batch:
+        Doctor.objects.bulk_update(batch, ['weekday_mask', 'available_days_label'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0010_doctor_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='available_days_label',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='weekday_hours',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='weekday_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(derive_schedule_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['active', 'weekday_mask'], name='doctor_active_weekday_idx'),
+        ),
+    ]
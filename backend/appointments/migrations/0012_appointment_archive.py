@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0011_doctor_structured_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('patient_name', models.CharField(max_length=100)),
+                ('phone', models.CharField(max_length=15)),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('reason', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Confirmed', 'Confirmed'), ('Completed', 'Completed'), ('Cancelled', 'Cancelled')], max_length=20)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='appointments.department')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='appointments.doctor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'time', 'id'], name='appt_archive_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-18 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_rollups(apps, schema_editor):
+    AppointmentDailyRollup = apps.get_model('appointments', 'AppointmentDailyRollup')
+    totals = {}
+    for model_name in ('Appointment', 'AppointmentArchive'):
+        model = apps.get_model('appointments', model_name)
+        rows = model.objects.values('date', 'department_id', 'doctor_id', 'status').annotate(total=Count('id')).order_by()
+        for row in rows.iterator():
+            key = (row['date'], row['department_id'], row['doctor_id'], row['status'])
+            totals[key] = totals.get(key, 0) + row['total']
+    AppointmentDailyRollup.objects.bulk_create(
+        [
+            AppointmentDailyRollup(date=day, department_id=department_id, doctor_id=doctor_id, status=status, count=count)
+            for (day, department_id, doctor_id, status), count in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0012_appointment_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Confirmed', 'Confirmed'), ('Completed', 'Completed'), ('Cancelled', 'Cancelled')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='appointments.department')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='appointments.doctor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'department', 'doctor', 'status'), name='appt_rollup_unique_day')],
+            },
+        ),
+        migrations.RunPython(seed_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0016_appointment_reminder_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='reminder_delivered_to',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
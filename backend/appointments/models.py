@@ -1,10 +1,20 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 
+from .availability import masks_including, normalize_weekday_hours, parse_weekday_mask, weekday_label
+
 class Department(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(max_length=120, unique=True, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # The doctor list is ordered by department name first.
+            models.Index(fields=['name'], name='dept_name_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
@@ -13,6 +23,15 @@ class Department(models.Model):
     def __str__(self):
         return self.name
 
+class DoctorQuerySet(models.QuerySet):
+    def available_on(self, weekday):
+        """
+        Active doctors who consult on `weekday` (0 = Monday). Matches the
+        weekday_mask values that have that bit set, so the lookup is an IN
+        list on `doctor_active_weekday_idx` rather than a bitwise scan.
+        """
+        return self.filter(active=True, weekday_mask__in=masks_including(weekday))
+
 class Doctor(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(max_length=150, unique=True, blank=True, null=True)
@@ -20,20 +39,58 @@ class Doctor(models.Model):
     experience_years = models.IntegerField(null=True, blank=True)
     mmc_registration = models.CharField(max_length=50, blank=True)
     photo = models.ImageField(upload_to='doctors/')
+    # Resized/WebP derivatives of `photo`, maintained by appointments.images.
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     department = models.ForeignKey(Department, on_delete=models.CASCADE)
     description = models.TextField(blank=True)
     available_days = models.CharField(max_length=100)
     start_time = models.TimeField(null=True, blank=True)
     end_time = models.TimeField(null=True, blank=True)
+    # Optional per-weekday hours overriding start/end_time, e.g. {"Saturday": ["09:00", "13:00"]}.
+    weekday_hours = models.JSONField(default=dict, blank=True)
+    # Derived from available_days on save (see appointments.availability): Monday is bit 0.
+    weekday_mask = models.PositiveSmallIntegerField(default=0, editable=False)
+    available_days_label = models.CharField(max_length=100, blank=True, editable=False)
     active = models.BooleanField(default=True)
     
     # ✅ NEW FIELD: Lower numbers appear first (1, 2, 3). Default is 100 so unprioritized doctors sit at the bottom.
     display_order = models.IntegerField(default=100, help_text="Priority sorting: lower numbers come first.")
+    slot_capacity = models.PositiveSmallIntegerField(default=1, help_text="Patients that can be booked into the same time slot.")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DoctorQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Covers DoctorListCreateView: ?department= filter + display_order, name ordering.
+            models.Index(fields=['department', 'display_order', 'name'], name='doctor_dept_order_idx'),
+            # "Who consults on Thursday": Doctor.objects.available_on(3).
+            models.Index(fields=['active', 'weekday_mask'], name='doctor_active_weekday_idx'),
+        ]
+
+    def clean(self):
+        try:
+            self.weekday_hours = normalize_weekday_hours(self.weekday_hours)
+        except ValueError as exc:
+            raise ValidationError({'weekday_hours': str(exc)})
+
+    def refresh_schedule_fields(self):
+        """Recomputes the derived schedule fields (and tidies weekday_hours) before a write."""
+        try:
+            self.weekday_hours = normalize_weekday_hours(self.weekday_hours)
+        except ValueError:
+            pass  # Left for clean()/the serializer to report.
+        self.weekday_mask = parse_weekday_mask(self.available_days)
+        self.available_days_label = weekday_label(self.weekday_mask, self.available_days)
 
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = f"{self.name}-{self.department.name}"
             self.slug = slugify(base_slug)
+        self.refresh_schedule_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'available_days' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'weekday_mask', 'available_days_label'}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -59,10 +116,166 @@ class Appointment(models.Model):
         choices=STATUS_CHOICES, 
         default='Pending'
     )
+    # Seat number within the (doctor, date, time) slot; NULL once the appointment is cancelled.
+    seat = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    # When the day-before reminder went out (see appointments.reminders); cleared by a reschedule.
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Names of the senders that have delivered the reminder so far; reminder_sent_at is set once all have.
+    reminder_delivered_to = models.JSONField(default=list, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            # Two active bookings can never share a seat, however requests interleave.
+            models.UniqueConstraint(fields=['doctor', 'date', 'time', 'seat'], name='appt_unique_slot_seat'),
+        ]
+        indexes = [
+            # Keyset pagination of the appointment list walks (date, time, id).
+            models.Index(fields=['date', 'time', 'id'], name='appt_date_time_id_idx'),
+            models.Index(fields=['status', 'date', 'time', 'id'], name='appt_status_date_time_idx'),
+            # Slot lookups: "what does this doctor have booked on this day/time".
+            models.Index(fields=['doctor', 'date', 'time'], name='appt_doctor_date_time_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # When it was booked for as loaded (None for a deferred field), to spot a reschedule in save().
+        instance._loaded_schedule = (instance.__dict__.get('date'), instance.__dict__.get('time'))
+        return instance
+
+    def _rescheduled(self):
+        loaded = getattr(self, '_loaded_schedule', None)
+        if loaded is None:
+            return False
+        return any(old is not None and old != new for old, new in zip(loaded, (self.date, self.time)))
+
+    def save(self, *args, **kwargs):
+        if self.status == 'Cancelled':
+            self.seat = None
+        update_fields = kwargs.get('update_fields')
+        if self._rescheduled() and (update_fields is None or {'date', 'time'} & set(update_fields)):
+            # Remind again the day before the new date.
+            self.reminder_sent_at = None
+            self.reminder_delivered_to = []
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'reminder_sent_at', 'reminder_delivered_to'}
+        super().save(*args, **kwargs)
+        self._loaded_schedule = (self.date, self.time)
 
     def __str__(self):
         return f"{self.patient_name} - {self.status}"
 
+class AppointmentArchive(models.Model):
+    """
+    Old Completed/Cancelled appointments moved out of the hot Appointment
+    table by `manage.py archive_appointments`. Rows keep their original id,
+    so archived and live appointments can be reported on together
+    (see appointments.exports.appointment_export_rows).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    patient_name = models.CharField(max_length=100)
+    phone = models.CharField(max_length=15)
+    department = models.ForeignKey(Department, on_delete=models.PROTECT, related_name='+')
+    doctor = models.ForeignKey(Doctor, on_delete=models.PROTECT, related_name='+')
+    date = models.DateField()
+    time = models.TimeField()
+    reason = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'time', 'id'], name='appt_archive_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.patient_name} - {self.status} (archived)"
+
+class AppointmentDailyRollup(models.Model):
+    """
+    Appointments per (date, department, doctor, status), kept up to date by
+    signals in appointments.signals (see appointments.analytics) so
+    /api/analytics/ never has to GROUP BY the Appointment table.
+    """
+    date = models.DateField()
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='+')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index behind every date-range report.
+            models.UniqueConstraint(fields=['date', 'department', 'doctor', 'status'], name='appt_rollup_unique_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.doctor_id} {self.status} = {self.count}"
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of a POST sent with an `Idempotency-Key` header, replayed for
+    retries of the same request (see appointments.idempotency).
+    """
+    # sha256 of method, path and the client's key.
+    key_hash = models.CharField(max_length=64, unique=True)
+    # sha256 of the request body: the same key with a different body is refused.
+    fingerprint = models.CharField(max_length=64)
+    # NULL while the first request is still being processed.
+    response_status = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True)
+    # The booking made under this key, linked in the booking's own transaction.
+    appointment = models.ForeignKey(Appointment, null=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.key_hash[:12]} -> {self.response_status}"
+
+class OutboxEvent(models.Model):
+    """
+    A patient/doctor notification about an appointment, written in the same
+    transaction as the change it describes and delivered afterwards by
+    `manage.py run_outbox_worker` (see appointments.outbox).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Not picked up before this: the next retry, or the end of a worker's lease on the event.
+    available_at = models.DateTimeField(default=timezone.now)
+    # Senders that already delivered it, so a retry doesn't send twice through them.
+    delivered_to = models.JSONField(default=list, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's claim query: pending events that are due, oldest first.
+            models.Index(fields=['status', 'available_at', 'id'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+class StatCounter(models.Model):
+    """
+    Running totals behind /api/stats/, kept up to date by signals in
+    appointments.signals (see appointments.stats) instead of COUNT(*) scans.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
 
 
 
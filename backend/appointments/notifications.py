@@ -0,0 +1,125 @@
+"""
+Appointment notifications and the senders that deliver them.
+
+`render()` turns an event (a kind plus the payload stored on an
+OutboxEvent) into the messages for the patient and the doctor. Senders are
+pluggable: NOTIFICATION_SENDERS lists the dotted paths of `Sender`
+subclasses, and every message goes through each of them. An SMS, email or
+WhatsApp provider is one more subclass. The two here are local stand-ins for
+development and tests: ConsoleSender logs each message, FileSender appends
+them as JSON lines to NOTIFICATION_FILE.
+
+Senders are called from the outbox worker (appointments.outbox) and the
+reminder command (appointments.reminders), never from a request, so a slow
+provider only delays those.
+"""
+import json
+import logging
+import threading
+from collections import namedtuple
+from datetime import date, time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_SENDERS = getattr(settings, 'NOTIFICATION_SENDERS', ['appointments.notifications.ConsoleSender'])
+NOTIFICATION_FILE = getattr(settings, 'NOTIFICATION_FILE', None)
+
+APPOINTMENT_CREATED = 'appointment.created'
+APPOINTMENT_STATUS_CHANGED = 'appointment.status_changed'
+APPOINTMENT_REMINDER = 'appointment.reminder'
+
+PATIENT = 'patient'
+DOCTOR = 'doctor'
+
+# `recipient` is the patient's phone number, or 'doctor:<id>' for the doctor;
+# `reference` identifies what the message is about (e.g. 'appointment:42').
+Message = namedtuple('Message', ['audience', 'recipient', 'text', 'reference'])
+
+
+def appointment_payload(appointment, previous_status=None):
+    """What a notification needs to know about `appointment`, as stored on the event."""
+    return {
+        'appointment_id': appointment.pk,
+        'patient_name': appointment.patient_name,
+        'phone': appointment.phone,
+        'doctor_id': appointment.doctor_id,
+        'date': appointment.date.isoformat(),
+        'time': appointment.time.strftime('%H:%M'),
+        'status': appointment.status,
+        'previous_status': previous_status,
+    }
+
+
+def _when(payload):
+    day = date.fromisoformat(payload['date'])
+    at = time.fromisoformat(payload['time'])
+    return f"{day:%a %d %b %Y} at {at:%H:%M}"
+
+
+def render(kind, payload, doctor_names):
+    """The messages for an event; `doctor_names` maps doctor ids to names."""
+    doctor = doctor_names.get(payload['doctor_id'], "your doctor")
+    patient = payload['patient_name']
+    when = _when(payload)
+    reference = f"appointment:{payload['appointment_id']}"
+    doctor_recipient = f"doctor:{payload['doctor_id']}"
+
+    if kind == APPOINTMENT_CREATED:
+        return [
+            Message(PATIENT, payload['phone'], f"Dear {patient}, your appointment with {doctor} on {when} has been received (status: {payload['status']}).", reference),
+            Message(DOCTOR, doctor_recipient, f"New appointment: {patient} on {when}.", reference),
+        ]
+    if kind == APPOINTMENT_STATUS_CHANGED:
+        return [
+            Message(PATIENT, payload['phone'], f"Dear {patient}, your appointment with {doctor} on {when} is now {payload['status']}.", reference),
+            Message(DOCTOR, doctor_recipient, f"Appointment with {patient} on {when}: {payload['previous_status']} -> {payload['status']}.", reference),
+        ]
+    if kind == APPOINTMENT_REMINDER:
+        return [
+            Message(PATIENT, payload['phone'], f"Reminder: Dear {patient}, you have an appointment with {doctor} on {when}.", reference),
+        ]
+    raise ValueError(f"Unknown notification kind '{kind}'")
+
+
+class Sender:
+    """
+    Delivers messages through one channel. `send()` raises to have the
+    delivery retried, and must be thread-safe: reminders are sent from a
+    thread pool.
+    """
+    name = None
+
+    def send(self, messages):
+        raise NotImplementedError
+
+
+class ConsoleSender(Sender):
+    name = 'console'
+
+    def send(self, messages):
+        for message in messages:
+            logger.info("[%s] %s %s: %s", message.reference, message.audience, message.recipient, message.text)
+
+
+class FileSender(Sender):
+    name = 'file'
+    _lock = threading.Lock()
+
+    def __init__(self, path=None):
+        self.path = path or NOTIFICATION_FILE
+        if not self.path:
+            raise ImproperlyConfigured("FileSender needs NOTIFICATION_FILE to be set.")
+
+    def send(self, messages):
+        lines = ''.join(json.dumps(message._asdict()) + '\n' for message in messages)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as file:
+            file.write(lines)
+
+
+def get_senders():
+    """One instance of each sender in NOTIFICATION_SENDERS."""
+    return [import_string(path)() for path in NOTIFICATION_SENDERS]
@@ -0,0 +1,161 @@
+"""
+Transactional outbox for appointment notifications.
+
+Booking an appointment or changing its status only inserts an OutboxEvent
+row, in the same transaction as the appointment itself (the post_save
+signal in appointments.signals, and bulk_transition() for bulk changes). A
+booking that rolls back takes its notification with it, and the request
+never waits on an SMS or email provider.
+
+`manage.py run_outbox_worker` delivers the events. `claim()` takes a batch
+of due events with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers
+never pick the same rows, and leases them by moving `available_at`
+OUTBOX_LEASE_SECONDS ahead before committing. The sending then happens
+outside any transaction. A delivered event is marked sent. A failed one is
+retried with exponential backoff plus jitter, and is marked failed after
+OUTBOX_MAX_ATTEMPTS. If a worker dies mid-batch, its lease runs out and the
+next worker takes the events over.
+
+Delivery is at-least-once. Each sender that succeeds is recorded in
+`delivered_to` and is skipped on a retry.
+
+Events carry patient names and phone numbers, so sent and failed ones are
+not kept forever: the worker calls `prune()` every OUTBOX_PRUNE_INTERVAL
+seconds, which deletes those last attempted more than OUTBOX_RETENTION_DAYS
+ago, a batch at a time.
+"""
+import logging
+import random
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import notifications
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = getattr(settings, 'OUTBOX_BATCH_SIZE', 50)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+# Retry delays double from OUTBOX_RETRY_SECONDS up to OUTBOX_RETRY_MAX_SECONDS.
+OUTBOX_RETRY_SECONDS = getattr(settings, 'OUTBOX_RETRY_SECONDS', 30)
+OUTBOX_RETRY_MAX_SECONDS = getattr(settings, 'OUTBOX_RETRY_MAX_SECONDS', 60 * 60)
+# How long a claimed batch stays with its worker; must outlast sending one batch.
+OUTBOX_LEASE_SECONDS = getattr(settings, 'OUTBOX_LEASE_SECONDS', 5 * 60)
+OUTBOX_RETENTION_DAYS = getattr(settings, 'OUTBOX_RETENTION_DAYS', 30)
+OUTBOX_PRUNE_INTERVAL = getattr(settings, 'OUTBOX_PRUNE_INTERVAL', 60 * 60)
+OUTBOX_PRUNE_BATCH_SIZE = 1000
+
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+RETRY = 'retry'
+
+
+def enqueue(kind, appointment, previous_status=None):
+    """Records a notification about `appointment`; call inside the transaction that changes it."""
+    from .models import OutboxEvent
+
+    return OutboxEvent.objects.create(kind=kind, payload=notifications.appointment_payload(appointment, previous_status))
+
+
+def enqueue_many(events):
+    """Records (kind, payload) pairs with a single INSERT."""
+    from .models import OutboxEvent
+
+    OutboxEvent.objects.bulk_create([OutboxEvent(kind=kind, payload=payload) for kind, payload in events])
+
+
+def retry_delay(attempts):
+    """Backoff before the next try after `attempts` failed ones, with jitter so retries spread out."""
+    delay = min(OUTBOX_RETRY_MAX_SECONDS, OUTBOX_RETRY_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+
+def claim(batch_size=OUTBOX_BATCH_SIZE):
+    """Leases up to `batch_size` due events to this worker and returns them."""
+    from .models import OutboxEvent
+
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=PENDING, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if events:
+            OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                attempts=F('attempts') + 1,
+                available_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS),
+            )
+    for event in events:
+        event.attempts += 1
+    return events
+
+
+def deliver(event, senders, doctor_names):
+    """Sends one claimed event through every sender that hasn't had it yet and records the outcome."""
+    from .models import OutboxEvent
+
+    errors = []
+    try:
+        messages = notifications.render(event.kind, event.payload, doctor_names)
+    except Exception as exc:
+        errors.append(f"render: {exc!r}")
+    else:
+        for sender in senders:
+            if sender.name in event.delivered_to:
+                continue
+            try:
+                sender.send(messages)
+            except Exception as exc:
+                logger.warning("Outbox event %s: sender %s failed: %r", event.pk, sender.name, exc)
+                errors.append(f"{sender.name}: {exc!r}")
+            else:
+                event.delivered_to.append(sender.name)
+
+    now = timezone.now()
+    if not errors:
+        outcome = SENT
+        changes = {'status': SENT, 'sent_at': now, 'last_error': ''}
+    elif event.attempts >= OUTBOX_MAX_ATTEMPTS:
+        outcome = FAILED
+        changes = {'status': FAILED, 'last_error': '\n'.join(errors)}
+        logger.error("Outbox event %s failed after %s attempts", event.pk, event.attempts)
+    else:
+        outcome = RETRY
+        changes = {'available_at': now + retry_delay(event.attempts), 'last_error': '\n'.join(errors)}
+    OutboxEvent.objects.filter(pk=event.pk).update(delivered_to=event.delivered_to, **changes)
+    return outcome
+
+
+def process_batch(senders, batch_size=OUTBOX_BATCH_SIZE):
+    """Claims and delivers one batch; returns a Counter of outcomes (sent, retry, failed)."""
+    from .models import Doctor
+
+    events = claim(batch_size)
+    outcomes = Counter()
+    if not events:
+        return outcomes
+    doctor_ids = {event.payload.get('doctor_id') for event in events}
+    doctor_names = dict(Doctor.objects.filter(pk__in=doctor_ids).values_list('id', 'name'))
+    for event in events:
+        outcomes[deliver(event, senders, doctor_names)] += 1
+    return outcomes
+
+
+def prune(retention_days=OUTBOX_RETENTION_DAYS, batch_size=OUTBOX_PRUNE_BATCH_SIZE):
+    """Deletes sent and failed events last attempted more than `retention_days` ago; returns how many."""
+    from .models import OutboxEvent
+
+    # available_at is the end of the last attempt's lease, so this is a range scan on outbox_due_idx.
+    done = OutboxEvent.objects.filter(
+        status__in=(SENT, FAILED), available_at__lt=timezone.now() - timedelta(days=retention_days),
+    )
+    deleted = 0
+    while ids := list(done.values_list('id', flat=True)[:batch_size]):
+        deleted += OutboxEvent.objects.filter(pk__in=ids).delete()[0]
+    return deleted
@@ -0,0 +1,251 @@
+"""
+Server-side data injection into the React shell (index.html).
+
+For /doctor-profile/<slug> and /find-doctor the page is served with the
+API payload the SPA would otherwise fetch straight after loading, embedded
+as inline JSON, plus page-specific <title>, description, canonical and
+Open Graph tags:
+
+    <script id="initial-data" type="application/json">
+      {"/api/doctors/<slug>/": {...DoctorSerializer...}}
+    </script>
+
+keyed by the API path, so the frontend can use it in place of that first
+request. The shell is compiled into the pieces around the SEO tags and
+</head>, so rendering a page is a string join; rendered pages are cached
+per scheme, host and path under the 'catalog' version (bumped on every
+Doctor/Department save). Error pages (an unknown doctor slug) are neither
+cached nor compressed, so made-up URLs can't fill the cache or cost a
+brotli pass each.
+
+Every other SPA route gets the plain shell. All of these pages are stored
+precompressed (gzip, and brotli when the Brotli package is installed),
+picked by Accept-Encoding and served with an ETag so revalidations end in a
+304.
+
+index.html is rendered and compiled once, then kept until the file changes
+on disk. Every request stats it and compares its mtime and size, because a
+frontend deploy replaces the file (and the hashed bundles it points to)
+without restarting the backend. The prerendered pages are keyed on the
+shell's digest as well, so they are rebuilt from the new shell too.
+"""
+import gzip
+import hashlib
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.template import engines
+from django.template.loader import get_template
+from django.utils.functional import cached_property
+from django.utils.html import format_html, json_script
+from django.utils.http import parse_etags
+from django.utils.text import Truncator
+
+from . import http_cache
+from .http_cache import CATALOG_CACHE_TTL
+
+try:
+    import brotli
+except ImportError:  # optional: without it pages go out gzipped
+    brotli = None
+
+SHELL_TEMPLATE = 'index.html'
+SITE_NAME = 'Mallika Hospital'
+INITIAL_DATA_ID = 'initial-data'
+
+# The shell's own page-level tags, replaced by the per-page ones.
+_SEO_TAGS = re.compile(
+    r'[ \t]*<(?:title>.*?</title'
+    r'|meta\s+name="(?:description|twitter:[^"]*)"[^>]*'
+    r'|meta\s+property="og:[^"]*"[^>]*'
+    r'|link\s+rel="canonical"[^>]*)>[ \t]*\n?',
+    re.S | re.I,
+)
+
+
+# A page body in every encoding we serve, keyed 'identity' / 'gzip' / 'br'.
+CompressedPage = namedtuple('CompressedPage', ['etag', 'bodies'])
+
+
+class Shell:
+    """index.html as rendered from one version of the file, and what is derived from it."""
+
+    def __init__(self, signature, html):
+        self.signature = signature
+        self.html = html
+        self.digest = hashlib.sha256(html.encode('utf-8')).hexdigest()[:16]
+
+    @cached_property
+    def page(self):
+        return compress(self.html)
+
+    @cached_property
+    def compiled(self):
+        return compile_shell(self.html)
+
+
+_shell = None
+
+
+@lru_cache(maxsize=1)
+def shell_path():
+    return get_template(SHELL_TEMPLATE).origin.name
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def current_shell():
+    """The Shell for index.html as it is on disk now, rebuilt only when the file has changed."""
+    global _shell
+    path = shell_path()
+    signature = _signature(path)
+    shell = _shell
+    if shell is not None and (signature == shell.signature or signature is None):
+        return shell  # unchanged, or missing for a moment mid-upload: keep the last good copy
+    with open(path, encoding='utf-8') as file:
+        html = engines['django'].from_string(file.read()).render()
+    _shell = shell = Shell(signature, html)
+    return shell
+
+
+def shell_html():
+    return current_shell().html
+
+
+def shell_page():
+    """The plain shell, compressed once per version of index.html."""
+    return current_shell().page
+
+
+def compress(html):
+    body = html.encode('utf-8')
+    bodies = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(body, quality=11)
+    return CompressedPage(hashlib.sha256(body).hexdigest()[:32], bodies)
+
+
+def uncompressed(html):
+    body = html.encode('utf-8')
+    return CompressedPage(hashlib.sha256(body).hexdigest()[:32], {'identity': body})
+
+
+def _accepted_encodings(request):
+    """Accept-Encoding as {coding: q}."""
+    accepted = {}
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def negotiate_encoding(request, available):
+    accepted = _accepted_encodings(request)
+    for coding in ('br', 'gzip'):
+        if coding in available and accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return 'identity'
+
+
+def page_response(request, page, status=200):
+    encoding = negotiate_encoding(request, page.bodies)
+    # Each encoding is its own representation, so it gets its own strong ETag.
+    etag = f'"{page.etag}"' if encoding == 'identity' else f'"{page.etag}-{encoding}"'
+    headers = {'ETag': etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+    if status == 200:
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+            return HttpResponseNotModified(headers=headers)
+    response = HttpResponse(page.bodies[encoding], status=status, content_type='text/html; charset=utf-8', headers=headers)
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def compile_shell(html):
+    """
+    index.html as (head_start, head_rest, tail): page tags go between the
+    first two, the JSON payload between the last two (right before </head>).
+    """
+    head_end = html.lower().rfind('</head>')
+    if head_end == -1:
+        head_end = 0
+    first_tag = _SEO_TAGS.search(html, 0, head_end)
+    insert_at = first_tag.start() if first_tag else head_end
+    head_start = _SEO_TAGS.sub('', html[:insert_at])
+    head_rest = _SEO_TAGS.sub('', html[insert_at:head_end])
+    return head_start, head_rest, html[head_end:]
+
+
+def meta_tags(title, description, url, image=None):
+    tags = [
+        format_html('<title>{}</title>', title),
+        format_html('<meta name="description" content="{}" />', description),
+        format_html('<link rel="canonical" href="{}" />', url),
+        format_html('<meta property="og:type" content="website" />'),
+        format_html('<meta property="og:url" content="{}" />', url),
+        format_html('<meta property="og:title" content="{}" />', title),
+        format_html('<meta property="og:description" content="{}" />', description),
+        format_html('<meta name="twitter:card" content="summary" />'),
+        format_html('<meta name="twitter:title" content="{}" />', title),
+        format_html('<meta name="twitter:description" content="{}" />', description),
+    ]
+    if image:
+        tags.append(format_html('<meta property="og:image" content="{}" />', image))
+        tags.append(format_html('<meta name="twitter:image" content="{}" />', image))
+    return ''.join(f'    {tag}\n' for tag in tags)
+
+
+def render_page(meta, initial_data, shell=None):
+    head_start, head_rest, tail = (shell or current_shell()).compiled
+    payload = json_script(initial_data, INITIAL_DATA_ID) if initial_data else ''
+    return f'{head_start}{meta}{head_rest}{payload}\n{tail}'
+
+
+def cached_page(request, build):
+    """
+    Response for this URL, from the cache or from `build(shell)` ->
+    (html, status), which is compressed and stored when the status is 200.
+    """
+    shell = current_shell()
+    key = f'prerender:{http_cache.get_version("catalog")}:{shell.digest}:{request.scheme}:{request.get_host()}:{request.path}'
+    entry = cache.get(key)
+    if entry is None:
+        html, status = build(shell)
+        if status != 200:
+            return page_response(request, uncompressed(html), status)
+        entry = (compress(html), status)
+        cache.set(key, entry, CATALOG_CACHE_TTL)
+    page, status = entry
+    return page_response(request, CompressedPage(*page), status)
+
+
+def doctor_description(doctor):
+    parts = [f"Dr. {doctor['name']}"]
+    if doctor.get('degrees'):
+        parts.append(f"({doctor['degrees']})")
+    parts.append(f"- {doctor['department_name']} at {SITE_NAME}, Jogeshwari West, Mumbai.")
+    if doctor.get('display_available_days'):
+        parts.append(f"Available {doctor['display_available_days']}.")
+    if doctor.get('description'):
+        parts.append(doctor['description'])
+    return Truncator(' '.join(parts)).chars(160)
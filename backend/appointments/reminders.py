@@ -0,0 +1,151 @@
+"""
+Day-before appointment reminders, sent by `manage.py send_reminders`.
+
+Each active (Pending/Confirmed) appointment on the target day gets one
+reminder. The due rows are read REMINDER_BATCH_SIZE at a time in id order,
+each batch with its own `id > last` query, so memory stays flat however
+many there are (`.iterator()` would not do that on MySQL, whose driver
+fetches the whole result). A thread pool of REMINDER_WORKERS sends a
+batch's messages in parallel through the NOTIFICATION_SENDERS, and then one
+bulk_update records what went out. The threads only call the senders;
+every query stays on the main thread.
+
+Like the outbox's `delivered_to`, each row records in
+`reminder_delivered_to` the senders that have delivered its reminder, and
+is stamped once all of them have. Running again for the same day only sends
+what is still missing, e.g. after a crash or a provider outage: stamped rows
+are skipped, and on a partly delivered row only the senders that failed are
+tried again, so nobody gets the same reminder twice on one channel.
+Rescheduling an appointment (Appointment.save()) clears both. Runs for the
+same day must not overlap (schedule one per day, e.g. from cron): two runs
+could both send before either records it.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import notifications
+from .models import Appointment
+
+logger = logging.getLogger(__name__)
+
+REMINDER_BATCH_SIZE = getattr(settings, 'REMINDER_BATCH_SIZE', 200)
+REMINDER_WORKERS = getattr(settings, 'REMINDER_WORKERS', 8)
+REMINDER_STATUSES = ('Pending', 'Confirmed')
+REMINDER_FIELDS = (
+    'id', 'patient_name', 'phone', 'doctor_id', 'date', 'time', 'status', 'reminder_sent_at', 'reminder_delivered_to',
+    'doctor__name',
+)
+
+
+def reminder_day(today=None):
+    """The day whose appointments are reminded today: tomorrow."""
+    return (today or date.today()) + timedelta(days=1)
+
+
+def due(day):
+    """Appointments on `day` that still need their reminder, in id order."""
+    return (
+        Appointment.objects
+        .filter(date=day, status__in=REMINDER_STATUSES, reminder_sent_at__isnull=True)
+        .select_related('doctor')
+        .only(*REMINDER_FIELDS)
+        .order_by('id')
+    )
+
+
+class ReminderRun:
+    """Counts and timings of one run, for the throughput report."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.batches = 0
+        self.sent = 0
+        self.failed = 0
+        self.sender_errors = 0
+        self.send_seconds = 0.0
+        self.write_seconds = 0.0
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def per_second(self):
+        elapsed = self.elapsed
+        return self.sent / elapsed if elapsed else 0.0
+
+    def summary(self):
+        return (
+            f"{self.sent} sent, {self.failed} failed, {self.sender_errors} sender error(s) "
+            f"in {self.batches} batch(es), {self.elapsed:.1f}s "
+            f"({self.per_second:.1f}/s; sending {self.send_seconds:.1f}s, marking {self.write_seconds:.1f}s)"
+        )
+
+
+def _batches(day, size):
+    """The due rows in batches of `size`, each read with its own `id > last` query."""
+    last = 0
+    while batch := list(due(day).filter(pk__gt=last)[:size]):
+        yield batch
+        last = batch[-1].pk
+
+
+def _send(senders, appointment):
+    """Sends one reminder through every sender that hasn't delivered it yet; returns (names delivered now, errors)."""
+    payload = notifications.appointment_payload(appointment)
+    messages = notifications.render(notifications.APPOINTMENT_REMINDER, payload, {appointment.doctor_id: appointment.doctor.name})
+    delivered = []
+    errors = 0
+    for sender in senders:
+        if sender.name in appointment.reminder_delivered_to:
+            continue
+        try:
+            sender.send(messages)
+        except Exception as exc:
+            logger.warning("Reminder for appointment %s: sender %s failed: %r", appointment.pk, sender.name, exc)
+            errors += 1
+        else:
+            delivered.append(sender.name)
+    return delivered, errors
+
+
+def send_reminders(day, senders, batch_size=REMINDER_BATCH_SIZE, workers=REMINDER_WORKERS, on_batch=None):
+    """
+    Sends the reminders still due for `day` and returns the ReminderRun.
+    `on_batch(run)` is called after each batch, e.g. for progress output.
+    """
+    run = ReminderRun()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reminder') as pool:
+        for batch in _batches(day, batch_size):
+            started = time.monotonic()
+            results = list(pool.map(lambda appointment: _send(senders, appointment), batch))
+            run.send_seconds += time.monotonic() - started
+
+            now = timezone.now()
+            changed = []
+            reminded = 0
+            for appointment, (delivered, errors) in zip(batch, results):
+                run.sender_errors += errors
+                if not errors:
+                    appointment.reminder_sent_at = now
+                    reminded += 1
+                elif not delivered:
+                    continue
+                appointment.reminder_delivered_to = [*appointment.reminder_delivered_to, *delivered]
+                changed.append(appointment)
+            started = time.monotonic()
+            # No save signals: a reminder stamp changes nothing the counters, rollups or outbox track.
+            Appointment.objects.bulk_update(changed, ['reminder_sent_at', 'reminder_delivered_to'])
+            run.write_seconds += time.monotonic() - started
+
+            run.batches += 1
+            run.sent += reminded
+            run.failed += len(batch) - reminded
+            if on_batch:
+                on_batch(run)
+    return run
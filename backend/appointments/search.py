@@ -0,0 +1,199 @@
+"""
+In-memory fuzzy search over doctors for /api/search/doctors/?q=.
+
+Active doctors' name, degrees, description and department name are split
+into normalized words ("M.D." -> "md"). Two maps make up the index:
+word -> {(doctor_id, field)} and trigram -> {word}. A query word is matched
+against the vocabulary through its trigrams (pg_trgm-style padding, Jaccard
+similarity, with prefixes such as "gynec" -> "gynecology" always counting),
+so typos and partial words still hit and no query ever scans the table.
+
+A doctor's score is the sum over query words of the best field-weighted
+similarity, so doctors matching every word ("MD ortho") rank first.
+
+The index is built on first use, patched incrementally by the Doctor and
+Department signals in appointments.signals once the write commits (a
+rolled-back save never reaches the index), and rebuilt after
+SEARCH_INDEX_TTL seconds so other worker processes pick up changes too.
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+SEARCH_INDEX_TTL = getattr(settings, 'SEARCH_INDEX_TTL', 300)
+SIMILARITY_THRESHOLD = 0.3
+PREFIX_SIMILARITY = 0.75
+FIELD_WEIGHTS = {'name': 3.0, 'department': 2.5, 'degrees': 2.0, 'description': 1.0}
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode()
+    return text.lower().replace('.', '')
+
+
+def words(text):
+    return _WORD.findall(normalize(text))
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DoctorSearchIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built_at = time.monotonic()
+        self.docs = {}                        # doctor_id -> ({field: {words}}, sort key)
+        self.word_docs = defaultdict(set)     # word -> {(doctor_id, field)}
+        self.gram_words = defaultdict(set)    # trigram -> {word}
+        self.word_grams = {}                  # word -> number of trigrams
+
+    def add(self, doctor_id, fields, sort_key):
+        with self.lock:
+            self._remove(doctor_id)
+            field_words = {field: set(words(text)) for field, text in fields.items()}
+            self.docs[doctor_id] = (field_words, sort_key)
+            for field, field_word_set in field_words.items():
+                for word in field_word_set:
+                    if word not in self.word_docs:
+                        grams = trigrams(word)
+                        self.word_grams[word] = len(grams)
+                        for gram in grams:
+                            self.gram_words[gram].add(word)
+                    self.word_docs[word].add((doctor_id, field))
+
+    def remove(self, doctor_id):
+        with self.lock:
+            self._remove(doctor_id)
+
+    def _remove(self, doctor_id):
+        entry = self.docs.pop(doctor_id, None)
+        if entry is None:
+            return
+        for field, field_word_set in entry[0].items():
+            for word in field_word_set:
+                postings = self.word_docs.get(word)
+                if postings is None:
+                    continue
+                postings.discard((doctor_id, field))
+                if not postings:
+                    # Last use of this word: drop it from the vocabulary too.
+                    del self.word_docs[word]
+                    del self.word_grams[word]
+                    for gram in trigrams(word):
+                        self.gram_words[gram].discard(word)
+                        if not self.gram_words[gram]:
+                            del self.gram_words[gram]
+
+    def _similar_words(self, query_word):
+        """{vocabulary word: similarity} for words close enough to `query_word`."""
+        query_grams = trigrams(query_word)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.gram_words.get(gram, ()))
+        matches = {}
+        for word, count in shared.items():
+            similarity = count / (len(query_grams) + self.word_grams[word] - count)
+            if word.startswith(query_word):
+                similarity = max(similarity, PREFIX_SIMILARITY)
+            if similarity >= SIMILARITY_THRESHOLD:
+                matches[word] = similarity
+        return matches
+
+    def search(self, query, limit=20):
+        """[(doctor_id, score)] best first."""
+        scores = Counter()
+        with self.lock:
+            for query_word in set(words(query)):
+                best = {}
+                for word, similarity in self._similar_words(query_word).items():
+                    for doctor_id, field in self.word_docs[word]:
+                        weighted = similarity * FIELD_WEIGHTS[field]
+                        if weighted > best.get(doctor_id, 0):
+                            best[doctor_id] = weighted
+                scores.update(best)
+            sort_keys = {doctor_id: self.docs[doctor_id][1] for doctor_id in scores}
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], sort_keys[item[0]]))
+        return [(doctor_id, round(score, 3)) for doctor_id, score in ranked[:limit]]
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def _document(doctor_id, name, degrees, description, department_name, display_order):
+    fields = {'name': name, 'degrees': degrees, 'description': description, 'department': department_name}
+    return doctor_id, fields, (display_order, name)
+
+
+def _rows(queryset):
+    return queryset.filter(active=True).values_list(
+        'id', 'name', 'degrees', 'description', 'department__name', 'display_order',
+    )
+
+
+def build_index():
+    from .models import Doctor
+
+    index = DoctorSearchIndex()
+    for row in _rows(Doctor.objects.all()).iterator(chunk_size=1000):
+        index.add(*_document(*row))
+    return index
+
+
+def get_index():
+    global _index
+    index = _index
+    if index is None or time.monotonic() - index.built_at > SEARCH_INDEX_TTL:
+        with _build_lock:
+            if _index is index:
+                _index = build_index()
+            index = _index
+    return index
+
+
+def search_doctors(query, limit=20):
+    return get_index().search(query, limit)
+
+
+def refresh_doctors(queryset):
+    """
+    Re-indexes the doctors in `queryset` (dropping inactive ones) once the
+    current transaction commits; no-op before the first search.
+    """
+    transaction.on_commit(lambda: _refresh(queryset))
+
+
+def _refresh(queryset):
+    index = _index
+    if index is None:
+        return
+    ids = set(queryset.values_list('id', flat=True))
+    indexed = set()
+    for row in _rows(queryset):
+        index.add(*_document(*row))
+        indexed.add(row[0])
+    for doctor_id in ids - indexed:
+        index.remove(doctor_id)
+
+
+def remove_doctor(doctor_id):
+    """Drops a deleted doctor from the index once the delete commits."""
+    def remove():
+        if _index is not None:
+            _index.remove(doctor_id)
+    transaction.on_commit(remove)
+
+
+def invalidate():
+    """Drops the whole index; the next search rebuilds it."""
+    global _index
+    _index = None
@@ -1,5 +1,10 @@
+import json
+
 from rest_framework import serializers
+from django.db import transaction
+from django.utils.text import slugify
 from .models import Department, Doctor, Appointment
+from . import availability, booking, images, transitions
 from datetime import date, timedelta
 
 class DepartmentSerializer(serializers.ModelSerializer):
@@ -7,43 +12,87 @@ class DepartmentSerializer(serializers.ModelSerializer):
         model = Department
         fields = '__all__'
 
+class WeekdayHoursField(serializers.JSONField):
+    """
+    Per-weekday hours, {"Saturday": ["09:00", "13:00"]}. Accepts a JSON string
+    too (multipart forms, CSV cells); blank means no overrides.
+    """
+    def run_validation(self, data=serializers.empty):
+        if data is None or data == '':
+            data = {}
+        return super().run_validation(data)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                raise serializers.ValidationError("Must be valid JSON.")
+        try:
+            return availability.normalize_weekday_hours(data)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
 class DoctorSerializer(serializers.ModelSerializer):
     photo_url = serializers.SerializerMethodField()
-    display_available_days = serializers.SerializerMethodField()
+    photo_sizes = serializers.SerializerMethodField()
+    photo_srcset = serializers.SerializerMethodField()
+    # Precomputed on save from available_days (Doctor.refresh_schedule_fields).
+    display_available_days = serializers.CharField(source='available_days_label', read_only=True)
+    weekday_hours = WeekdayHoursField(required=False)
     department_name = serializers.CharField(source='department.name', read_only=True)
 
     class Meta:
         model = Doctor
         fields = [
-            'id', 'slug', 'name', 'photo', 'photo_url', 'department', 'department_name',
+            'id', 'slug', 'name', 'photo', 'photo_url', 'photo_sizes', 'photo_srcset',
+            'department', 'department_name',
             'degrees', 'experience_years', 'mmc_registration',
             'description', 'available_days', 'display_available_days', 
-            'start_time', 'end_time', 'active', 'display_order' # ✅ Added display_order here
+            'start_time', 'end_time', 'weekday_hours', 'active', 'display_order', # ✅ Added display_order here
+            'slot_capacity',
         ]
         extra_kwargs = {
             'photo': {'required': False, 'allow_null': True}
         }
 
-    def get_photo_url(self, obj):
+    def _absolute_url(self, url):
         request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_photo_url(self, obj):
         if obj.photo:
-            return request.build_absolute_uri(obj.photo.url) if request else obj.photo.url
+            return self._absolute_url(obj.photo.url)
         return None
 
-    def get_display_available_days(self, obj):
-        if not obj.available_days:
-            return ""
-        days_list = [day.strip().capitalize() for day in obj.available_days.split(',') if day.strip()]
-        full_week_set = {"Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"}
-        if set(days_list) == full_week_set:
-            return "Monday to Saturday"
-        return ", ".join(days_list)
+    # Width-keyed variant URLs, e.g. {"320": {"webp": ..., "jpeg": ...}}
+    def get_photo_sizes(self, obj):
+        return images.variant_urls(obj.photo_variants, self._absolute_url)[0]
+
+    # Ready-to-use srcset strings per format, e.g. {"webp": "<url> 160w, <url> 320w"}
+    def get_photo_srcset(self, obj):
+        return images.variant_urls(obj.photo_variants, self._absolute_url)[1]
 
 class AppointmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = '__all__'
 
+    # Writes go through appointments.booking so a slot can never be overbooked (409 when full).
+    def create(self, validated_data):
+        # 'on_booked' is set by IdempotentCreateMixin to link the booking to its Idempotency-Key.
+        return booking.save_booking(Appointment(**validated_data), on_saved=self.context.get('on_booked'))
+
+    def update(self, instance, validated_data):
+        needs_seat = booking.needs_new_seat(instance, validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        if needs_seat:
+            return booking.save_booking(instance)
+        with transaction.atomic():  # the status change and its outbox event commit together
+            instance.save()
+        return instance
+
     def validate(self, data):
         doctor = data.get('doctor') or (self.instance.doctor if self.instance else None)
         today = date.today()
@@ -57,18 +106,19 @@ class AppointmentSerializer(serializers.ModelSerializer):
                 )
 
             weekday = requested.strftime('%A')
-            available = [d.strip() for d in doctor.available_days.split(',') if d.strip()]
-            if weekday not in available:
+            schedule = availability.compile_schedule(doctor)
+            if not availability.works_on(schedule, requested):
                 raise serializers.ValidationError(
                     f"Dr. {doctor.name} is not scheduled for consultations on {weekday}. Please review the doctor's available days and select a different date."
                 )
 
-            if doctor.start_time and doctor.end_time and data.get('time'):
-                if not (doctor.start_time <= data['time'] <= doctor.end_time):
+            start_time, end_time = availability.hours_for(doctor, requested.weekday())
+            if start_time and end_time and data.get('time'):
+                if not (start_time <= data['time'] <= end_time):
                     raise serializers.ValidationError(
-                        f"The requested time is outside of Dr. {doctor.name}'s consultation hours. Please choose a slot between {doctor.start_time.strftime('%I:%M %p')} and {doctor.end_time.strftime('%I:%M %p')}."
+                        f"The requested time is outside of Dr. {doctor.name}'s consultation hours. Please choose a slot between {start_time.strftime('%I:%M %p')} and {end_time.strftime('%I:%M %p')}."
                     )
-            elif doctor.active and (not doctor.start_time or not doctor.end_time):
+            elif doctor.active and (not start_time or not end_time):
                 if requested < today + timedelta(days=2):
                     raise serializers.ValidationError(
                         "This doctor is available by special appointment only. Please contact our reception desk at 02 226798585 to coordinate a booking."
@@ -85,4 +135,73 @@ class AppointmentSerializer(serializers.ModelSerializer):
                     "The selected doctor is not associated with this department. Please verify your selection."
                 )
 
-        return data
\ No newline at end of file
+        return data
+
+# --- Bulk status change (see appointments/transitions.py) ---
+class BulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False,
+        max_length=transitions.MAX_BULK_TRANSITION,
+    )
+    status = serializers.ChoiceField(choices=Appointment.STATUS_CHOICES)
+
+# --- Bulk import rows (see appointments/exports.py) ---
+class BulkImportSerializer(serializers.ModelSerializer):
+    """
+    Validates one imported row. Foreign keys are plain ids checked against
+    lookups the importer preloads once per batch (passed in as context).
+    """
+    def to_internal_value(self, data):
+        # CSV has no null: an empty cell means "no value" for non-text columns.
+        data = {
+            key: None if value == '' and key in self.fields and not isinstance(self.fields[key], serializers.CharField) else value
+            for key, value in data.items()
+        }
+        return super().to_internal_value(data)
+
+
+class AppointmentImportSerializer(BulkImportSerializer):
+    # Historic rows are allowed, so none of the booking rules in AppointmentSerializer apply.
+    department = serializers.IntegerField(source='department_id')
+    doctor = serializers.IntegerField(source='doctor_id')
+
+    class Meta:
+        model = Appointment
+        fields = ['patient_name', 'phone', 'department', 'doctor', 'date', 'time', 'reason', 'status']
+
+    def validate(self, data):
+        doctor_departments = self.context['doctor_departments']
+        if data['doctor_id'] not in doctor_departments:
+            raise serializers.ValidationError({'doctor': "Unknown doctor."})
+        if data['department_id'] not in self.context['department_ids']:
+            raise serializers.ValidationError({'department': "Unknown department."})
+        if doctor_departments[data['doctor_id']] != data['department_id']:
+            raise serializers.ValidationError(
+                "The selected doctor is not associated with this department. Please verify your selection."
+            )
+        return data
+
+
+class DoctorImportSerializer(BulkImportSerializer):
+    department = serializers.IntegerField(source='department_id')
+    photo = serializers.CharField(max_length=100, required=False, allow_blank=True, help_text="Path under MEDIA_ROOT")
+    slug = serializers.SlugField(max_length=150, required=False, allow_blank=True)
+    weekday_hours = WeekdayHoursField(required=False)
+
+    class Meta:
+        model = Doctor
+        fields = [
+            'slug', 'name', 'department', 'degrees', 'experience_years', 'mmc_registration', 'photo',
+            'description', 'available_days', 'start_time', 'end_time', 'weekday_hours', 'active', 'display_order',
+            'slot_capacity',
+        ]
+
+    def validate(self, data):
+        department_name = self.context['department_names'].get(data['department_id'])
+        if department_name is None:
+            raise serializers.ValidationError({'department': "Unknown department."})
+        slug = data.get('slug') or slugify(f"{data['name']}-{department_name}")
+        if slug in self.context['taken_slugs']:
+            raise serializers.ValidationError({'slug': f"A doctor with slug '{slug}' already exists."})
+        data['slug'] = slug
+        return data
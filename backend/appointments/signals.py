@@ -0,0 +1,152 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import analytics, authentication, availability, http_cache, images, notifications, outbox, search, stats
+from .models import Department, Doctor, Appointment
+
+
+# --- Availability cache invalidation ---
+@receiver([post_save, post_delete], sender=Doctor)
+def invalidate_doctor_availability(sender, instance, **kwargs):
+    availability.invalidate_doctor(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+def invalidate_appointment_availability(sender, instance, **kwargs):
+    availability.invalidate_doctor(instance.doctor_id)
+
+
+# --- Public catalog response cache ---
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Doctor)
+def invalidate_catalog_cache(sender, **kwargs):
+    http_cache.invalidate('catalog')
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def invalidate_sitemap_cache(sender, **kwargs):
+    http_cache.invalidate('sitemap')
+
+
+# --- /api/search/doctors/ index ---
+@receiver(post_save, sender=Doctor)
+def reindex_doctor(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.refresh_doctors(Doctor.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Doctor)
+def unindex_doctor(sender, instance, **kwargs):
+    search.remove_doctor(instance.pk)
+
+
+@receiver(post_save, sender=Department)
+def reindex_department_doctors(sender, instance, raw=False, **kwargs):
+    # The department name is indexed on each of its doctors.
+    if not raw:
+        search.refresh_doctors(Doctor.objects.filter(department=instance))
+
+
+# --- /api/stats/ counters ---
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=Doctor)
+def count_catalog_insert(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(stats.DEPARTMENTS if sender is Department else stats.DOCTORS, 1)
+
+
+@receiver(post_delete, sender=Department)
+@receiver(post_delete, sender=Doctor)
+def count_catalog_delete(sender, instance, **kwargs):
+    stats.bump(stats.DEPARTMENTS if sender is Department else stats.DOCTORS, -1)
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_status(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred status (.only()/.defer()) doesn't trigger a query.
+    instance._counted_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Appointment)
+def count_appointment_save(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(stats.APPOINTMENTS, 1)
+        stats.bump(stats.status_counter(instance.status), 1)
+    elif instance._counted_status is not None and instance._counted_status != instance.status:
+        stats.bump(stats.status_counter(instance._counted_status), -1)
+        stats.bump(stats.status_counter(instance.status), 1)
+    instance._counted_status = instance.status
+
+
+@receiver(post_delete, sender=Appointment)
+def count_appointment_delete(sender, instance, **kwargs):
+    stats.bump(stats.APPOINTMENTS, -1)
+    if instance._counted_status is not None:
+        stats.bump(stats.status_counter(instance._counted_status), -1)
+
+
+# --- /api/analytics/ daily rollups ---
+@receiver(post_init, sender=Appointment)
+def remember_appointment_rollup(sender, instance, **kwargs):
+    instance._rolled_up = analytics.snapshot(instance)
+
+
+@receiver(post_save, sender=Appointment)
+def roll_up_appointment_save(sender, instance, created, **kwargs):
+    key = analytics.rollup_key(instance)
+    if created:
+        analytics.record(key, 1)
+    else:
+        previous = analytics.previous_key(instance._rolled_up, key)
+        if previous != key:
+            # Status change or reschedule: move the count to the new row.
+            analytics.record(previous, -1)
+            analytics.record(key, 1)
+    instance._rolled_up = key
+
+
+@receiver(post_delete, sender=Appointment)
+def roll_up_appointment_delete(sender, instance, **kwargs):
+    # A deferred field can no longer be loaded once the row is gone; skipped then.
+    analytics.record(instance._rolled_up, -1)
+
+
+# --- Notification outbox ---
+@receiver(post_init, sender=Appointment)
+def remember_notified_status(sender, instance, **kwargs):
+    instance._notified_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Appointment)
+def enqueue_appointment_notification(sender, instance, created, raw=False, **kwargs):
+    # Runs inside save(), so the event commits or rolls back with the appointment.
+    if raw:
+        return
+    previous = instance._notified_status
+    if created:
+        outbox.enqueue(notifications.APPOINTMENT_CREATED, instance)
+    elif previous is not None and previous != instance.status:
+        outbox.enqueue(notifications.APPOINTMENT_STATUS_CHANGED, instance, previous_status=previous)
+    instance._notified_status = instance.status
+
+
+# --- Photo derivatives ---
+@receiver(post_save, sender=Doctor)
+def refresh_doctor_photo_variants(sender, instance, raw=False, **kwargs):
+    if not raw and images.refresh_variants(instance, 'photo', 'photo_variants'):
+        http_cache.invalidate('catalog')
+
+
+# --- Cached token authentication ---
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    authentication.invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_saved_user_tokens(sender, instance, created, **kwargs):
+    # Deactivation, password or permission changes take effect on the next request.
+    if not created:
+        authentication.invalidate_user_tokens(instance)
@@ -0,0 +1,136 @@
+"""
+Streaming sitemap rendering for DynamicSitemapView.
+
+Only `slug` and `updated_at` are read for doctors, in id order and in
+batches that each start after the last id seen (`id > last`), and the XML is
+yielded element by element. Once the number of URLs passes
+SITEMAP_CHUNK_SIZE, /sitemap.xml becomes a sitemap index pointing at
+/sitemap-1.xml, /sitemap-2.xml, ...; `page_ends()` records the last doctor
+id on each page, so a page is read as an id range rather than with an
+OFFSET that grows with the page number.
+
+The first full render of each document, and the page ends, are stored in the
+'shared' cache, so every worker on the host serves the same copy. They are
+dropped when a Doctor is saved or deleted (the 'sitemap' group in
+appointments.http_cache) and expire after SITEMAP_CACHE_TTL in any case.
+"""
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import http_cache
+from .models import Doctor
+
+DOMAIN = getattr(settings, 'SITEMAP_DOMAIN', 'https://mallikahospital.co.in')
+SITEMAP_CHUNK_SIZE = getattr(settings, 'SITEMAP_CHUNK_SIZE', 5000)
+SITEMAP_CACHE_TTL = getattr(settings, 'SITEMAP_CACHE_TTL', 60 * 60)
+SITEMAP_BATCH_SIZE = 500
+STATIC_PAGES = ['/', '/about-us', '/contact', '/testimonial', '/find-doctor']
+
+XML_HEADER = '<?xml version="1.0" encoding="utf-8"?>\n'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def active_doctors():
+    return Doctor.objects.filter(active=True).order_by('id')
+
+
+def _cache_key(name):
+    return f'sitemap:{http_cache.get_version("sitemap")}:{name}'
+
+
+def cached_document(name):
+    return caches['shared'].get(_cache_key(name))
+
+
+def caching_stream(name, chunks):
+    """Yields `chunks` and stores the joined document once the stream completes."""
+    key = _cache_key(name)
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    caches['shared'].set(key, ''.join(parts), SITEMAP_CACHE_TTL)
+
+
+def _doctor_rows(after=0, last=None):
+    """(id, slug, updated_at) for active doctors with after < id <= last, in id order."""
+    while True:
+        queryset = active_doctors().filter(id__gt=after)
+        if last is not None:
+            queryset = queryset.filter(id__lte=last)
+        rows = list(queryset.values_list('id', 'slug', 'updated_at')[:SITEMAP_BATCH_SIZE])
+        yield from rows
+        if len(rows) < SITEMAP_BATCH_SIZE:
+            return
+        after = rows[-1][0]
+
+
+def page_ends():
+    """
+    The id of the last doctor on each sitemap page (the first page leads
+    with the static pages); empty while every URL fits in one document.
+    """
+    key = _cache_key('page-ends')
+    ends = caches['shared'].get(key)
+    if ends is None:
+        ends = []
+        room = SITEMAP_CHUNK_SIZE - len(STATIC_PAGES)
+        last_id = None
+        for last_id, _slug, _updated_at in _doctor_rows():
+            room -= 1
+            if room == 0:
+                ends.append(last_id)
+                room = SITEMAP_CHUNK_SIZE
+        if ends and last_id != ends[-1]:
+            ends.append(last_id)
+        if len(ends) == 1:
+            ends = []  # exactly one full page: no index needed
+        caches['shared'].set(key, ends, SITEMAP_CACHE_TTL)
+    return ends
+
+
+def chunk_count():
+    return max(1, len(page_ends()))
+
+
+def _url(loc, changefreq, priority, lastmod=None):
+    lastmod_tag = f'<lastmod>{lastmod.date().isoformat()}</lastmod>' if lastmod else ''
+    return (
+        f'<url><loc>{escape(loc)}</loc>{lastmod_tag}'
+        f'<changefreq>{changefreq}</changefreq><priority>{priority}</priority></url>\n'
+    )
+
+
+def urlset(page=None):
+    """
+    Yields a <urlset>. `page` is 1-based when the sitemap is split; None
+    renders everything in one document.
+    """
+    yield XML_HEADER
+    yield f'<urlset xmlns="{SITEMAP_NS}">\n'
+
+    # 1. Static pages (manually defined main routes) lead the first document.
+    if page is None or page == 1:
+        for path in STATIC_PAGES:
+            yield _url(f'{DOMAIN}{path}', 'daily', '0.8')
+    after, last = 0, None
+    if page is not None:
+        ends = page_ends()
+        after, last = (ends[page - 2] if page > 1 else 0), ends[page - 1]
+
+    # 2. Active doctor profile pages, with lastmod from the row's real modification time.
+    for _id, slug, updated_at in _doctor_rows(after, last):
+        yield _url(f'{DOMAIN}/doctor-profile/{slug}', 'weekly', '0.9', updated_at)
+
+    yield '</urlset>\n'
+
+
+def sitemap_index(request, pages):
+    yield XML_HEADER
+    yield f'<sitemapindex xmlns="{SITEMAP_NS}">\n'
+    for page in range(1, pages + 1):
+        loc = request.build_absolute_uri(f'/sitemap-{page}.xml')
+        yield f'<sitemap><loc>{escape(loc)}</loc></sitemap>\n'
+    yield '</sitemapindex>\n'
@@ -0,0 +1,75 @@
+"""
+Incrementally maintained counters for /api/stats/.
+
+Signals add or subtract from `StatCounter` rows as departments, doctors and
+appointments are created, deleted or change status. The updates run after
+the surrounding transaction commits so the hot counter row is never locked
+for the length of a booking. Anything that bypasses signals (queryset
+`.update()`, raw SQL) can make the totals drift; `manage.py reconcile_stats`
+recounts them from the source tables.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+DEPARTMENTS = 'departments'
+DOCTORS = 'doctors'
+APPOINTMENTS = 'appointments'
+
+
+def status_counter(status):
+    return f'appointments:{status}'
+
+
+def _apply(name, delta):
+    from .models import StatCounter
+
+    if StatCounter.objects.filter(name=name).update(value=F('value') + delta):
+        return
+    try:
+        with transaction.atomic():
+            StatCounter.objects.create(name=name, value=delta)
+    except IntegrityError:
+        # Another worker created the row in the meantime.
+        StatCounter.objects.filter(name=name).update(value=F('value') + delta)
+
+
+def bump(name, delta=1):
+    # robust: a failed counter update is logged, never surfaced to the booking request.
+    transaction.on_commit(lambda: _apply(name, delta), robust=True)
+
+
+def read_all():
+    """Every counter as {name: value}, in a single query."""
+    from .models import StatCounter
+
+    return dict(StatCounter.objects.values_list('name', 'value'))
+
+
+def compute_actual():
+    """Exact totals recounted from the source tables (archived appointments included)."""
+    from .models import Appointment, AppointmentArchive, Department, Doctor
+
+    totals = {
+        DEPARTMENTS: Department.objects.count(),
+        DOCTORS: Doctor.objects.count(),
+        APPOINTMENTS: Appointment.objects.count() + AppointmentArchive.objects.count(),
+    }
+    for status, _label in Appointment.STATUS_CHOICES:
+        totals[status_counter(status)] = 0
+    for model in (Appointment, AppointmentArchive):
+        for row in model.objects.values('status').annotate(total=Count('id')).order_by():
+            totals[status_counter(row['status'])] += row['total']
+    return totals
+
+
+def reconcile():
+    """Overwrites the counters with exact totals; returns {name: (old, new)} for the ones that drifted."""
+    from .models import StatCounter
+
+    drift = {}
+    stored = read_all()
+    for name, actual in compute_actual().items():
+        if stored.get(name) != actual:
+            drift[name] = (stored.get(name), actual)
+            StatCounter.objects.update_or_create(name=name, defaults={'value': actual})
+    return drift
@@ -1,3 +1,1886 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import date, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+
+from hospital_project import load_shedding, metrics
+from testimonials.models import Testimonial
+from . import (
+    analytics, archive, authentication, availability, exports, http_cache, idempotency, images, notifications, outbox,
+    prerender, reminders, search, sitemaps, stats, throttling, transitions,
+)
+from .models import (
+    Department, Doctor, Appointment, AppointmentArchive, AppointmentDailyRollup, IdempotencyKey, OutboxEvent,
+    StatCounter,
+)
+
+# Indexes that can serve (doctor, date, time) lookups; SQLite names the unique constraint's index itself.
+SLOT_INDEXES = ['appt_doctor_date_time_idx', 'appt_unique_slot_seat', 'sqlite_autoindex_appointments_appointment']
+
+# Markers each backend prints when it has to sort rows instead of reading them in index order.
+SORT_MARKERS = ('USE TEMP B-TREE FOR ORDER BY', 'Using filesort')
+
+
+class QueryPlanTests(TestCase):
+    """
+    Captures EXPLAIN output for the hot querysets and fails if any of them
+    stops using its composite index (or starts sorting when it shouldn't).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Enough rows that the planner prefers an index over a full scan.
+        departments = Department.objects.bulk_create(
+            [Department(name=f"Department {i}", slug=f"department-{i}") for i in range(5)]
+        )
+        cls.department = departments[0]
+        doctors = Doctor.objects.bulk_create([
+            Doctor(
+                name=f"Doctor {i}", slug=f"doctor-{i}", department=departments[i % 5],
+                photo='doctors/placeholder.png', available_days='Monday', display_order=i % 7,
+                weekday_mask=1 << (i % 7),
+            )
+            for i in range(40)
+        ])
+        cls.doctor = doctors[0]
+        statuses = [choice for choice, _ in Appointment.STATUS_CHOICES]
+        start = date(2026, 1, 1)
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient_name=f"Patient {i}", phone='9999999999',
+                department=doctors[i % 40].department, doctor=doctors[i % 40],
+                date=start + timedelta(days=i % 60), time=time(9 + i % 8, 0),
+                status=statuses[i % 4],
+            )
+            for i in range(400)
+        ])
+        Testimonial.objects.bulk_create([
+            Testimonial(patient_name=f"Patient {i}", department=departments[i % 5], display_order=i % 10,
+                        is_visible=bool(i % 5))
+            for i in range(100)
+        ])
+        if connection.vendor == 'mysql':
+            with connection.cursor() as cursor:
+                for model in (Department, Doctor, Appointment, Testimonial):
+                    cursor.execute(f"ANALYZE TABLE {model._meta.db_table}")
+        elif connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, index_names, allow_sort=False):
+        plan = queryset.explain()
+        self.assertTrue(
+            any(name in plan for name in index_names),
+            f"Expected one of {index_names} in plan:\n{plan}",
+        )
+        if not allow_sort:
+            for marker in SORT_MARKERS:
+                self.assertNotIn(marker, plan, f"Unexpected sort in plan:\n{plan}")
+
+    def test_doctor_list_by_department(self):
+        queryset = Doctor.objects.select_related('department').filter(
+            department_id=self.department.pk
+        ).order_by('department__name', 'display_order', 'name')
+        self.assertUsesIndex(queryset, ['doctor_dept_order_idx'])
+
+    def test_doctors_available_on_weekday(self):
+        queryset = Doctor.objects.available_on(3)
+        if connection.vendor != 'sqlite':
+            # SQLite's ANALYZE only keeps an average rows-per-value, so a 64-value IN
+            # list always looks cheaper as a scan; MySQL estimates each value with index dives.
+            self.assertUsesIndex(queryset, ['doctor_active_weekday_idx'])
+        self.assertEqual(queryset.count(), sum(1 for i in range(40) if i % 7 == 3))
+
+    def test_doctor_list_all_departments(self):
+        # Ordering by a joined column always needs a sort on SQLite; the join itself must stay indexed.
+        queryset = Doctor.objects.select_related('department').order_by(
+            'department__name', 'display_order', 'name'
+        )
+        self.assertUsesIndex(queryset, ['doctor_dept_order_idx', 'dept_name_idx'], allow_sort=True)
+
+    def test_appointment_slot_lookup(self):
+        queryset = Appointment.objects.filter(doctor=self.doctor, date=date(2026, 1, 1), time=time(9, 0))
+        self.assertUsesIndex(queryset, SLOT_INDEXES)
+
+    def test_appointment_doctor_date_range(self):
+        queryset = Appointment.objects.filter(
+            doctor=self.doctor, date__gte=date(2026, 1, 1), date__lt=date(2026, 1, 8)
+        ).order_by('date', 'time')
+        self.assertUsesIndex(queryset, SLOT_INDEXES)
+
+    def test_appointment_status_by_date(self):
+        queryset = Appointment.objects.filter(
+            status='Pending', date__gte=date(2026, 1, 15)
+        ).order_by('-date', '-time', '-id')
+        self.assertUsesIndex(queryset, ['appt_status_date_time_idx'])
+
+    def test_visible_testimonials(self):
+        queryset = Testimonial.objects.filter(is_visible=True)
+        self.assertUsesIndex(queryset, ['testimonial_feed_idx'])
+
+    def test_department_testimonials(self):
+        queryset = Testimonial.objects.filter(is_visible=True, department=self.department)[:12]
+        self.assertUsesIndex(queryset, ['testimonial_dept_feed_idx'])
+
+
+class AppointmentListTests(TestCase):
+    """
+    GET /api/appointments/ pages through (-date, -time, -id) with keyset
+    cursors in both directions and validates its filters.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.departments = Department.objects.bulk_create([Department(name="Cardiology"), Department(name="Neurology")])
+        cls.doctors = [
+            Doctor.objects.create(
+                name=f"List Test {i}", department=cls.departments[i], photo='doctors/placeholder.png', available_days='Monday',
+            )
+            for i in range(2)
+        ]
+        # Pairs share a date and time, so only the id tells them apart.
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient_name=f"Patient {i}", phone='9999999999', department=cls.departments[i % 2], doctor=cls.doctors[i % 2],
+                date=date(2026, 3, 2) + timedelta(days=i // 4), time=time(9 + i // 2 % 2, 0), seat=i % 2 + 1,
+                status='Cancelled' if i % 3 == 0 else 'Pending',
+            )
+            for i in range(11)
+        ])
+        cls.expected = list(Appointment.objects.order_by('-date', '-time', '-id').values_list('id', flat=True))
+
+    def setUp(self):
+        cache.clear()  # listing throttle buckets
+
+    def tearDown(self):
+        cache.clear()
+
+    def _get(self, **params):
+        return self.client.get('/api/appointments/', params)
+
+    def _ids(self, response):
+        return [row['id'] for row in response.json()]
+
+    def test_pages_forward_and_back(self):
+        pages = []
+        response = self._get(page_size=4)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(self._ids(response))
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                break
+            self.assertIn('rel="next"', response['Link'])
+            response = self._get(page_size=4, cursor=cursor)
+        self.assertEqual([len(page) for page in pages], [4, 4, 3])
+        self.assertEqual(sum(pages, []), self.expected)
+
+        previous = self._get(page_size=4, cursor=response['X-Previous-Cursor'])
+        self.assertEqual(self._ids(previous), pages[1])
+        self.assertTrue(previous.has_header('X-Next-Cursor'))
+        self.assertEqual(self._ids(self._get(page_size=4, cursor=previous['X-Previous-Cursor'])), pages[0])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self._get(cursor='not-a-cursor').status_code, 404)
+
+    def test_filters(self):
+        doctor = self.doctors[1]
+        response = self._get(doctor=doctor.pk, status='Pending', date_from='2026-03-03', date_to='2026-03-04')
+        self.assertTrue(self._ids(response))
+        self.assertEqual(self._ids(response), list(
+            Appointment.objects.filter(doctor=doctor, status='Pending', date__range=(date(2026, 3, 3), date(2026, 3, 4)))
+            .order_by('-date', '-time', '-id').values_list('id', flat=True)
+        ))
+        self.assertEqual(
+            {row['department'] for row in self._get(department=self.departments[0].pk).json()}, {self.departments[0].pk}
+        )
+
+    def test_malformed_filters(self):
+        for params in ({'doctor': 'abc'}, {'department': 'x'}, {'status': 'Lost'}, {'date_from': '02/03/2026'}):
+            with self.subTest(params=params):
+                self.assertEqual(self._get(**params).status_code, 400)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Fires many simultaneous POSTs at one slot and checks that exactly
+    `slot_capacity` of them win and the rest get a 409.
+    """
+    THREADS = 12
+
+    def setUp(self):
+        cache.clear()  # booking throttle buckets: every thread posts from the same address
+        self.addCleanup(cache.clear)
+        self.department = Department.objects.create(name="Cardiology")
+        self.doctor = Doctor.objects.create(
+            name="Stress Test", department=self.department, photo='doctors/placeholder.png',
+            available_days='Monday,Tuesday,Wednesday,Thursday,Friday,Saturday,Sunday',
+            start_time=time(10, 0), end_time=time(12, 0), slot_capacity=2,
+        )
+        self.slot_date = date.today() + timedelta(days=3)
+
+    def _book(self, barrier, results, index):
+        client = APIClient()
+        barrier.wait()
+        try:
+            response = client.post('/api/appointments/', {
+                'patient_name': f"Patient {index}", 'phone': f"90000000{index:02d}",
+                'department': self.department.pk, 'doctor': self.doctor.pk,
+                'date': self.slot_date.isoformat(), 'time': '10:00',
+            }, format='json')
+            results.append(response.status_code)
+        finally:
+            connections.close_all()
+
+    def test_no_overbooking_under_contention(self):
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        threads = [
+            threading.Thread(target=self._book, args=(barrier, results, i))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), self.THREADS)
+        self.assertEqual(results.count(201), self.doctor.slot_capacity, results)
+        self.assertEqual(results.count(409), self.THREADS - self.doctor.slot_capacity, results)
+        booked = Appointment.objects.filter(doctor=self.doctor, date=self.slot_date, time=time(10, 0))
+        self.assertEqual(booked.count(), self.doctor.slot_capacity)
+        self.assertEqual(sorted(booked.values_list('seat', flat=True)), [1, 2])
+
+    def test_cancelling_releases_the_seat(self):
+        client = APIClient()
+        payload = {
+            'patient_name': "Patient", 'phone': "9000000000",
+            'department': self.department.pk, 'doctor': self.doctor.pk,
+            'date': self.slot_date.isoformat(), 'time': '10:05',
+        }
+        first = client.post('/api/appointments/', payload, format='json')
+        client.post('/api/appointments/', payload, format='json')
+        self.assertEqual(first.data['time'], '10:00:00')  # snapped to the slot start
+        self.assertEqual(client.post('/api/appointments/', payload, format='json').status_code, 409)
+
+        Appointment.objects.filter(pk=first.data['id']).update(status='Cancelled', seat=None)
+        self.assertEqual(client.post('/api/appointments/', payload, format='json').status_code, 201)
+
+
+class BulkStatusTests(TestCase):
+    """
+    The bulk status endpoint applies allowed transitions only, reports each
+    row, and runs the same number of queries for 3 rows as for 30.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Cardiology")
+        cls.doctor = Doctor.objects.create(
+            name="Bulk Test", department=cls.department, photo='doctors/placeholder.png',
+            available_days='Monday', start_time=time(9, 0), end_time=time(17, 0),
+        )
+        cls.token = Token.objects.create(user=User.objects.create_user('reception', password='x'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _appointments(self, count, status='Pending'):
+        start = date(2026, 3, 2) + timedelta(days=Appointment.objects.count())
+        return Appointment.objects.bulk_create([
+            Appointment(
+                patient_name=f"Patient {i}", phone='9999999999', department=self.department,
+                doctor=self.doctor, date=start + timedelta(days=i), time=time(10, 0), status=status, seat=1,
+            )
+            for i in range(count)
+        ])
+
+    def _post(self, ids, status):
+        return self.client.post('/api/appointments/bulk-status/', {'ids': ids, 'status': status}, format='json')
+
+    def test_outcomes(self):
+        pending, = self._appointments(1)
+        completed, = self._appointments(1, status='Completed')
+        response = self._post([pending.pk, completed.pk, 999999], 'Cancelled')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(
+            [(row['id'], row['outcome']) for row in response.data['results']],
+            [(pending.pk, 'updated'), (completed.pk, 'not_allowed'), (999999, 'not_found')],
+        )
+        pending.refresh_from_db()
+        self.assertEqual((pending.status, pending.seat), ('Cancelled', None))
+
+    def test_query_count_is_constant(self):
+        few = [a.pk for a in self._appointments(3)]
+        many = [a.pk for a in self._appointments(30)]
+        self._post([], 'Confirmed')  # warms the token cache
+        with CaptureQueriesContext(connection) as few_queries:
+            self._post(few, 'Confirmed')
+        with CaptureQueriesContext(connection) as many_queries:
+            self._post(many, 'Confirmed')
+        self.assertEqual(len(few_queries), len(many_queries))
+        self.assertEqual(Appointment.objects.filter(status='Confirmed').count(), 33)
+
+
+class DoctorScheduleTests(TestCase):
+    """
+    /api/doctors/<slug>/schedule/ merges the doctor's hours with the day's
+    bookings in a fixed number of queries, however many appointments there are.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Cardiology")
+        cls.doctor = Doctor.objects.create(
+            name="Agenda Test", slug='agenda-test', department=cls.department, photo='doctors/placeholder.png',
+            available_days='Monday,Tuesday,Wednesday,Thursday,Friday', start_time=time(9, 0), end_time=time(12, 0),
+            slot_capacity=3,
+        )
+        cls.day = date(2026, 3, 2)  # a Monday
+        cls.token = Token.objects.create(user=User.objects.create_user('frontdesk', password='x'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _book(self, count, day=None):
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient_name=f"Patient {i}", phone='9999999999', department=self.department, doctor=self.doctor,
+                date=day or self.day, time=time(9 + i // 12, (i % 12) // 3 * 15), seat=i % 3 + 1,
+                status='Cancelled' if i == 0 else 'Pending',
+            )
+            for i in range(count)
+        ])
+
+    def _get(self, path='', **params):
+        return self.client.get(f'/api/doctors/{self.doctor.slug}/schedule/{path}', params)
+
+    def test_day_layout(self):
+        self._book(4)
+        day = self._get(date=self.day.isoformat()).data['days'][0]
+        self.assertTrue(day['working'])
+        self.assertEqual(len(day['slots']), 12)
+        self.assertEqual(day['slots'][0]['time'], '09:00')
+        self.assertEqual(len(day['slots'][0]['appointments']), 3)
+        self.assertEqual(day['slots'][0]['booked'], 2)  # the cancelled one holds no seat
+        self.assertEqual(day['slots'][1]['booked'], 1)
+
+    def test_query_count_is_bounded(self):
+        self._get(date=self.day.isoformat())  # warms the token cache
+        self._book(3)
+        with self.assertNumQueries(2):  # the doctor, then the appointments
+            self._get(date=self.day.isoformat())
+        self._book(30, day=self.day + timedelta(days=1))
+        with self.assertNumQueries(2):
+            response = self._get('week/', date=(self.day + timedelta(days=3)).isoformat())
+        self.assertEqual([day['date'] for day in response.data['days']][0], self.day.isoformat())
+        self.assertEqual(len(response.data['days']), 7)
+        self.assertFalse(response.data['days'][5]['working'])
+
+
+class AdminChangelistTests(TestCase):
+    """The appointment changelist costs the same number of queries for 5 rows as for 60."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Cardiology")
+        cls.doctors = [
+            Doctor.objects.create(
+                name=f"Admin Test {i}", department=cls.department, photo='doctors/placeholder.png',
+                available_days='Monday',
+            )
+            for i in range(3)
+        ]
+        cls.admin_user = User.objects.create_superuser('admin', password='x')
+
+    def _book(self, count):
+        start = date(2026, 3, 2) + timedelta(days=Appointment.objects.count())
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient_name=f"Patient {i}", phone='9999999999', department=self.department,
+                doctor=self.doctors[i % 3], date=start + timedelta(days=i), time=time(10, 0), seat=1,
+            )
+            for i in range(count)
+        ])
+
+    def _changelist_queries(self, query=''):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/admin/appointments/appointment/{query}')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow(self):
+        self.client.force_login(self.admin_user)
+        self._book(5)
+        few = self._changelist_queries(), self._changelist_queries('?status__exact=Pending')
+        self._book(55)
+        many = self._changelist_queries(), self._changelist_queries('?status__exact=Pending')
+        self.assertEqual(few, many)
+
+
+class IdempotencyKeyTests(TestCase):
+    """A retried booking with the same Idempotency-Key is answered from the store, not booked again."""
+
+    def setUp(self):
+        cache.clear()  # booking throttle buckets
+        department = Department.objects.create(name="Cardiology")
+        doctor = Doctor.objects.create(
+            name="Retry Test", department=department, photo='doctors/placeholder.png',
+            available_days='Monday,Tuesday,Wednesday,Thursday,Friday,Saturday,Sunday',
+            start_time=time(10, 0), end_time=time(12, 0),
+        )
+        self.payload = {
+            'patient_name': "Patient", 'phone': "9000000000", 'department': department.pk, 'doctor': doctor.pk,
+            'date': (date.today() + timedelta(days=3)).isoformat(), 'time': '10:00',
+        }
+
+    def tearDown(self):
+        cache.clear()  # leave the booking quota to the other tests
+
+    def _post(self, payload, key):
+        return APIClient().post('/api/appointments/', payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_original_response(self):
+        first = self._post(self.payload, 'booking-1')
+        with CaptureQueriesContext(connection) as queries:
+            retry = self._post(self.payload, 'booking-1')
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertFalse(any('appointments_appointment' in query['sql'] for query in queries))
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_key_reused_for_other_booking(self):
+        self._post(self.payload, 'booking-2')
+        response = self._post(dict(self.payload, phone="9111111111"), 'booking-2')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def _record(self, key, **fields):
+        return IdempotencyKey.objects.create(
+            key_hash=idempotency._digest(f'POST\n/api/appointments/\n{key}'),
+            fingerprint=idempotency._digest(json.dumps(self.payload, sort_keys=True, default=str)),
+            **fields,
+        )
+
+    def test_in_flight_and_stale_pending(self):
+        record = self._record('booking-3')
+        response = self._post(self.payload, 'booking-3')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['detail'].code, 'idempotency_in_progress')
+        self.assertEqual(Appointment.objects.count(), 0)
+
+        # The first request's worker died: once the key is stale, a retry takes it over.
+        stale = timezone.now() - timedelta(seconds=idempotency.PENDING_TIMEOUT + 1)
+        IdempotencyKey.objects.filter(pk=record.pk).update(created_at=stale)
+        self.assertEqual(self._post(self.payload, 'booking-3').status_code, 201)
+        record = IdempotencyKey.objects.get()
+        self.assertEqual((record.response_status, record.appointment_id), (201, Appointment.objects.get().pk))
+
+    def test_booking_committed_before_worker_died(self):
+        # The worker dies after the booking commits but before the response is stored.
+        with mock.patch.object(idempotency, 'complete', side_effect=SystemExit), self.assertRaises(SystemExit):
+            self._post(self.payload, 'booking-5')
+        appointment = Appointment.objects.get()
+        record = IdempotencyKey.objects.get()
+        self.assertEqual((record.appointment_id, record.response_status), (appointment.pk, None))
+
+        self.assertEqual(self._post(self.payload, 'booking-5').status_code, 409)  # not yet known to be dead
+        stale = timezone.now() - timedelta(seconds=idempotency.PENDING_TIMEOUT + 1)
+        IdempotencyKey.objects.update(created_at=stale)
+        retry = self._post(self.payload, 'booking-5')
+        self.assertEqual((retry.status_code, retry['Idempotent-Replayed']), (201, 'true'))
+        self.assertEqual(retry.data['id'], appointment.pk)
+        self.assertEqual(Appointment.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().response_status, 201)
+        self.assertEqual(self._post(self.payload, 'booking-5').data, retry.data)
+
+    def test_slot_conflict_is_not_stored(self):
+        self.assertEqual(self._post(dict(self.payload, phone="9222222222"), 'other-patient').status_code, 201)
+        taken = self._post(self.payload, 'booking-4')
+        self.assertEqual(taken.status_code, 409)
+        self.assertEqual(taken.data['detail'].code, 'slot_unavailable')
+        self.assertEqual(IdempotencyKey.objects.count(), 1)  # only the successful booking's key
+
+        Appointment.objects.update(status='Cancelled', seat=None)
+        self.assertEqual(self._post(self.payload, 'booking-4').status_code, 201)
+
+    def test_prune(self):
+        now = timezone.now()
+        for i in range(5):
+            record = self._record(f'old-{i}', response_status=201)
+            age = idempotency.IDEMPOTENCY_KEY_TTL + 60 if i < 2 else 60 * (5 - i)
+            IdempotencyKey.objects.filter(pk=record.pk).update(created_at=now - timedelta(seconds=age))
+        with mock.patch.object(idempotency, 'IDEMPOTENCY_MAX_KEYS', 2):
+            self.assertEqual(idempotency.prune(), 3)  # two expired, then the oldest beyond the cap
+        self.assertEqual(
+            set(IdempotencyKey.objects.values_list('key_hash', flat=True)),
+            {idempotency._digest(f'POST\n/api/appointments/\nold-{i}') for i in (3, 4)},
+        )
+        IdempotencyKey.objects.update(created_at=now - timedelta(seconds=idempotency.IDEMPOTENCY_KEY_TTL + 1))
+        output = io.StringIO()
+        call_command('prune_idempotency_keys', stdout=output)
+        self.assertIn("Deleted 2", output.getvalue())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class ConcurrentIdempotencyTests(TransactionTestCase):
+    """Two requests racing with one Idempotency-Key book once; the loser waits its turn or is replayed."""
+
+    def setUp(self):
+        cache.clear()
+        department = Department.objects.create(name="Cardiology")
+        doctor = Doctor.objects.create(
+            name="Race Test", department=department, photo='doctors/placeholder.png',
+            available_days='Monday,Tuesday,Wednesday,Thursday,Friday,Saturday,Sunday',
+            start_time=time(10, 0), end_time=time(12, 0), slot_capacity=5,
+        )
+        self.payload = {
+            'patient_name': "Patient", 'phone': "9000000000", 'department': department.pk, 'doctor': doctor.pk,
+            'date': (date.today() + timedelta(days=3)).isoformat(), 'time': '10:00',
+        }
+
+    def tearDown(self):
+        cache.clear()
+
+    def _post(self, barrier, results):
+        client = APIClient()
+        barrier.wait()
+        try:
+            response = client.post('/api/appointments/', self.payload, format='json', HTTP_IDEMPOTENCY_KEY='race')
+            results.append((response.status_code, response.get('Idempotent-Replayed')))
+        finally:
+            connections.close_all()
+
+    def test_same_key_books_once(self):
+        barrier = threading.Barrier(2)
+        results = []
+        threads = [threading.Thread(target=self._post, args=(barrier, results)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 2)
+        self.assertIn((201, None), results)
+        results.remove((201, None))
+        self.assertIn(results[0], [(201, 'true'), (409, None)])
+        self.assertEqual(Appointment.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().response_status, 201)
+
+
+class RecordingSender(notifications.Sender):
+    name = 'recording'
+
+    def __init__(self, failures=0, name=None):
+        self.failures = failures
+        self.sent = []
+        self.name = name or self.name
+        self._lock = threading.Lock()  # reminders call send() from a thread pool
+
+    def send(self, messages):
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("provider down")
+            self.sent.extend(messages)
+
+
+class OutboxTests(TestCase):
+    """Appointment changes queue outbox events in their own transaction; the worker delivers and retries them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Cardiology")
+        cls.doctor = Doctor.objects.create(
+            name="Dr. Outbox", department=department, photo='doctors/placeholder.png',
+            available_days='Monday', start_time=time(9, 0), end_time=time(17, 0),
+        )
+        cls.appointment = Appointment.objects.create(
+            patient_name="Patient", phone='9000000000', department=department, doctor=cls.doctor,
+            date=date(2026, 3, 2), time=time(10, 0),
+        )
+
+    def test_changes_are_queued(self):
+        self.appointment.status = 'Confirmed'
+        self.appointment.save()
+        transitions.bulk_transition([self.appointment.pk], 'Completed')
+        events = list(OutboxEvent.objects.order_by('id').values_list('kind', 'payload'))
+        self.assertEqual([kind for kind, _payload in events], [
+            notifications.APPOINTMENT_CREATED,
+            notifications.APPOINTMENT_STATUS_CHANGED,
+            notifications.APPOINTMENT_STATUS_CHANGED,
+        ])
+        self.assertEqual(
+            [(payload['previous_status'], payload['status']) for _kind, payload in events[1:]],
+            [('Pending', 'Confirmed'), ('Confirmed', 'Completed')],
+        )
+
+    def test_retry_skips_senders_that_delivered(self):
+        reliable, flaky = RecordingSender(), RecordingSender(failures=1)
+        flaky.name = 'flaky'
+        self.assertEqual(outbox.process_batch([reliable, flaky]), {outbox.RETRY: 1})
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.status, event.attempts, event.delivered_to), ('pending', 1, ['recording']))
+
+        OutboxEvent.objects.update(available_at=event.created_at)  # the backoff has passed
+        self.assertEqual(outbox.process_batch([reliable, flaky]), {outbox.SENT: 1})
+        self.assertEqual(len(reliable.sent), 2)  # patient and doctor, once
+        self.assertEqual([message.audience for message in flaky.sent], ['patient', 'doctor'])
+        self.assertIn("Dr. Outbox", flaky.sent[0].text)
+        self.assertEqual(OutboxEvent.objects.get().status, 'sent')
+        self.assertEqual(outbox.process_batch([reliable, flaky]), {})
+
+    def test_prune(self):
+        long_ago = timezone.now() - timedelta(days=outbox.OUTBOX_RETENTION_DAYS + 1)
+        OutboxEvent.objects.all().delete()
+        outbox.enqueue_many(
+            (notifications.APPOINTMENT_CREATED, notifications.appointment_payload(self.appointment))
+            for _ in range(7)
+        )
+        ids = list(OutboxEvent.objects.order_by('id').values_list('id', flat=True))
+        OutboxEvent.objects.filter(pk__in=ids[:3]).update(status=outbox.SENT, available_at=long_ago)
+        OutboxEvent.objects.filter(pk=ids[3]).update(status=outbox.FAILED, available_at=long_ago)
+        OutboxEvent.objects.filter(pk=ids[4]).update(status=outbox.SENT)  # recent
+        OutboxEvent.objects.filter(pk=ids[5]).update(available_at=long_ago)  # old but still pending
+        self.assertEqual(outbox.prune(batch_size=2), 4)
+        self.assertEqual(list(OutboxEvent.objects.order_by('id').values_list('id', flat=True)), ids[4:])
+
+        call_command('run_outbox_worker', '--once', stdout=io.StringIO())
+        self.assertEqual(OutboxEvent.objects.filter(status=outbox.SENT).count(), 3)
+
+
+class ReminderTests(TestCase):
+    """Reminders go out once per appointment, in batches with one UPDATE each, and a re-run sends nothing twice."""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Cardiology")
+        doctor = Doctor.objects.create(
+            name="Dr. Reminder", department=department, photo='doctors/placeholder.png',
+            available_days='Monday', start_time=time(9, 0), end_time=time(17, 0),
+        )
+        cls.day = date(2026, 3, 2)
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient_name=f"Patient {i}", phone=f'90000000{i:02d}', department=department, doctor=doctor,
+                date=cls.day, time=time(9 + i % 8, 0), status=status, seat=i // 8 + 1 if status != 'Cancelled' else None,
+            )
+            for i, status in enumerate(['Pending', 'Confirmed'] * 12 + ['Cancelled'] * 3)
+        ])
+
+    def test_batches_and_rerun(self):
+        sender = RecordingSender(failures=1)
+        with CaptureQueriesContext(connection) as queries:
+            run = reminders.send_reminders(self.day, [sender], batch_size=10, workers=4)
+        self.assertEqual((run.batches, run.sent, run.failed), (3, 23, 1))
+        updates = [query for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 3)  # one bulk_update per batch
+        self.assertTrue(all(message.text.startswith("Reminder:") for message in sender.sent))
+
+        rerun = reminders.send_reminders(self.day, [sender], batch_size=10, workers=4)
+        self.assertEqual((rerun.sent, rerun.failed), (1, 0))  # only the one that failed
+        phones = [message.recipient for message in sender.sent]
+        self.assertEqual(len(phones), 24)
+        self.assertEqual(len(set(phones)), 24)
+        self.assertFalse(Appointment.objects.filter(status__in=reminders.REMINDER_STATUSES, reminder_sent_at=None).exists())
+
+    def test_command_rejects_impossible_date(self):
+        with self.assertRaisesMessage(CommandError, "Invalid date '2026-02-30'"):
+            call_command('send_reminders', date='2026-02-30', stdout=io.StringIO())
+
+    def test_partial_delivery_retries_only_the_failed_sender(self):
+        sms = RecordingSender(name='sms')
+        email = RecordingSender(failures=3, name='email')
+        run = reminders.send_reminders(self.day, [sms, email], batch_size=10, workers=4)
+        self.assertEqual((run.sent, run.failed, run.sender_errors), (21, 3, 3))
+        pending = Appointment.objects.filter(status__in=reminders.REMINDER_STATUSES, reminder_sent_at=None)
+        self.assertEqual([a.reminder_delivered_to for a in pending], [['sms']] * 3)
+
+        rerun = reminders.send_reminders(self.day, [sms, email], batch_size=10, workers=4)
+        self.assertEqual((rerun.sent, rerun.failed), (3, 0))
+        self.assertEqual(len(sms.sent), 24)  # nobody got the SMS twice
+        self.assertEqual(len(email.sent), 24)
+        self.assertFalse(pending.all().exists())
+
+    def test_reschedule_clears_the_stamp(self):
+        reminders.send_reminders(self.day, [RecordingSender()], batch_size=50, workers=2)
+        first, second, third = Appointment.objects.filter(status='Pending').order_by('id')[:3]
+
+        first.status = 'Confirmed'
+        first.save()
+        first.refresh_from_db()
+        self.assertIsNotNone(first.reminder_sent_at)  # not rescheduled
+
+        second.date = self.day + timedelta(days=7)
+        second.save()
+        second.refresh_from_db()
+        self.assertEqual((second.reminder_sent_at, second.reminder_delivered_to), (None, []))
+
+        partial = Appointment.objects.only('id', 'time').get(pk=third.pk)
+        partial.time = time(17, 30)
+        partial.save(update_fields=['time'])
+        third.refresh_from_db()
+        self.assertEqual((third.reminder_sent_at, third.reminder_delivered_to), (None, []))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """
+    Token lookups are served from the shared cache, and logout, rotation and
+    deactivation drop the cached entry so the old token is refused at once.
+    """
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = User.objects.create_user('reception', password='x')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        caches['shared'].clear()
+
+    def _get(self):
+        return self.client.get('/api/analytics/')
+
+    def _is_cached(self, key):
+        return caches['shared'].get(authentication._cache_key(key)) is not None
+
+    def test_lookup_is_cached(self):
+        self.assertEqual(self._get().status_code, 200)
+        self.assertTrue(self._is_cached(self.token.key))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._get().status_code, 200)
+        self.assertFalse(any('authtoken_token' in query['sql'] for query in queries))
+
+    def test_cache_entry_holds_no_secrets(self):
+        self._get()
+        entry = caches['shared'].get(authentication._cache_key(self.token.key))
+        self.assertNotIn(self.token.key, repr(entry))
+        self.assertNotIn(self.user.password, repr(entry))
+        self.assertEqual(entry['user']['id'], self.user.pk)
+
+        user, token = authentication.CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.assertEqual((user.pk, user.username, user.is_active), (self.user.pk, 'reception', True))
+        self.assertEqual((token.key, token.created), (self.token.key, self.token.created))
+        with self.assertNumQueries(1):  # fields outside the entry load on first access
+            self.assertEqual(user.password, self.user.password)
+
+    def test_cached_inactive_user_is_refused(self):
+        self._get()
+        key = authentication._cache_key(self.token.key)
+        entry = caches['shared'].get(key)
+        entry['user']['is_active'] = False
+        caches['shared'].set(key, entry)
+        self.assertEqual(self._get().status_code, 401)
+
+    def test_logout(self):
+        self._get()
+        self.assertEqual(self.client.post('/api/logout/').status_code, 204)
+        self.assertFalse(self._is_cached(self.token.key))
+        self.assertEqual(self._get().status_code, 401)
+
+    def test_rotation(self):
+        self._get()
+        response = self.client.post('/api/token/rotate/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self._is_cached(self.token.key))
+        self.assertEqual(self._get().status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+        self.assertEqual(self._get().status_code, 200)
+
+    def test_deactivation(self):
+        self._get()
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(self._is_cached(self.token.key))
+        self.assertEqual(self._get().status_code, 401)
+
+
+SHELL = """<!doctype html>
+<html>
+  <head>
+    <title>Mallika Hospital</title>
+    <meta name="description" content="Hospital in Jogeshwari West" />
+    <script type="module" src="/assets/index-{build}.js"></script>
+  </head>
+  <body><div id="root"></div></body>
+</html>
+"""
+
+
+class PrerenderTests(TestCase):
+    """
+    The SPA shell and the prerendered doctor pages are served precompressed
+    with ETags, and follow index.html when a deploy replaces it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Cardiology")
+        cls.doctor = Doctor.objects.create(
+            name="Shell Test", slug='shell-test', department=cls.department, photo='doctors/placeholder.png',
+            available_days='Monday,Thursday', degrees='MBBS, MD',
+        )
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.shell_file = os.path.join(directory.name, 'index.html')
+        self._deploy('aaaa')
+        templates = override_settings(TEMPLATES=[{**settings.TEMPLATES[0], 'DIRS': [directory.name]}])
+        templates.enable()
+        self.addCleanup(templates.disable)
+        self._reset_shell()
+        self.addCleanup(self._reset_shell)
+
+    def _reset_shell(self):
+        prerender.shell_path.cache_clear()
+        prerender._shell = None
+
+    def _deploy(self, build, mtime=None):
+        with open(self.shell_file, 'w', encoding='utf-8') as file:
+            file.write(SHELL.format(build=build))
+        if mtime is not None:
+            os.utime(self.shell_file, (mtime, mtime))
+
+    def _initial_data(self, html):
+        start = html.index('<script id="initial-data" type="application/json">')
+        return json.loads(html[html.index('>', start) + 1:html.index('</script>', start)])
+
+    def test_shell_encodings_and_etags(self):
+        plain = self.client.get('/about')
+        self.assertEqual(plain.status_code, 200)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('index-aaaa.js', plain.content.decode())
+
+        gzipped = self.client.get('/about', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped.content), plain.content)
+        self.assertNotEqual(gzipped['ETag'], plain['ETag'])
+        self.assertIn('Accept-Encoding', gzipped['Vary'])
+
+        if prerender.brotli is not None:
+            compressed = self.client.get('/about', HTTP_ACCEPT_ENCODING='gzip, br')
+            self.assertEqual(compressed['Content-Encoding'], 'br')
+            self.assertEqual(prerender.brotli.decompress(compressed.content), plain.content)
+        refused = self.client.get('/about', HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0')
+        self.assertNotIn('Content-Encoding', refused)
+
+        revalidated = self.client.get('/about', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzipped['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        # Another encoding's ETag is another representation.
+        self.assertEqual(self.client.get('/about', HTTP_IF_NONE_MATCH=gzipped['ETag']).status_code, 200)
+
+    def test_shell_follows_a_new_deploy(self):
+        before = self.client.get('/about')
+        self.assertIn('index-aaaa.js', before.content.decode())
+        self.client.get('/doctor-profile/shell-test')
+
+        self._deploy('bbbb', mtime=os.stat(self.shell_file).st_mtime + 10)
+        after = self.client.get('/about')
+        self.assertIn('index-bbbb.js', after.content.decode())
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        self.assertEqual(self.client.get('/about', HTTP_IF_NONE_MATCH=before['ETag']).status_code, 200)
+        # Cached prerendered pages are rebuilt on the new shell too.
+        self.assertIn('index-bbbb.js', self.client.get('/doctor-profile/shell-test').content.decode())
+
+        # A missing file (mid-upload) keeps the last good shell.
+        os.remove(self.shell_file)
+        self.assertIn('index-bbbb.js', self.client.get('/about').content.decode())
+
+    def test_doctor_profile_page(self):
+        response = self.client.get('/doctor-profile/shell-test', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        html = gzip.decompress(response.content).decode()
+        self.assertIn('<title>Dr. Shell Test - Cardiology | Mallika Hospital</title>', html)
+        self.assertIn('<link rel="canonical" href="http://testserver/doctor-profile/shell-test" />', html)
+        self.assertNotIn('Hospital in Jogeshwari West', html)  # the shell's own tags are replaced
+        self.assertEqual(html.count('<title>'), 1)
+        self.assertIn('index-aaaa.js', html)
+        data = self._initial_data(html)['/api/doctors/shell-test/']
+        self.assertEqual((data['name'], data['department_name']), ("Shell Test", "Cardiology"))
+        self.assertLess(html.index('initial-data'), html.index('</head>'))
+
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get('/doctor-profile/shell-test', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag).status_code,
+            304,
+        )
+        # Saving the doctor bumps the catalog version, so the page is rebuilt.
+        self.doctor.name = "Shell Renamed"
+        self.doctor.save()
+        renamed = self.client.get('/doctor-profile/shell-test')
+        self.assertIn('Dr. Shell Renamed', renamed.content.decode())
+
+    def test_unknown_doctor(self):
+        with mock.patch.object(prerender, 'compress', wraps=prerender.compress) as compress:
+            response = self.client.get('/doctor-profile/nobody', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        html = response.content.decode()
+        self.assertIn('Doctor not found', html)
+        self.assertNotIn('initial-data', html)
+        compress.assert_not_called()
+        self.assertFalse([key for key in cache._cache if 'prerender:' in key])
+
+    def test_find_doctor_page(self):
+        response = self.client.get('/find-doctor')
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        self.assertIn('<title>Find a Doctor | Mallika Hospital</title>', html)
+        data = self._initial_data(html)
+        self.assertEqual(list(data), ['/api/doctors/'])  # only what the find-doctor page reads
+        self.assertEqual([doctor['slug'] for doctor in data['/api/doctors/']], ['shell-test'])
+        self.assertEqual(data['/api/doctors/'], self.client.get('/api/doctors/').json())
+
+
+class ExportImportTests(TestCase):
+    """
+    Exports page through keyset batches in (date, time, id) order; imports
+    report bad rows by line and never put a slot over its capacity.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Cardiology")
+        cls.doctor = Doctor.objects.create(
+            name="Export Test", slug='export-test', department=cls.department, photo='doctors/placeholder.png',
+            available_days='Monday', slot_capacity=2,
+        )
+        cls.token = Token.objects.create(user=User.objects.create_user('records', password='x'))
+        start = date(2026, 3, 2)
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient_name=f"Patient {i}", phone=f"90000000{i:02d}", department=cls.department, doctor=cls.doctor,
+                date=start + timedelta(days=i % 3), time=time(10, 0), seat=i // 3 + 1 if i < 6 else None,
+                status='Confirmed' if i < 6 else 'Cancelled',
+            )
+            for i in range(9)
+        ])
+        AppointmentArchive.objects.bulk_create([
+            AppointmentArchive(
+                id=1000 + i, patient_name=f"Archived {i}", phone='9111111111', department=cls.department,
+                doctor=cls.doctor, date=date(2025, 1, 1) + timedelta(days=i), time=time(9, 0), status='Completed',
+            )
+            for i in range(3)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _export(self, fmt, **params):
+        response = self.client.get(f'/api/export/appointments.{fmt}', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def _import(self, fmt, content):
+        upload = SimpleUploadedFile(f'appointments.{fmt}', content)
+        response = self.client.post(f'/api/import/appointments.{fmt}', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def _expected_order(self):
+        return list(Appointment.objects.order_by('date', 'time', 'id').values_list('id', flat=True))
+
+    def test_keyset_batches(self):
+        with mock.patch.object(exports, 'EXPORT_CHUNK_SIZE', 2), CaptureQueriesContext(connection) as queries:
+            rows = [json.loads(line) for line in self._export('jsonl').splitlines()]
+        self.assertEqual([row['id'] for row in rows], self._expected_order())
+        self.assertEqual(len(queries), 5)  # 9 rows, 2 at a time
+        self.assertFalse(any('OFFSET' in query['sql'].upper() for query in queries))
+
+    def test_include_archived(self):
+        with mock.patch.object(exports, 'EXPORT_CHUNK_SIZE', 2):
+            ids = [json.loads(line)['id'] for line in self._export('jsonl', include_archived=1).splitlines()]
+        self.assertEqual(ids, [1000, 1001, 1002] + self._expected_order())
+        self.assertEqual(len(self._export('jsonl').splitlines()), 9)
+
+    def _round_trip(self, fmt):
+        exported = self._export(fmt, date_from='2026-03-02', date_to='2026-03-02')
+        Appointment.objects.filter(date=date(2026, 3, 2)).delete()
+        self.assertEqual(self._import(fmt, exported), {'created': 3, 'error_count': 0, 'errors': []})
+        self.assertEqual(self._export(fmt, date_from='2026-03-02', date_to='2026-03-02').count(b'Patient'), 3)
+        restored = Appointment.objects.filter(date=date(2026, 3, 2)).order_by('patient_name')
+        self.assertEqual(
+            [(a.patient_name, a.status, a.seat) for a in restored],
+            [("Patient 0", 'Confirmed', 1), ("Patient 3", 'Confirmed', 2), ("Patient 6", 'Cancelled', None)],
+        )
+
+    def test_csv_round_trip(self):
+        self._round_trip('csv')
+
+    def test_jsonl_round_trip(self):
+        self._round_trip('jsonl')
+
+    def test_error_rows(self):
+        row = {
+            'patient_name': "New Patient", 'phone': '9222222222', 'department': self.department.pk,
+            'doctor': self.doctor.pk, 'date': '2026-03-09', 'time': '10:00', 'status': 'Pending',
+        }
+        lines = [
+            json.dumps(row),
+            '{not json',
+            json.dumps({**row, 'doctor': 999999}),
+            json.dumps({**row, 'date': 'someday'}),
+            json.dumps(row),
+            json.dumps(row),  # the slot holds two
+            json.dumps({**row, 'status': 'Cancelled'}),  # takes no seat
+            '[1]',
+            '"x"',
+        ]
+        report = self._import('jsonl', '\n'.join(lines).encode())
+        self.assertEqual(report['created'], 3)
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3, 4, 6, 8, 9])
+        self.assertIn('doctor', report['errors'][1]['errors'])
+        self.assertIn('time', report['errors'][3]['errors'])
+        self.assertEqual(report['errors'][4]['errors'], "Each line must be a JSON object.")
+        seats = Appointment.objects.filter(date=date(2026, 3, 9)).values_list('seat', flat=True)
+        self.assertEqual(sorted(seats, key=lambda seat: seat or 0), [None, 1, 2])
+
+    def test_command_rejects_impossible_date(self):
+        with self.assertRaisesMessage(CommandError, "Invalid date '2026-02-30'"):
+            call_command('export_data', 'appointments', date_from='2026-02-30', stdout=io.StringIO())
+
+    def test_csv_neutralizes_formulas(self):
+        Appointment.objects.filter(patient_name="Patient 0").update(patient_name='=HYPERLINK("http://evil")')
+        Appointment.objects.filter(patient_name="Patient 3").update(patient_name='@SUM(A1)')
+        rows = list(csv.DictReader(io.StringIO(self._export('csv', date_from='2026-03-02', date_to='2026-03-02').decode())))
+        names = sorted(row['patient_name'] for row in rows)
+        self.assertEqual(names, ["'=HYPERLINK(\"http://evil\")", "'@SUM(A1)", "Patient 6"])
+        # JSON Lines is not opened by spreadsheets and stays as stored.
+        self.assertIn(b'"=HYPERLINK', self._export('jsonl'))
+
+    def test_import_respects_existing_bookings(self):
+        # 2026-03-02 10:00 already has both seats taken.
+        row = {
+            'patient_name': "Late Patient", 'phone': '9333333333', 'department': self.department.pk,
+            'doctor': self.doctor.pk, 'date': '2026-03-02', 'time': '10:00', 'status': 'Confirmed',
+        }
+        report = self._import('jsonl', json.dumps(row).encode())
+        self.assertEqual((report['created'], report['error_count']), (0, 1))
+        report = self._import('jsonl', json.dumps({**row, 'status': 'Completed', 'time': '11:00'}).encode())
+        self.assertEqual(report['created'], 1)
+
+
+class ArchiveTests(TestCase):
+    """
+    archive_batches() moves old Completed/Cancelled appointments in batches,
+    survives being re-run after an interruption, and leaves the stats
+    counters and analytics rollups as they were.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Cardiology")
+        cls.doctor = Doctor.objects.create(
+            name="Archive Test", slug='archive-test', department=cls.department, photo='doctors/placeholder.png',
+            available_days='Monday',
+        )
+        statuses = [choice for choice, _ in Appointment.STATUS_CHOICES]
+        cls.start = date(2025, 1, 1)
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient_name=f"Patient {i}", phone='9999999999', department=cls.department, doctor=cls.doctor,
+                date=cls.start + timedelta(days=i % 20), time=time(9 + i % 3, 0), status=statuses[i % 4],
+                seat=None if statuses[i % 4] == 'Cancelled' else i // 60 + 1,
+            )
+            for i in range(80)
+        ])
+        cls.cutoff = cls.start + timedelta(days=10)
+
+    def setUp(self):
+        stats.reconcile()
+        analytics.rebuild(self.start, self.start + timedelta(days=30))
+
+    def _rollups(self):
+        return set(AppointmentDailyRollup.objects.values_list('date', 'doctor_id', 'status', 'count'))
+
+    def _archivable(self, statuses=archive.ARCHIVABLE_STATUSES):
+        return set(
+            Appointment.objects.filter(date__lt=self.cutoff, status__in=statuses).values_list('id', flat=True)
+        )
+
+    def test_batches_and_filters(self):
+        expected = self._archivable()
+        self.assertEqual(len(expected), 16)
+        batches = list(archive.archive_batches(cutoff=self.cutoff, batch_size=3))
+        self.assertEqual(batches, [
+            ('Completed', 3), ('Completed', 3), ('Completed', 2), ('Cancelled', 3), ('Cancelled', 3), ('Cancelled', 2),
+        ])
+        self.assertEqual(set(AppointmentArchive.objects.values_list('id', flat=True)), expected)
+        self.assertFalse(Appointment.objects.filter(pk__in=expected).exists())
+        # Nothing after the cutoff, and no Pending/Confirmed rows, were touched.
+        self.assertEqual(Appointment.objects.count(), 64)
+        self.assertFalse(Appointment.objects.filter(date__lt=self.cutoff, status__in=archive.ARCHIVABLE_STATUSES).exists())
+
+    def test_status_filter_and_dry_run(self):
+        cancelled = self._archivable(['Cancelled'])
+        dry = list(archive.archive_batches(cutoff=self.cutoff, statuses=['Cancelled'], dry_run=True))
+        self.assertEqual(dry, [('Cancelled', 8)])
+        self.assertFalse(AppointmentArchive.objects.exists())
+        list(archive.archive_batches(cutoff=self.cutoff, statuses=['Cancelled']))
+        self.assertEqual(set(AppointmentArchive.objects.values_list('id', flat=True)), cancelled)
+        self.assertEqual(len(self._archivable(['Completed'])), 8)
+
+    def test_command_rejects_impossible_date(self):
+        with self.assertRaisesMessage(CommandError, "Invalid date '2026-02-30'"):
+            call_command('archive_appointments', before='2026-02-30', stdout=io.StringIO())
+
+    def test_rerun_after_interruption(self):
+        expected = self._archivable()
+        # A run that copied a batch but died before deleting it.
+        copied = Appointment.objects.filter(pk__in=sorted(expected)[:4]).values(*archive.ARCHIVED_FIELDS)
+        AppointmentArchive.objects.bulk_create([AppointmentArchive(**row) for row in copied])
+        list(archive.archive_batches(cutoff=self.cutoff, batch_size=3))
+        self.assertEqual(set(AppointmentArchive.objects.values_list('id', flat=True)), expected)
+        self.assertFalse(Appointment.objects.filter(pk__in=expected).exists())
+        self.assertEqual(list(archive.archive_batches(cutoff=self.cutoff)), [])
+
+    def test_stats_and_analytics_unchanged(self):
+        counters = stats.read_all()
+        rollups = self._rollups()
+        with self.captureOnCommitCallbacks(execute=True):
+            list(archive.archive_batches(cutoff=self.cutoff, batch_size=7))
+        self.assertEqual(stats.read_all(), counters)
+        self.assertEqual(stats.reconcile(), {})
+        self.assertEqual(self._rollups(), rollups)
+        analytics.rebuild(self.start, self.start + timedelta(days=30))
+        self.assertEqual(self._rollups(), rollups)
+
+
+class ThrottleTests(TestCase):
+    """
+    Token buckets refill continuously, answer 429 with Retry-After, key
+    bookings on the phone number too, and ignore a forged X-Forwarded-For.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def _login(self, address='10.0.0.1', **headers):
+        return self.client.post('/api/login/', {'username': 'nobody', 'password': 'x'}, REMOTE_ADDR=address, **headers)
+
+    def test_bucket_refill(self):
+        throttle = throttling.LoginRateThrottle()  # 10/min: a token every 6 seconds
+        request = APIRequestFactory().post('/api/login/', REMOTE_ADDR='10.0.0.2')
+        now = [1000.0]
+        with mock.patch.object(throttle, 'timer', lambda: now[0]):
+            self.assertTrue(all(throttle.allow_request(request, None) for _ in range(10)))
+            self.assertFalse(throttle.allow_request(request, None))
+            self.assertAlmostEqual(throttle.wait(), 6.0)
+            now[0] += 3
+            self.assertFalse(throttle.allow_request(request, None))
+            self.assertAlmostEqual(throttle.wait(), 3.0)
+            now[0] += 3
+            self.assertTrue(throttle.allow_request(request, None))
+            self.assertFalse(throttle.allow_request(request, None))
+            now[0] += 600  # never more than a full bucket
+            self.assertEqual(sum(throttle.allow_request(request, None) for _ in range(12)), 10)
+
+    def test_retry_after(self):
+        for _ in range(10):
+            self.assertEqual(self._login().status_code, 400)
+        response = self._login()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(0 < int(response['Retry-After']) <= 6)
+        self.assertEqual(self._login(address='10.0.0.9').status_code, 400)  # other clients are unaffected
+
+    def test_forwarded_for_is_ignored(self):
+        for i in range(10):
+            self._login(HTTP_X_FORWARDED_FOR=f'192.0.2.{i}')
+        self.assertEqual(self._login(HTTP_X_FORWARDED_FOR='192.0.2.99').status_code, 429)
+
+    def test_phone_throttle(self):
+        phones = ['9876543210', '+91 98765-43210', '098765 43210', '9876543210', '(987) 654-3210']
+        for i, phone in enumerate(phones):
+            response = self.client.post('/api/appointments/', {'phone': phone}, REMOTE_ADDR=f'10.0.1.{i}')
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/appointments/', {'phone': '9876543210'}, REMOTE_ADDR='10.0.1.99')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        response = self.client.post('/api/appointments/', {'phone': '9123456789'}, REMOTE_ADDR='10.0.1.99')
+        self.assertEqual(response.status_code, 400)
+
+
+class LoadSheddingTests(TestCase):
+    """The slot pool is shared by every process using its directory, and a full pool means 503."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_slots_are_exclusive(self):
+        pool = load_shedding.SlotPool(self.directory, 2)
+        other = load_shedding.SlotPool(self.directory, 2)  # e.g. another worker
+        held = [pool.acquire(), other.acquire()]
+        self.assertNotIn(None, held)
+        self.assertIsNone(other.acquire(timeout=0.05))
+        pool.release(held.pop())
+        slot = other.acquire()
+        self.assertIsNotNone(slot)
+        other.release(slot)
+        pool.release(held.pop())
+
+    def test_full_pool_sheds(self):
+        limits = {'LOAD_SHED_LOCK_DIR': self.directory, 'LOAD_SHED_MAX_CONCURRENT': 1, 'LOAD_SHED_WAIT_SECONDS': 0}
+        with mock.patch.multiple(load_shedding, **limits):
+            client = APIClient()
+            busy = load_shedding.SlotPool(self.directory, 1)
+            slot = busy.acquire()
+            response = client.get('/api/departments/')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], str(load_shedding.LOAD_SHED_RETRY_AFTER))
+            busy.release(slot)
+            self.assertEqual(client.get('/api/departments/').status_code, 200)
+
+    def test_streaming_response_holds_its_slot(self):
+        token = Token.objects.create(user=User.objects.create_user('exports'))
+        limits = {'LOAD_SHED_LOCK_DIR': self.directory, 'LOAD_SHED_MAX_CONCURRENT': 1, 'LOAD_SHED_WAIT_SECONDS': 0}
+        with mock.patch.multiple(load_shedding, **limits):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            response = client.get('/api/export/doctors.csv')
+            self.assertTrue(response.streaming)
+            probe = load_shedding.SlotPool(self.directory, 1)
+            self.assertIsNone(probe.acquire())  # the body hasn't been produced yet
+            b''.join(response.streaming_content)  # the test client closes the response at the end
+            slot = probe.acquire()
+            self.assertIsNotNone(slot)
+            probe.release(slot)
+
+
+
+class MetricsTests(TestCase):
+    """Every response carries Server-Timing, and /api/metrics/ renders the per-view histograms."""
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+
+    def test_server_timing(self):
+        Department.objects.create(name="Cardiology")
+        response = self.client.get('/api/departments/')
+        match = re.fullmatch(r'db;dur=[\d.]+;desc="(\d+) queries", total;dur=[\d.]+', response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertGreaterEqual(int(match[1]), 1)
+
+    def test_metrics_output(self):
+        self.client.get('/api/departments/')
+        self.client.get('/api/departments/')
+        self.client.generic('BREW', '/api/departments/')
+
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=User.objects.create_user('ops')).key}")
+        response = client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        labels = 'view="department-list",method="GET"'
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 2', body)
+        self.assertIn(f'db_queries_per_request_bucket{{{labels},le="+Inf"}} 2', body)
+        # Unknown methods share one label instead of adding a series each.
+        self.assertIn('http_request_duration_seconds_count{view="department-list",method="OTHER"} 1', body)
+        self.assertNotIn('BREW', body)
+
+
+class HttpCacheTests(TestCase):
+    """
+    Catalog responses are served from the cache with ETag/Last-Modified
+    revalidation, and a Doctor or Department save bumps the shared version.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Cardiology")
+        cls.doctor = Doctor.objects.create(
+            name="Cache Test", slug='cache-test', department=cls.department, photo='doctors/placeholder.png',
+            available_days='Monday',
+        )
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        self.addCleanup(caches['shared'].clear)
+
+    def _version(self):
+        return caches['shared'].get(http_cache._version_key('catalog'))
+
+    def test_etag_and_last_modified(self):
+        first = self.client.get('/api/doctors/')
+        self.assertEqual(first.status_code, 200)
+        etag, last_modified = first['ETag'], first['Last-Modified']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/doctors/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(self.client.get('/api/doctors/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+            cached = self.client.get('/api/doctors/')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(cached.json(), first.json())
+        self.assertEqual(self.client.get('/api/doctors/', HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_doctor_save_invalidates(self):
+        etag = self.client.get('/api/doctors/')['ETag']
+        version = self._version()
+        self.assertIsNotNone(version)
+        self.doctor.name = "Cache Renamed"
+        self.doctor.save()
+        self.assertNotEqual(self._version(), version)
+        response = self.client.get('/api/doctors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([doctor['name'] for doctor in response.json()], ["Cache Renamed"])
+
+    def test_department_save_invalidates(self):
+        self.client.get('/api/departments/')
+        self.client.get('/api/doctors/')
+        self.department.name = "Heart Care"
+        self.department.save()
+        self.assertEqual([row['name'] for row in self.client.get('/api/departments/').json()], ["Heart Care"])
+        self.assertEqual(self.client.get('/api/doctors/').json()[0]['department_name'], "Heart Care")
+
+    def test_scheme_is_part_of_the_key(self):
+        plain = self.client.get('/api/doctors/').json()[0]['photo_url']
+        secure = self.client.get('/api/doctors/', secure=True).json()[0]['photo_url']
+        self.assertTrue(plain.startswith('http://'))
+        self.assertTrue(secure.startswith('https://'))
+
+
+class AnalyticsRollupTests(TestCase):
+    """
+    Every write path keeps the daily rollups equal to what rebuild()
+    recomputes from the tables, and report() gets the rates right.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cardiology = Department.objects.create(name="Cardiology")
+        cls.neurology = Department.objects.create(name="Neurology")
+        cls.doctor = Doctor.objects.create(
+            name="Rollup Test", slug='rollup-test', department=cls.cardiology, photo='doctors/placeholder.png',
+            available_days='Monday', slot_capacity=10,
+        )
+        cls.other = Doctor.objects.create(
+            name="Rollup Other", slug='rollup-other', department=cls.neurology, photo='doctors/placeholder.png',
+            available_days='Monday', slot_capacity=10,
+        )
+        cls.day = date(2026, 3, 2)
+
+    def _book(self, status='Pending', day=None, doctor=None, **fields):
+        doctor = doctor or self.doctor
+        with self.captureOnCommitCallbacks(execute=True):
+            return Appointment.objects.create(
+                patient_name="Patient", phone='9999999999', department=doctor.department, doctor=doctor,
+                date=day or self.day, time=time(10, 0), status=status,
+                seat=None if status == 'Cancelled' else Appointment.objects.count() + 1, **fields,
+            )
+
+    def _rollups(self):
+        return {
+            (row.date, row.department_id, row.doctor_id, row.status): row.count
+            for row in AppointmentDailyRollup.objects.exclude(count=0)
+        }
+
+    def assertMatchesRebuild(self):
+        stored = self._rollups()
+        analytics.rebuild(self.day - timedelta(days=30), self.day + timedelta(days=30))
+        self.assertEqual(stored, self._rollups())
+
+    def test_create_status_change_reschedule_delete(self):
+        appointment = self._book()
+        self.assertEqual(self._rollups(), {(self.day, self.cardiology.pk, self.doctor.pk, 'Pending'): 1})
+        self.assertMatchesRebuild()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.status = 'Confirmed'
+            appointment.save()
+        self.assertMatchesRebuild()
+
+        # A partially loaded instance: the deferred fields count as unchanged.
+        with self.captureOnCommitCallbacks(execute=True):
+            partial = Appointment.objects.only('id', 'status').get(pk=appointment.pk)
+            partial.status = 'Completed'
+            partial.save(update_fields=['status'])
+        self.assertMatchesRebuild()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = Appointment.objects.get(pk=appointment.pk)
+            appointment.date = self.day + timedelta(days=7)
+            appointment.doctor, appointment.department = self.other, self.neurology
+            appointment.save()
+        moved = (self.day + timedelta(days=7), self.neurology.pk, self.other.pk, 'Completed')
+        self.assertEqual(self._rollups(), {moved: 1})
+        self.assertMatchesRebuild()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+        self.assertEqual(self._rollups(), {})
+        self.assertMatchesRebuild()
+
+    def test_bulk_transition(self):
+        booked = [self._book(day=self.day + timedelta(days=i % 2)) for i in range(4)]
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.bulk_transition([a.pk for a in booked[:3]], 'Confirmed')
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.bulk_transition([a.pk for a in booked], 'Cancelled')
+        self.assertEqual(sum(self._rollups().values()), 4)
+        self.assertMatchesRebuild()
+
+    def test_bulk_import(self):
+        self._book()
+        rows = [
+            (i, {
+                'patient_name': f"Imported {i}", 'phone': '9888888888', 'department': doctor.department_id,
+                'doctor': doctor.pk, 'date': (self.day + timedelta(days=i % 3)).isoformat(), 'time': '11:00',
+                'status': status,
+            })
+            for i, (doctor, status) in enumerate(
+                [(self.doctor, 'Completed'), (self.other, 'Cancelled'), (self.doctor, 'Pending')] * 3, start=1,
+            )
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            report = exports.AppointmentImporter(batch_size=4).run(rows)
+        self.assertEqual(report['created'], 9)
+        self.assertEqual(sum(self._rollups().values()), 10)
+        self.assertMatchesRebuild()
+
+    def test_command_rejects_impossible_date(self):
+        with self.assertRaisesMessage(CommandError, "Invalid date '2026-02-30'"):
+            call_command('rebuild_analytics', date_from='2026-02-30', stdout=io.StringIO())
+
+    def test_report_rates(self):
+        today = self.day + timedelta(days=5)
+        for status in ('Completed', 'Completed', 'Pending', 'Confirmed', 'Cancelled'):
+            self._book(status=status)
+        self._book(status='Pending', day=today + timedelta(days=1))
+        self._book(status='Cancelled', day=today + timedelta(days=1))
+
+        totals = analytics.report(self.day, today + timedelta(days=1), today=today)['totals']
+        self.assertEqual(totals['appointments'], 7)
+        self.assertEqual(totals['by_status'], {'Pending': 2, 'Confirmed': 1, 'Completed': 2, 'Cancelled': 2})
+        self.assertEqual(totals['cancellation_rate'], round(2 / 7, 4))
+        # Past, not cancelled: 2 Completed + 2 still open; upcoming ones are not no-shows yet.
+        self.assertEqual(totals['no_shows'], 2)
+        self.assertEqual(totals['no_show_rate'], 0.5)
+
+        empty = analytics.report(today + timedelta(days=10), today + timedelta(days=10), today=today)['totals']
+        self.assertEqual((empty['appointments'], empty['cancellation_rate'], empty['no_show_rate']), (0, None, None))
+
+
+class DoctorSearchTests(TestCase):
+    """/api/search/doctors/ ranks fuzzy matches and its index follows committed doctor writes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gynecology = Department.objects.create(name="Gynecology")
+        cls.orthopedics = Department.objects.create(name="Orthopedics")
+        doctors = {}
+        for name, department, degrees, order in [
+            ("Dr. Meera Shah", cls.gynecology, "MBBS, MD - Obstetrics", 1),
+            ("Dr. Anil Rao", cls.orthopedics, "MBBS, MS - Orthopaedics", 2),
+            ("Dr. Kiran Patel", cls.orthopedics, "MBBS, MD", 3),
+        ]:
+            doctors[name] = Doctor.objects.create(
+                name=name, department=department, degrees=degrees, display_order=order,
+                photo='doctors/placeholder.png', available_days='Monday',
+            )
+        cls.shah, cls.rao, cls.patel = doctors.values()
+
+    def setUp(self):
+        cache.clear()
+        search.invalidate()
+        self.addCleanup(search.invalidate)
+
+    def _names(self, query):
+        response = self.client.get('/api/search/doctors/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [doctor['name'] for doctor in response.json()]
+
+    def test_doctor_slugged_search_is_reachable(self):
+        doctor = Doctor.objects.create(
+            name="Search", slug='search', department=self.gynecology, photo='doctors/placeholder.png',
+            available_days='Monday',
+        )
+        response = self.client.get('/api/doctors/search/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], doctor.pk)
+
+    def test_ranking(self):
+        # Matching both words beats matching one; a name match outweighs a degree match.
+        self.assertEqual(self._names("md ortho")[0], "Dr. Kiran Patel")
+        self.assertEqual(self._names("rao mbbs")[0], "Dr. Anil Rao")
+        # Equal scores fall back to display_order.
+        self.assertEqual(self._names("mbbs"), ["Dr. Meera Shah", "Dr. Anil Rao", "Dr. Kiran Patel"])
+        self.assertEqual(self.client.get('/api/search/doctors/', {'q': ' '}).status_code, 400)
+
+    def test_trigram_matching(self):
+        self.assertEqual(self._names("gynec"), ["Dr. Meera Shah"])       # prefix
+        self.assertEqual(self._names("gynaecology"), ["Dr. Meera Shah"])  # misspelling
+        self.assertEqual(self._names("M.D."), ["Dr. Meera Shah", "Dr. Kiran Patel"])
+        self.assertEqual(self._names("xyzzy"), [])
+
+    def test_reindex_on_save_and_delete(self):
+        self.assertEqual(self._names("meera"), ["Dr. Meera Shah"])
+
+        # Nothing changes until the write commits.
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.shah.name = "Dr. Priya Shah"
+            self.shah.save()
+        self.assertEqual(self._names("priya"), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._names("priya"), ["Dr. Priya Shah"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.orthopedics.name = "Spine"
+            self.orthopedics.save()
+        self.assertEqual(self._names("spine"), ["Dr. Anil Rao", "Dr. Kiran Patel"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rao.active = False
+            self.rao.save()
+        self.assertEqual(self._names("spine"), ["Dr. Kiran Patel"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patel.delete()
+        self.assertEqual(self._names("spine"), [])
+
+
+class StatCounterTests(TestCase):
+    """The /api/stats/ counters follow every write, and reconcile_stats repairs drift."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Cardiology")
+        cls.doctor = Doctor.objects.create(
+            name="Dr. Counter", department=cls.department, photo='doctors/placeholder.png', available_days='Monday',
+        )
+
+    def setUp(self):
+        # setUpTestData's writes committed no callbacks; start from exact totals.
+        stats.reconcile()
+
+    def assertCountersExact(self):
+        self.assertEqual(stats.read_all(), stats.compute_actual())
+
+    def _book(self, hour):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Appointment.objects.create(
+                patient_name="Patient", phone='9000000000', department=self.department, doctor=self.doctor,
+                date=date(2026, 3, 2), time=time(hour, 0),
+            )
+
+    def test_create(self):
+        self._book(9)
+        self._book(10)
+        with self.captureOnCommitCallbacks(execute=True):
+            Doctor.objects.create(
+                name="Dr. Second", department=self.department, photo='doctors/placeholder.png', available_days='Monday',
+            )
+        self.assertCountersExact()
+        response = self.client.get('/api/stats/').json()
+        self.assertEqual(
+            (response['total_departments'], response['total_doctors'], response['total_appointments']), (1, 2, 2),
+        )
+        self.assertEqual(response['appointments_by_status']['Pending'], 2)
+
+    def test_status_change(self):
+        appointment = self._book(9)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.status = 'Confirmed'
+            appointment.save()
+        # Saving again without a change must not count twice.
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.bulk_transition([appointment.pk], 'Cancelled')
+        self.assertCountersExact()
+        counters = stats.read_all()
+        self.assertEqual(counters[stats.status_counter('Cancelled')], 1)
+        self.assertEqual(counters[stats.status_counter('Confirmed')], 0)
+
+    def test_delete(self):
+        appointment = self._book(9)
+        self._book(10)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+        self.assertCountersExact()
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor.delete()
+        self.assertCountersExact()
+        counters = stats.read_all()
+        self.assertEqual((counters[stats.APPOINTMENTS], counters[stats.DOCTORS]), (0, 0))
+
+    def test_reconcile_fixes_drift(self):
+        self._book(9)
+        # Queryset updates bypass the signals.
+        Appointment.objects.update(status='Completed')
+        StatCounter.objects.filter(name=stats.DOCTORS).update(value=7)
+        out = io.StringIO()
+        call_command('reconcile_stats', stdout=out)
+        self.assertIn("doctors: 7 -> 1", out.getvalue())
+        self.assertIn("appointments:Completed: 0 -> 1", out.getvalue())
+        self.assertCountersExact()
+
+        out = io.StringIO()
+        call_command('reconcile_stats', stdout=out)
+        self.assertIn("All counters are accurate.", out.getvalue())
+
+
+class AvailabilityTests(TestCase):
+    """The compiled slot bitmaps, and the free slots /api/doctors/<slug>/availability/ offers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Cardiology")
+        cls.doctor = Doctor.objects.create(
+            name="Dr. Slots", slug='dr-slots', department=cls.department, photo='doctors/placeholder.png',
+            available_days='Monday, wed', start_time=time(9, 0), end_time=time(10, 10),
+            weekday_hours={'Wednesday': ['14:00', '15:00']}, slot_capacity=2,
+        )
+        tomorrow = date.today() + timedelta(days=1)
+        cls.monday = tomorrow + timedelta(days=-tomorrow.weekday() % 7)
+
+    def setUp(self):
+        cache.clear()
+
+    def _get(self, slug='dr-slots', **params):
+        return self.client.get(f'/api/doctors/{slug}/availability/', params)
+
+    def _monday_slots(self):
+        days = {day['date']: day['slots'] for day in self._get(days=7).json()['days']}
+        return days[self.monday.isoformat()]
+
+    def _book(self, at, seat, status='Pending'):
+        return Appointment.objects.create(
+            patient_name="Patient", phone='9000000000', department=self.department, doctor=self.doctor,
+            date=self.monday, time=at, seat=seat, status=status,
+        )
+
+    def test_slot_bitmap(self):
+        self.assertEqual(self.doctor.weekday_mask, 0b101)
+        monday = availability.compile_schedule(self.doctor, 0)
+        # 70 minutes of 15-minute slots: the fifth starts at 10:00, before the 10:10 end.
+        self.assertEqual((monday.start_time, monday.slot_count, monday.day_mask), (time(9, 0), 5, 0b11111))
+        self.assertEqual(availability.slot_index(monday, time(9, 14)), 0)
+        self.assertEqual(availability.slot_index(monday, time(10, 5)), 4)
+        self.assertIsNone(availability.slot_index(monday, time(10, 15)))
+        self.assertIsNone(availability.slot_index(monday, time(8, 59)))
+        self.assertEqual(availability.slot_time(monday, 3), time(9, 45))
+
+        wednesday = availability.compile_schedule(self.doctor, 2)
+        self.assertEqual((wednesday.start_time, wednesday.slot_count), (time(14, 0), 4))
+        self.assertTrue(availability.works_on(wednesday, self.monday + timedelta(days=2)))
+        self.assertFalse(availability.works_on(wednesday, self.monday + timedelta(days=1)))
+
+    def test_working_days_and_hours(self):
+        payload = self._get(days=7).json()
+        self.assertFalse(payload['by_appointment_only'])
+        # Any 7 days hold one Monday and one Wednesday, in date order.
+        self.assertEqual(sorted(day['weekday'] for day in payload['days']), ['Monday', 'Wednesday'])
+        self.assertLess(payload['days'][0]['date'], payload['days'][1]['date'])
+        by_weekday = {day['weekday']: day['slots'] for day in payload['days']}
+        self.assertEqual(by_weekday['Monday'], ['09:00', '09:15', '09:30', '09:45', '10:00'])
+        self.assertEqual(by_weekday['Wednesday'], ['14:00', '14:15', '14:30', '14:45'])
+
+    def test_capacity_and_cancelled_bookings(self):
+        self._book(time(9, 0), 1)
+        self.assertIn('09:00', self._monday_slots())  # one seat of two left
+        self._book(time(9, 0), 2)
+        self.assertNotIn('09:00', self._monday_slots())
+
+        self._book(time(9, 30), 1)
+        held = self._book(time(9, 30), 2)
+        self.assertNotIn('09:30', self._monday_slots())
+        held.status = 'Cancelled'
+        held.save()
+        self.assertIn('09:30', self._monday_slots())
+
+        # A booking outside the doctor's hours takes no slot.
+        self._book(time(11, 0), 1)
+        self._book(time(11, 0), 2)
+        self.assertEqual(self._monday_slots(), ['09:15', '09:30', '09:45', '10:00'])
+
+    def test_days_bounds(self):
+        everyday = Doctor.objects.create(
+            name="Dr. Daily", slug='dr-daily', department=self.department, photo='doctors/placeholder.png',
+            available_days='Monday,Tuesday,Wednesday,Thursday,Friday,Saturday,Sunday',
+            start_time=time(9, 0), end_time=time(10, 0),
+        )
+        self.assertEqual(len(self._get(everyday.slug).json()['days']), 14)
+        for days, expected in [(0, 1), (-3, 1), (5, 5), (1000, availability.MAX_AVAILABILITY_DAYS)]:
+            payload = self._get(everyday.slug, days=days).json()
+            self.assertEqual(len(payload['days']), expected, days)
+        self.assertEqual(payload['days'][0]['date'], (date.today() + timedelta(days=1)).isoformat())
+        self.assertEqual(self._get(everyday.slug, days='two').status_code, 400)
+        self.assertEqual(self._get('no-such-doctor').status_code, 404)
+
+    def test_by_appointment_only(self):
+        Doctor.objects.create(
+            name="Dr. Call", slug='dr-call', department=self.department, photo='doctors/placeholder.png',
+            available_days='By appointment',
+        )
+        payload = self._get('dr-call').json()
+        self.assertEqual((payload['by_appointment_only'], payload['days']), (True, []))
+
+
+class SitemapTests(TestCase):
+    """/sitemap.xml lists the static pages and active doctors, split into id-ranged pages past the chunk size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Cardiology")
+        cls.doctors = [
+            Doctor.objects.create(
+                name=f"Dr. Map {i}", slug=f'dr-map-{i}', department=department, photo='doctors/placeholder.png',
+                available_days='Monday', active=i != 3,
+            )
+            for i in range(10)
+        ]
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.addCleanup(caches['shared'].clear)
+
+    def _get(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/xml')
+        return b''.join(response.streaming_content if response.streaming else [response.content]).decode()
+
+    def _doctor_slugs(self, body):
+        return re.findall(r'/doctor-profile/([\w-]+)</loc>', body)
+
+    def test_single_document(self):
+        body = self._get('/sitemap.xml')
+        self.assertEqual(body.count('<url>'), len(sitemaps.STATIC_PAGES) + 9)
+        self.assertEqual(self._doctor_slugs(body), [f'dr-map-{i}' for i in range(10) if i != 3])
+        self.assertEqual(self.client.get('/sitemap-1.xml').status_code, 404)
+
+    def test_index_and_pages(self):
+        with mock.patch.object(sitemaps, 'SITEMAP_CHUNK_SIZE', 6):
+            # 5 static pages + 9 doctors: 1 + 6 + 2 doctors over three pages.
+            index = self._get('/sitemap.xml')
+            self.assertIn('<sitemapindex', index)
+            self.assertEqual(
+                re.findall(r'<loc>http://testserver(/sitemap-\d+\.xml)</loc>', index),
+                ['/sitemap-1.xml', '/sitemap-2.xml', '/sitemap-3.xml'],
+            )
+            pages = [self._get(f'/sitemap-{page}.xml') for page in (1, 2, 3)]
+            self.assertEqual([page.count('<url>') for page in pages], [6, 6, 2])
+            self.assertIn('<loc>https://', pages[0])
+            slugs = [slug for page in pages for slug in self._doctor_slugs(page)]
+            self.assertEqual(slugs, [f'dr-map-{i}' for i in range(10) if i != 3])
+            self.assertEqual(self.client.get('/sitemap-4.xml').status_code, 404)
+
+            # Pages are read by id range, not OFFSET.
+            caches['shared'].clear()
+            sitemaps.page_ends()
+            with CaptureQueriesContext(connection) as queries:
+                self._get('/sitemap-3.xml')
+            self.assertFalse([q['sql'] for q in queries.captured_queries if 'OFFSET' in q['sql']])
+
+    def test_cached_until_a_doctor_changes(self):
+        self._get('/sitemap.xml')
+        with self.assertNumQueries(0):
+            self.assertFalse(self.client.get('/sitemap.xml').streaming)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctors[0].active = False
+            self.doctors[0].save()
+        self.assertNotIn('dr-map-0', self._doctor_slugs(self._get('/sitemap.xml')))
+
+
+class ImageVariantTests(TestCase):
+    """Photo variants are built once per upload and the ones a new upload replaces are deleted."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Cardiology")
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media = media.name
+
+    def _upload(self, color):
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 200), color).save(buffer, 'PNG')
+        return SimpleUploadedFile('portrait.png', buffer.getvalue(), content_type='image/png')
+
+    def _doctor(self, photo, name="Dr. Photo"):
+        return Doctor.objects.create(name=name, department=self.department, photo=photo, available_days='Monday')
+
+    def _exists(self, names):
+        return {os.path.exists(os.path.join(self.media, name)) for name in names}
+
+    def test_variants_use_stored_names(self):
+        doctor = self._doctor(self._upload('red'))
+        variants = Doctor.objects.get(pk=doctor.pk).photo_variants
+        self.assertEqual(variants['source'], doctor.photo.name)
+        self.assertEqual(sorted(variants['sizes']), ['160', '320'])
+        names = images.variant_names(variants)
+        self.assertEqual(len(names), 4)
+        self.assertEqual(self._exists(names), {True})
+        # HashedMediaStorage names carry the content hash.
+        self.assertTrue(all(re.search(r'-\d+w\.[0-9a-f]{12}\.(webp|jpg)$', name) for name in names), names)
+
+    def test_replacing_the_photo_deletes_old_variants(self):
+        doctor = self._doctor(self._upload('red'))
+        old = images.variant_names(doctor.photo_variants)
+        doctor.photo = self._upload('blue')
+        doctor.save()
+        new = images.variant_names(Doctor.objects.get(pk=doctor.pk).photo_variants)
+        self.assertFalse(old & new)
+        self.assertEqual(self._exists(old), {False})
+        self.assertEqual(self._exists(new), {True})
+
+    def test_shared_upload_keeps_its_variants(self):
+        first = self._doctor(self._upload('red'))
+        second = self._doctor(self._upload('red'), name="Dr. Twin")
+        self.assertEqual(first.photo.name, second.photo.name)
+        shared = images.variant_names(second.photo_variants)
+        first.photo = self._upload('blue')
+        first.save()
+        self.assertEqual(self._exists(shared), {True})
+
+    def test_missing_file_is_not_retried_on_every_save(self):
+        doctor = self._doctor('doctors/missing.png')
+        self.assertEqual(doctor.photo_variants, {'source': 'doctors/missing.png', 'sizes': {}})
+        with mock.patch.object(images, 'build_variants') as build, self.assertNumQueries(1):
+            doctor.name = "Dr. Renamed"
+            doctor.save(update_fields=['name'])
+        build.assert_not_called()
+        self.assertFalse(images.refresh_variants(doctor, 'photo', 'photo_variants', force=True))
@@ -0,0 +1,85 @@
+"""
+Token-bucket throttles for the public booking, listing and login endpoints.
+
+Each client gets a bucket of `num_requests` tokens (the DRF rate, e.g.
+'20/hour') that refills continuously at that rate, so short bursts are
+allowed but the sustained rate is capped. Buckets live in Django's default
+(local) cache. Rejected requests get a 429 with `Retry-After` set to the
+time until the next token. The client IP is REMOTE_ADDR; X-Forwarded-For is
+only believed up to REST_FRAMEWORK['NUM_PROXIES'] hops (0 by default), so a
+client cannot get a fresh bucket by sending a made-up header.
+
+Scopes (rates in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']):
+    booking        anonymous appointment POSTs, per client IP
+    booking_phone  appointment POSTs, per patient phone number
+    listing        anonymous appointment list GETs, per client IP
+    login          /api/login/ attempts, per client IP
+"""
+import re
+import threading
+
+from rest_framework.throttling import SimpleRateThrottle
+
+# LocMem is per process; this makes each bucket's read-modify-write atomic within it.
+_bucket_lock = threading.Lock()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """SimpleRateThrottle's scope/rate handling with a token bucket instead of a request log."""
+    anonymous_only = True
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
+
+    def get_cache_key(self, request, view):
+        if self.anonymous_only and request.user and request.user.is_authenticated:
+            return None
+        ident = self.get_ident_key(request)
+        if not ident:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        refill_per_second = self.num_requests / self.duration
+        with _bucket_lock:
+            tokens, stamp = self.cache.get(self.key, (self.num_requests, now))
+            tokens = min(self.num_requests, tokens + (now - stamp) * refill_per_second)
+            if tokens < 1:
+                self.retry_after = (1 - tokens) / refill_per_second
+                return False
+            # A bucket left alone for `duration` is full again, so it can expire then.
+            self.cache.set(self.key, (tokens - 1, now), self.duration)
+        return True
+
+    def wait(self):
+        return getattr(self, 'retry_after', None)
+
+
+class BookingRateThrottle(TokenBucketThrottle):
+    scope = 'booking'
+
+
+class BookingPhoneThrottle(TokenBucketThrottle):
+    scope = 'booking_phone'
+    anonymous_only = False
+
+    def get_ident_key(self, request):
+        # Last 10 digits, so "+91 98765-43210" and "9876543210" share a bucket.
+        digits = re.sub(r'\D', '', str(request.data.get('phone') or ''))
+        return digits[-10:]
+
+
+class ListingRateThrottle(TokenBucketThrottle):
+    scope = 'listing'
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    scope = 'login'
+    anonymous_only = False
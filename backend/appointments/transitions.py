@@ -0,0 +1,89 @@
+"""
+Bulk appointment status changes for the reception dashboard.
+
+`bulk_transition()` locks the requested rows in one SELECT ... FOR UPDATE,
+checks each one against ALLOWED_TRANSITIONS and moves every allowed row
+with a single UPDATE ... WHERE id IN (...), all in one transaction, so the
+query count does not grow with the number of appointments. The UPDATE skips
+the save signals, so their side effects are applied here once per batch:
+the /api/stats/ status counters, the /api/analytics/ rollups, the
+notification outbox events and the availability cache of each doctor
+involved. None of the allowed transitions re-activates a booking, so no
+seat ever has to be claimed (see appointments/booking.py); cancelling
+releases the seat.
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from . import analytics, availability, booking, notifications, outbox, stats
+from .models import Appointment
+
+ALLOWED_TRANSITIONS = {
+    'Pending': {'Confirmed', 'Cancelled'},
+    'Confirmed': {'Completed', 'Cancelled'},
+    'Completed': set(),
+    'Cancelled': set(),
+}
+MAX_BULK_TRANSITION = 500
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+NOT_ALLOWED = 'not_allowed'
+
+
+def _payload(row, target):
+    appointment = Appointment(pk=row['id'], **{field: row[field] for field in row if field != 'id'})
+    appointment.status = target
+    return notifications.appointment_payload(appointment, previous_status=row['status'])
+
+
+def bulk_transition(ids, target):
+    """
+    Moves the appointments in `ids` to `target` where the transition is
+    allowed. Returns one {'id', 'outcome', 'from'} dict per requested id, in
+    request order.
+    """
+    ids = list(dict.fromkeys(ids))
+    with transaction.atomic():
+        current = {
+            row['id']: row
+            for row in Appointment.objects.select_for_update().filter(pk__in=ids).values(
+                'id', 'date', 'time', 'department_id', 'doctor_id', 'status', 'patient_name', 'phone',
+            )
+        }
+        results = []
+        moving = []
+        for pk in ids:
+            row = current.get(pk)
+            if row is None:
+                results.append({'id': pk, 'outcome': NOT_FOUND, 'from': None})
+            elif row['status'] == target:
+                results.append({'id': pk, 'outcome': UNCHANGED, 'from': target})
+            elif target not in ALLOWED_TRANSITIONS.get(row['status'], ()):
+                results.append({'id': pk, 'outcome': NOT_ALLOWED, 'from': row['status']})
+            else:
+                results.append({'id': pk, 'outcome': UPDATED, 'from': row['status']})
+                moving.append(row)
+
+        if moving:
+            changes = {'status': target}
+            if not booking.is_active(target):
+                changes['seat'] = None  # as Appointment.save() does: a cancelled booking gives its seat back
+            Appointment.objects.filter(pk__in=[row['id'] for row in moving]).update(**changes)
+            # What the post_save signals would have done row by row.
+            for status, count in Counter(row['status'] for row in moving).items():
+                stats.bump(stats.status_counter(status), -count)
+            stats.bump(stats.status_counter(target), len(moving))
+            rollups = Counter()
+            for row in moving:
+                rollups[analytics.key_of(row)] -= 1
+                rollups[analytics.key_of(dict(row, status=target))] += 1
+            analytics.record_many(rollups)
+            outbox.enqueue_many(
+                (notifications.APPOINTMENT_STATUS_CHANGED, _payload(row, target)) for row in moving
+            )
+            for doctor_id in {row['doctor_id'] for row in moving}:
+                availability.invalidate_doctor(doctor_id)
+    return results
@@ -8,7 +8,6 @@ from .views import (
     AppointmentDetailView
 )
 from . import views
-from rest_framework.authtoken.views import obtain_auth_token  # <-- Add this
 
 urlpatterns = [
     # --- Department URLs ---
@@ -18,16 +17,33 @@ urlpatterns = [
     # --- Doctor URLs ---
     path('doctors/', DoctorListCreateView.as_view(), name='doctor-list'),
     path('doctors/<slug:slug>/', DoctorDetailView.as_view(), name='doctor-detail'),
+    path('doctors/<slug:slug>/availability/', views.doctor_availability, name='doctor-availability'),
+    path('doctors/<slug:slug>/schedule/', views.doctor_schedule, name='doctor-schedule'),
+    path('doctors/<slug:slug>/schedule/week/', views.doctor_week_schedule, name='doctor-week-schedule'),
+
+    # --- Search URLs ---
+    # Not under doctors/, where 'search' would shadow a doctor slugged "search".
+    path('search/doctors/', views.doctor_search, name='doctor-search'),
 
     # --- Appointment URLs ---
     path('appointments/', AppointmentListCreateView.as_view(), name='appointment-list'),
+    path('appointments/bulk-status/', views.bulk_appointment_status, name='appointment-bulk-status'),
     path('appointments/<int:pk>/', AppointmentDetailView.as_view(), name='appointment-detail'),
 
     # --- Stats URLs ---
+    path('stats/', views.stats_summary, name='stats'),
     path('department-count/', views.department_count, name='department-count'),
     path('total-doctors/', views.total_doctors, name='total-doctors'),
     path('total-appointments/', views.total_appointments, name='total-appointments'),
+    path('analytics/', views.appointment_analytics, name='analytics'),
+
+    # --- Bulk Export / Import URLs ---
+    path('export/appointments.<str:fmt>', views.export_appointments, name='export-appointments'),
+    path('export/doctors.<str:fmt>', views.export_doctors, name='export-doctors'),
+    path('import/<str:kind>.<str:fmt>', views.import_rows, name='import-rows'),
 
     # ✅ Token Login
-    path('login/', obtain_auth_token, name='api_token_auth'),  # <-- Add this line
+    path('login/', views.LoginView.as_view(), name='api_token_auth'),  # <-- Add this line
+    path('logout/', views.logout, name='api_token_logout'),
+    path('token/rotate/', views.rotate_auth_token, name='api_token_rotate'),
 ]
\ No newline at end of file
@@ -1,42 +1,110 @@
 from rest_framework import generics
 from .models import Department, Doctor, Appointment
-from .serializers import DepartmentSerializer, DoctorSerializer, AppointmentSerializer
+from .serializers import DepartmentSerializer, DoctorSerializer, AppointmentSerializer, BulkStatusSerializer
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import ValidationError
 from django.http import JsonResponse
 from django.conf import settings
+from django.utils.dateparse import parse_date
+from datetime import date, timedelta
+from .pagination import AppointmentCursorPagination
+from . import agenda, analytics, availability, exports, search, stats, transitions
+from .authentication import CachedTokenAuthentication, is_expired, rotate_token
+from .throttling import BookingPhoneThrottle, BookingRateThrottle, ListingRateThrottle, LoginRateThrottle
+from .http_cache import CachedResponseMixin
+from .idempotency import IdempotentCreateMixin
 
 # ✅ --- New Imports Added for Sitemap Functionality ---
-from django.http import HttpResponse
-from django.utils.xmlutils import SimplerXMLGenerator
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.views import View
+from django.views.decorators.http import require_safe
+from . import prerender, sitemaps
+
+def date_query_param(request, name):
+    """Optional ?name=YYYY-MM-DD query parameter as a date (400 if malformed)."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Use the YYYY-MM-DD format."})
+    return parsed
+
+def id_query_param(request, name):
+    """Optional ?name=<id> query parameter as an int (400 if it isn't one)."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValidationError({name: "Must be an id."})
+    return int(value)
 
 # --- Stats Views (PUBLIC) ---
+# Served from the StatCounter table (see appointments/stats.py) rather than COUNT(*).
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def stats_summary(request):
+    counters = stats.read_all()
+    return Response({
+        'total_departments': counters.get(stats.DEPARTMENTS, 0),
+        'total_doctors': counters.get(stats.DOCTORS, 0),
+        'total_appointments': counters.get(stats.APPOINTMENTS, 0),
+        'appointments_by_status': {
+            status: counters.get(stats.status_counter(status), 0)
+            for status, _label in Appointment.STATUS_CHOICES
+        },
+    })
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def department_count(request):
-    count = Department.objects.count()
+    count = stats.read_all().get(stats.DEPARTMENTS, 0)
     return Response({"total_departments": count})
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def total_doctors(request):
-    count = Doctor.objects.count()
+    count = stats.read_all().get(stats.DOCTORS, 0)
     return Response({'total_doctors': count})
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def total_appointments(request):
-    count = Appointment.objects.count()
+    count = stats.read_all().get(stats.APPOINTMENTS, 0)
     return Response({'total_appointments': count})
 
+# --- Analytics (ADMIN) ---
+# Served from the daily rollups (see appointments/analytics.py), never from raw appointment rows.
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def appointment_analytics(request):
+    date_to = date_query_param(request, 'date_to') or date.today()
+    date_from = date_query_param(request, 'date_from') or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise ValidationError({'date_from': "Must not be after date_to."})
+    if (date_to - date_from).days >= analytics.MAX_ANALYTICS_DAYS:
+        raise ValidationError({'date_from': f"The range can span at most {analytics.MAX_ANALYTICS_DAYS} days."})
+    filters = {}
+    for param in ('department', 'doctor'):
+        value = id_query_param(request, param)
+        if value:
+            filters[f'{param}_id'] = value
+    return Response(analytics.report(date_from, date_to, **filters))
+
 # --- Department Views ---
-class DepartmentListCreateView(generics.ListCreateAPIView):
+class DepartmentListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
+    cache_group = 'catalog'
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def get_queryset(self):
         return Department.objects.all()
@@ -49,13 +117,14 @@ class DepartmentListCreateView(generics.ListCreateAPIView):
 class DepartmentDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
 # --- Doctor Views ---
-class DoctorListCreateView(generics.ListCreateAPIView):
+class DoctorListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
+    cache_group = 'catalog'
     serializer_class = DoctorSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def get_queryset(self):
         # ✅ Cleaned up: No more hardcoded case annotations. 
@@ -66,10 +135,19 @@ class DoctorListCreateView(generics.ListCreateAPIView):
             'name'
         )
 
-        dept_id = self.request.query_params.get('department')
+        dept_id = id_query_param(self.request, 'department')
         if dept_id:
             queryset = queryset.filter(department_id=dept_id)
 
+        # ?available_on=thursday (or a YYYY-MM-DD date): active doctors consulting that day.
+        available_on = self.request.query_params.get('available_on')
+        if available_on:
+            weekday = availability.parse_weekday(available_on)
+            if weekday is None:
+                day = date_query_param(self.request, 'available_on')
+                weekday = day.weekday()
+            queryset = queryset.available_on(weekday)
+
         return queryset
 
     def get_permissions(self):
@@ -77,10 +155,11 @@ class DoctorListCreateView(generics.ListCreateAPIView):
             return [AllowAny()]
         return [IsAuthenticated()]
 
-class DoctorDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DoctorDetailView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
+    cache_group = 'catalog'
     queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     lookup_field = 'slug'
 
     def get_permissions(self):
@@ -88,22 +167,203 @@ class DoctorDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [AllowAny()]
         return [IsAuthenticated()]
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def doctor_availability(request, slug):
+    """
+    Free booking slots for the next ?days= days (default 14, max 60), so the
+    booking form can offer only valid times instead of failing on POST.
+    """
+    doctor = generics.get_object_or_404(Doctor, slug=slug)
+    try:
+        days = int(request.query_params.get('days', 14))
+    except ValueError:
+        raise ValidationError({'days': "Must be a whole number."})
+    return Response(availability.get_availability(doctor, days=days))
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def doctor_schedule(request, slug):
+    """
+    Every slot of the doctor's hours on ?date= (default today) with the
+    appointments booked into it; see appointments/agenda.py.
+    """
+    doctor = generics.get_object_or_404(Doctor, slug=slug)
+    day = date_query_param(request, 'date') or date.today()
+    return Response(agenda.get_agenda(doctor, day))
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def doctor_week_schedule(request, slug):
+    """The same for the Monday-to-Sunday week containing ?date= (default today)."""
+    doctor = generics.get_object_or_404(Doctor, slug=slug)
+    day = date_query_param(request, 'date') or date.today()
+    return Response(agenda.get_agenda(doctor, agenda.week_start(day), days=7))
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def doctor_search(request):
+    """
+    Ranked fuzzy search over active doctors' name, degrees, description and
+    department (see appointments/search.py); ?limit= defaults to 20, max 50.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        raise ValidationError({'q': "Enter a name, speciality or degree to search for."})
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+    except ValueError:
+        raise ValidationError({'limit': "Must be a whole number."})
+    hits = search.search_doctors(query, limit)
+    doctors = Doctor.objects.select_related('department').in_bulk([doctor_id for doctor_id, _score in hits])
+    ranked = [doctors[doctor_id] for doctor_id, _score in hits if doctor_id in doctors]
+    return Response(DoctorSerializer(ranked, many=True, context={'request': request}).data)
+
 # --- Appointment Views ---
-class AppointmentListCreateView(generics.ListCreateAPIView):
-    queryset = Appointment.objects.all().order_by('-date', '-time')
+class AppointmentListCreateView(IdempotentCreateMixin, generics.ListCreateAPIView):
     serializer_class = AppointmentSerializer
+    pagination_class = AppointmentCursorPagination
+
+    def get_queryset(self):
+        # Keyset pagination re-applies the (-date, -time, -id) ordering; every
+        # filter below is covered by an index so each page is a range scan.
+        queryset = Appointment.objects.all()
+        params = self.request.query_params
+
+        status = params.get('status')
+        if status:
+            if status not in dict(Appointment.STATUS_CHOICES):
+                raise ValidationError({'status': f"Must be one of {', '.join(dict(Appointment.STATUS_CHOICES))}."})
+            queryset = queryset.filter(status=status)
+
+        doctor_id = id_query_param(self.request, 'doctor')
+        if doctor_id:
+            queryset = queryset.filter(doctor_id=doctor_id)
+
+        dept_id = id_query_param(self.request, 'department')
+        if dept_id:
+            queryset = queryset.filter(department_id=dept_id)
+
+        date_from = date_query_param(self.request, 'date_from')
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+
+        date_to = date_query_param(self.request, 'date_to')
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+
+        return queryset
 
     def get_permissions(self):
         if self.request.method in ["GET", "POST"]:
             return [AllowAny()]
         return [IsAuthenticated()]
 
+    def get_throttles(self):
+        if self.request.method == "POST":
+            return [BookingRateThrottle(), BookingPhoneThrottle()]
+        return [ListingRateThrottle()]
+
 class AppointmentDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+@api_view(['POST'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def bulk_appointment_status(request):
+    """
+    {"ids": [...], "status": "Confirmed"}: moves every listed appointment
+    whose current status allows it (Pending -> Confirmed -> Completed, or
+    -> Cancelled) in one transaction, with the outcome of each id.
+    """
+    serializer = BulkStatusSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    target = serializer.validated_data['status']
+    results = transitions.bulk_transition(serializer.validated_data['ids'], target)
+    return Response({
+        'status': target,
+        'updated': sum(1 for result in results if result['outcome'] == transitions.UPDATED),
+        'results': results,
+    })
+
+# --- Bulk Export / Import (ADMIN) ---
+EXPORT_CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+def _export_response(rows, fields, fmt, filename):
+    if fmt not in exports.FORMATS:
+        raise Http404("Unsupported export format.")
+    response = StreamingHttpResponse(
+        exports.stream_rows(rows, fields, fmt),
+        content_type=EXPORT_CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def export_appointments(request, fmt):
+    rows = exports.appointment_export_rows(
+        date_from=date_query_param(request, 'date_from'),
+        date_to=date_query_param(request, 'date_to'),
+        include_archived=request.query_params.get('include_archived') in ('1', 'true'),
+    )
+    return _export_response(rows, exports.APPOINTMENT_FIELDS, fmt, 'appointments')
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def export_doctors(request, fmt):
+    return _export_response(exports.doctor_export_rows(), exports.DOCTOR_FIELDS, fmt, 'doctors')
+
+@api_view(['POST'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def import_rows(request, kind, fmt):
+    """
+    Bulk import from an uploaded CSV/JSONL file (multipart field `file`).
+    Valid rows are created in batches; the response lists rejected lines.
+    """
+    if kind not in exports.IMPORTERS or fmt not in exports.FORMATS:
+        raise Http404("Unsupported import.")
+    upload = request.FILES.get('file')
+    if upload is None:
+        raise ValidationError({'file': "Upload a CSV or JSONL file."})
+    importer = exports.IMPORTERS[kind]()
+    return Response(importer.run(exports.read_records(upload, fmt)))
+
+# --- Auth Views ---
+class LoginView(ObtainAuthToken):
+    """obtain_auth_token, except that an expired token is replaced instead of handed back."""
+    authentication_classes = []  # a stale Authorization header must not block logging in again
+    throttle_classes = [LoginRateThrottle]
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        token, created = Token.objects.get_or_create(user=user)
+        if not created and is_expired(token):
+            token = rotate_token(user)
+        return Response({'token': token.key})
+
+@api_view(['POST'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def logout(request):
+    request.auth.delete()
+    return Response(status=204)
+
+@api_view(['POST'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def rotate_auth_token(request):
+    return Response({'token': rotate_token(request.user).key})
+
 def db_check(request):
     return JsonResponse(settings.DATABASES)
 
@@ -112,50 +372,61 @@ class DynamicSitemapView(View):
     """
     Generates a real-time sitemap.xml.
     When a doctor is added to the database, they instantly appear here.
+    Rendering is streamed and cached until a doctor changes; large sites get
+    a sitemap index with numbered child sitemaps (see appointments/sitemaps.py).
     """
-    def get(self, request, *args, **kwargs):
-        # The base URL of your React Frontend on GoDaddy
-        domain = "https://mallikahospital.co.in" 
-        
-        response = HttpResponse(content_type='application/xml')
-        xml = SimplerXMLGenerator(response, encoding='utf-8')
-        xml.startDocument()
-        xml.startElement('urlset', {
-            'xmlns': 'http://www.sitemaps.org/schemas/sitemap/0.9'
-        })
-        
-        # 1. Add Static Pages (manually defined main routes)
-        static_pages = ['/', '/about-us', '/contact', '/testimonial', '/find-doctor']
-        for page in static_pages:
-            xml.startElement('url', {})
-            xml.startElement('loc', {})
-            xml.characters(f"{domain}{page}")
-            xml.endElement('loc')
-            xml.startElement('changefreq', {})
-            xml.characters('daily')
-            xml.endElement('changefreq')
-            xml.startElement('priority', {})
-            xml.characters('0.8')
-            xml.endElement('priority')
-            xml.endElement('url')
-            
-        # 2. AUTOMATICALLY Add Active Doctor Profile Pages
-        # Fetches live data; immediate update on dashboard save
-        doctors = Doctor.objects.filter(active=True)
-        for doctor in doctors:
-            xml.startElement('url', {})
-            xml.startElement('loc', {})
-            # Maps frontend URL structure to live doctor slug
-            xml.characters(f"{domain}/doctor-profile/{doctor.slug}")
-            xml.endElement('loc')
-            xml.startElement('changefreq', {})
-            xml.characters('weekly')
-            xml.endElement('changefreq')
-            xml.startElement('priority', {})
-            xml.characters('0.9') # Priority hint for search engines
-            xml.endElement('priority')
-            xml.endElement('url')
-            
-        xml.endElement('urlset')
-        xml.endDocument()
-        return response
\ No newline at end of file
+    def get(self, request, page=None, *args, **kwargs):
+        pages = sitemaps.chunk_count()
+        if page is None and pages > 1:
+            name = f"index:{request.get_host()}"
+            body = sitemaps.sitemap_index(request, pages)
+        elif page is None:
+            name = "all"
+            body = sitemaps.urlset()
+        elif 1 <= page <= pages and pages > 1:
+            name = f"page:{page}"
+            body = sitemaps.urlset(page)
+        else:
+            raise Http404("No such sitemap page.")
+
+        cached = sitemaps.cached_document(name)
+        if cached is not None:
+            return HttpResponse(cached, content_type='application/xml')
+        return StreamingHttpResponse(sitemaps.caching_stream(name, body), content_type='application/xml')
+
+# --- SPA pages: precompressed index.html, with the API payload inlined where we can (see appointments/prerender.py) ---
+@require_safe
+def spa_shell(request):
+    return prerender.page_response(request, prerender.shell_page())
+
+@require_safe
+def doctor_profile_page(request, slug):
+    def build(shell):
+        url = request.build_absolute_uri(f'/doctor-profile/{slug}')
+        doctor = Doctor.objects.select_related('department').filter(slug=slug).first()
+        if doctor is None:
+            meta = prerender.meta_tags(f"Doctor not found | {prerender.SITE_NAME}", "This doctor profile does not exist.", url)
+            return prerender.render_page(meta, None, shell), 404
+        data = DoctorSerializer(doctor, context={'request': request}).data
+        meta = prerender.meta_tags(
+            f"Dr. {doctor.name} - {doctor.department.name} | {prerender.SITE_NAME}",
+            prerender.doctor_description(data), url, data['photo_url'],
+        )
+        return prerender.render_page(meta, {f'/api/doctors/{slug}/': data}, shell), 200
+
+    return prerender.cached_page(request, build)
+
+@require_safe
+def find_doctor_page(request):
+    def build(shell):
+        doctors = Doctor.objects.select_related('department').order_by('department__name', 'display_order', 'name')
+        meta = prerender.meta_tags(
+            f"Find a Doctor | {prerender.SITE_NAME}",
+            "Browse Mallika Hospital's specialists by department, see their consultation days and book an appointment online.",
+            request.build_absolute_uri('/find-doctor'),
+        )
+        # What component/Doctor/doctor.jsx would fetch first; it builds its department filter from these rows.
+        initial_data = {'/api/doctors/': DoctorSerializer(doctors, many=True, context={'request': request}).data}
+        return prerender.render_page(meta, initial_data, shell), 200
+
+    return prerender.cached_page(request, build)
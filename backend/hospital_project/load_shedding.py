@@ -0,0 +1,102 @@
+"""
+Early load shedding for API requests.
+
+Every request a worker serves holds one database connection, so the number
+of in-flight API requests on the host is the number of connections the site
+has open against its MySQL user limit. Passenger runs several
+single-threaded worker processes, so the cap has to be shared between them:
+`SlotPool` is a semaphore of LOAD_SHED_MAX_CONCURRENT lock files in
+LOAD_SHED_LOCK_DIR, and a request holds an exclusive `flock` on one of them
+while it runs. The kernel drops the lock when the file is closed or the
+process dies, so a crashed worker never leaks a slot.
+
+`LoadSheddingMiddleware` answers a request that cannot get a slot within
+LOAD_SHED_WAIT_SECONDS straight away with 503 and `Retry-After`, before it
+reaches a view or the database, instead of queueing it behind a saturated
+pool. A streaming response (the CSV/JSONL exports) produces its body, and
+runs the queries behind it, after the middleware has returned, so its slot
+is held until the server closes the response. Without fcntl (Windows) the
+middleware switches itself off.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; load shedding is then disabled
+    fcntl = None
+
+LOAD_SHED_MAX_CONCURRENT = getattr(settings, 'LOAD_SHED_MAX_CONCURRENT', 8)
+LOAD_SHED_WAIT_SECONDS = getattr(settings, 'LOAD_SHED_WAIT_SECONDS', 0.25)
+LOAD_SHED_RETRY_AFTER = getattr(settings, 'LOAD_SHED_RETRY_AFTER', 5)
+LOAD_SHED_PATHS = getattr(settings, 'LOAD_SHED_PATHS', ('/api/',))
+LOAD_SHED_LOCK_DIR = getattr(settings, 'LOAD_SHED_LOCK_DIR', os.path.join(settings.BASE_DIR, '.cache', 'load-shed'))
+POLL_SECONDS = 0.01
+
+
+class SlotPool:
+    """`size` slots shared by every process that uses the same `directory`."""
+
+    def __init__(self, directory, size):
+        os.makedirs(directory, exist_ok=True)
+        self.paths = [os.path.join(directory, f'slot-{index}.lock') for index in range(size)]
+
+    def _try_acquire(self):
+        # Start at a different slot in each process so workers don't all contend for slot 0.
+        start = os.getpid() % len(self.paths)
+        for path in self.paths[start:] + self.paths[:start]:
+            # A fresh open file per attempt: flock() conflicts between open files, even in one process.
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+            else:
+                return fd
+        return None
+
+    def acquire(self, timeout=0):
+        """A held slot (pass it to `release()`), or None if none freed up within `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        while True:
+            slot = self._try_acquire()
+            if slot is not None or time.monotonic() >= deadline:
+                return slot
+            time.sleep(POLL_SECONDS)
+
+    def release(self, slot):
+        os.close(slot)  # closing the file drops the lock
+
+
+class LoadSheddingMiddleware:
+    def __init__(self, get_response):
+        if fcntl is None or not LOAD_SHED_MAX_CONCURRENT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slots = SlotPool(LOAD_SHED_LOCK_DIR, LOAD_SHED_MAX_CONCURRENT)
+
+    def __call__(self, request):
+        if not request.path.startswith(LOAD_SHED_PATHS):
+            return self.get_response(request)
+        slot = self.slots.acquire(timeout=LOAD_SHED_WAIT_SECONDS)
+        if slot is None:
+            response = JsonResponse(
+                {'detail': "The server is busy right now. Please try again in a few seconds."},
+                status=503,
+            )
+            response['Retry-After'] = str(LOAD_SHED_RETRY_AFTER)
+            return response
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.slots.release(slot)
+            raise
+        if response.streaming:
+            response._resource_closers.append(lambda: self.slots.release(slot))
+        else:
+            self.slots.release(slot)
+        return response
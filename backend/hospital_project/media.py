@@ -0,0 +1,65 @@
+"""
+Content-addressed media uploads.
+
+`HashedMediaStorage` (the default storage) saves every upload as
+`<dir>/<stem>.<hash12><ext>`, the hash taken from the file's bytes. A name
+then always refers to the same content, so `serve_media` can send hashed
+files with a one-year `immutable` Cache-Control; replacing a photo produces
+a new URL instead of a stale cached one. Uploading identical bytes again
+reuses the stored file. Files saved before this storage was introduced keep
+their names and get a short max-age.
+"""
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.views.static import serve
+
+MEDIA_MAX_AGE = getattr(settings, 'MEDIA_MAX_AGE', 60 * 60 * 24 * 365)
+UNHASHED_MEDIA_MAX_AGE = getattr(settings, 'UNHASHED_MEDIA_MAX_AGE', 60 * 60)
+
+HASH_LENGTH = 12
+_HASHED_NAME = re.compile(r'\.[0-9a-f]{%d}\.[^./]+$' % HASH_LENGTH)
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def is_hashed_name(name):
+    return bool(_HASHED_NAME.search(name))
+
+
+class HashedMediaStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if not is_hashed_name(name):
+            root, ext = os.path.splitext(name)
+            name = f'{root}.{content_hash(content)}{ext}'
+        if self.exists(name):
+            # Same bytes, same name: nothing to write.
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+def serve_media(request, path):
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if response.status_code in (200, 304):
+        if is_hashed_name(path):
+            response['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={UNHASHED_MEDIA_MAX_AGE}'
+    return response
@@ -0,0 +1,169 @@
+"""
+Per-request SQL and latency instrumentation.
+
+`QueryTimingMiddleware` wraps every request in a database execute wrapper,
+counting queries and summing their time. Each response gets a
+`Server-Timing` header (`db` and `total`, visible in the browser dev tools),
+and the numbers are folded into in-process histograms keyed by the resolved
+URL name and HTTP method. `metrics_view` exposes those histograms in the
+Prometheus text format; with several worker processes each one reports its
+own share. Methods outside HTTP_METHODS are counted as OTHER, so a client
+sending made-up methods cannot grow the registry without bound.
+
+Queries slower than SLOW_QUERY_LOG_MS are logged to the
+'hospital_project.slow_queries' logger (set the setting to None to disable).
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAuthenticated
+
+from appointments.authentication import CachedTokenAuthentication
+
+slow_query_logger = logging.getLogger('hospital_project.slow_queries')
+
+SLOW_QUERY_LOG_MS = getattr(settings, 'SLOW_QUERY_LOG_MS', 500)
+
+# Histogram bucket upper bounds.
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+HTTP_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.observations = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.observations += 1
+
+
+class Registry:
+    """Thread-safe store of {(metric, view, method): Histogram}."""
+    METRICS = {
+        'http_request_duration_seconds': ("Time spent in the view, middleware included.", SECONDS_BUCKETS),
+        'db_query_duration_seconds': ("Total database time per request.", SECONDS_BUCKETS),
+        'db_queries_per_request': ("Number of SQL queries per request.", QUERY_COUNT_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, view, method, total, db_time, queries):
+        if method not in HTTP_METHODS:
+            method = 'OTHER'
+        with self._lock:
+            for metric, value in (
+                ('http_request_duration_seconds', total),
+                ('db_query_duration_seconds', db_time),
+                ('db_queries_per_request', queries),
+            ):
+                key = (metric, view, method)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(self.METRICS[metric][1])
+                histogram.observe(value)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            snapshot = {
+                key: (list(h.counts), h.total, h.observations, h.buckets)
+                for key, h in self._histograms.items()
+            }
+        lines = []
+        for metric, (help_text, _buckets) in self.METRICS.items():
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for (name, view, method), (counts, total, observations, buckets) in sorted(snapshot.items()):
+                if name != metric:
+                    continue
+                labels = f'view="{_escape(view)}",method="{method}"'
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{labels}}} {total}')
+                lines.append(f'{metric}_count{{{labels}}} {observations}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = Registry()
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _QueryTimer:
+    """connection.execute_wrapper() callable that times every query."""
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.elapsed += duration
+            if SLOW_QUERY_LOG_MS is not None and duration * 1000 >= SLOW_QUERY_LOG_MS:
+                slow_query_logger.warning(
+                    "Slow query (%.1f ms) in %s: %s", duration * 1000, _view_name(self.request), sql,
+                )
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class QueryTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = _QueryTimer(request)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        registry.observe(_view_name(request), request.method, total, timer.elapsed, timer.queries)
+        response['Server-Timing'] = (
+            f'db;dur={timer.elapsed * 1000:.1f};desc="{timer.queries} queries", '
+            f'total;dur={total * 1000:.1f}'
+        )
+        return response
+
+
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -14,6 +14,7 @@ from pathlib import Path
 import os
 # import dj_database_url
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 load_dotenv()
 
@@ -58,16 +59,28 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'appointments.authentication.CachedTokenAuthentication',
         # Make sure 'rest_framework.authentication.SessionAuthentication' is NOT here
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    # Client IPs for throttling come from REMOTE_ADDR, never a client-supplied X-Forwarded-For.
+    # Passenger runs inside Apache with no proxy in front; set NUM_PROXIES if a CDN or proxy is added.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
+    # Token buckets (appointments/throttling.py): burst size / refill period
+    'DEFAULT_THROTTLE_RATES': {
+        'booking': '20/hour',
+        'booking_phone': '5/hour',
+        'listing': '60/min',
+        'login': '10/min',
+    },
 }
 
 MIDDLEWARE = [
+    'hospital_project.metrics.QueryTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'hospital_project.load_shedding.LoadSheddingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -80,6 +93,11 @@ MIDDLEWARE = [
 
 CORS_ALLOW_ALL_ORIGINS = True 
 
+# Lets the React dashboard read the pagination cursors on cross-origin calls.
+CORS_EXPOSE_HEADERS = ['Link', 'X-Next-Cursor', 'X-Previous-Cursor', 'Server-Timing', 'Retry-After', 'Idempotent-Replayed']
+# The booking form sends Idempotency-Key so its retries can't book twice (appointments/idempotency.py).
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
 
 CSRF_TRUSTED_ORIGINS = [
     'http://localhost:5173',
@@ -156,6 +174,88 @@ USE_TZ = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Log any single SQL query slower than this (ms) to 'hospital_project.slow_queries'; None disables
+SLOW_QUERY_LOG_MS = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'hospital_project.slow_queries': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+        'appointments.notifications': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Widths of the resized/WebP copies generated for doctor photos and testimonial images
+IMAGE_VARIANT_WIDTHS = (160, 320, 640)
+
+# Rows per page on GET /api/appointments/ (clients may ask for up to 200 via ?page_size=)
+APPOINTMENT_PAGE_SIZE = 50
+# Idempotency-Key replays for POST /api/appointments/: kept this many seconds. Nothing prunes them per request;
+# run manage.py prune_idempotency_keys from cron, which also deletes the oldest rows beyond IDEMPOTENCY_MAX_KEYS
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+IDEMPOTENCY_MAX_KEYS = 50000
+# Admin appointment changelists never COUNT(*) the table: filtered lists count up to this many rows
+ADMIN_COUNT_LIMIT = 10000
+# Testimonials per page of /api/testimonials/ (cursor-paginated like /api/appointments/)
+TESTIMONIAL_PAGE_SIZE = 12
+# Appointment notifications go through each of these senders (see appointments.notifications);
+# FileSender appends them as JSON lines to NOTIFICATION_FILE
+NOTIFICATION_SENDERS = ['appointments.notifications.ConsoleSender']
+NOTIFICATION_FILE = os.path.join(BASE_DIR, 'notifications.jsonl')
+# Outbox worker: a failed delivery is retried with backoff, up to this many attempts in all
+OUTBOX_MAX_ATTEMPTS = 8
+# Sent/failed events (they hold patient names and phones) are deleted by the worker after this many days
+OUTBOX_RETENTION_DAYS = 30
+# manage.py send_reminders: appointments per batch (one bulk_update each) and reminders sent in parallel
+REMINDER_BATCH_SIZE = 200
+REMINDER_WORKERS = 8
+
+# 'default' is per process: only for data where another Passenger worker serving a
+# copy up to its TTL old is harmless. 'shared' is a file cache every worker on the host
+# sees, for entries whose invalidation must reach all of them at once (revoked tokens,
+# cache versions).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mallika-default',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('SHARED_CACHE_DIR', os.path.join(BASE_DIR, '.cache')),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Public department/doctor/testimonial responses (see appointments/http_cache.py); their versions live in the 'shared' cache
+CATALOG_CACHE_TTL = 300
+
+# /api/search/doctors/ keeps an in-process index; other workers' saves show up after at most this many seconds
+SEARCH_INDEX_TTL = 300
+
+# /sitemap.xml switches to a sitemap index once it would list more URLs than this
+SITEMAP_CHUNK_SIZE = 5000
+# Rendered sitemaps are kept in the 'shared' cache until a doctor changes, or at most this many seconds
+SITEMAP_CACHE_TTL = 60 * 60
+
+# Booking slot length used by /api/doctors/<slug>/availability/
+APPOINTMENT_SLOT_MINUTES = 15
+AVAILABILITY_CACHE_TTL = 60
+
+# Cap on in-flight /api/ requests across all workers on the host (one DB connection each),
+# kept below the MySQL user's connection limit; over it, 503 + Retry-After. The slots are lock files in LOAD_SHED_LOCK_DIR.
+LOAD_SHED_MAX_CONCURRENT = 8
+LOAD_SHED_LOCK_DIR = os.getenv('LOAD_SHED_LOCK_DIR', os.path.join(BASE_DIR, '.cache', 'load-shed'))
+LOAD_SHED_WAIT_SECONDS = 0.25
+LOAD_SHED_RETRY_AFTER = 5
+
+# Cached token lookups in the 'shared' cache (appointments/authentication.py). AUTH_TOKEN_EXPIRY is in seconds; None = tokens never expire
+AUTH_TOKEN_CACHE_TTL = 60
+AUTH_TOKEN_EXPIRY = None
+
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 
@@ -167,7 +267,11 @@ STATICFILES_DIRS = [
 # This is where Django collects files when you run 'collectstatic'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# ALWAYS use WhiteNoise for storage (even in Debug mode on cPanel)
-STATICFILES_STORAGE = "whitenoise.storage.StaticFilesStorage"
+STORAGES = {
+    # Uploads get content-hashed names so /media/ can be cached forever (hospital_project/media.py)
+    'default': {'BACKEND': 'hospital_project.media.HashedMediaStorage'},
+    # ALWAYS use WhiteNoise for storage (even in Debug mode on cPanel)
+    'staticfiles': {'BACKEND': 'whitenoise.storage.StaticFilesStorage'},
+}
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
@@ -5,9 +5,10 @@ from django.conf.urls.static import static
 from rest_framework.authtoken.views import obtain_auth_token
 from appointments.views import db_check
 from django.views.static import serve
-from django.views.generic import TemplateView
 from django.http import HttpResponsePermanentRedirect
-from appointments.views import DynamicSitemapView
+from appointments.views import DynamicSitemapView, doctor_profile_page, find_doctor_page, spa_shell
+from hospital_project.metrics import metrics_view
+from hospital_project.media import serve_media
 
 def redirect_numeric_doctor(request, pk):
     from appointments.models import Doctor  
@@ -20,19 +21,25 @@ def redirect_numeric_doctor(request, pk):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('sitemap.xml', DynamicSitemapView.as_view(), name='dynamic-sitemap'),
+    path('sitemap-<int:page>.xml', DynamicSitemapView.as_view(), name='dynamic-sitemap-page'),
     path('api/', include('appointments.urls')),
     path('api/', include('testimonials.urls')),
     path('api/db-check/', db_check),
+    path('api/metrics/', metrics_view, name='metrics'),
 
     # Redirect old numeric doctor URLs to slug-based ones
     re_path(r'^doctor-profile/(?P<pk>\d+)/?$', redirect_numeric_doctor),
 
-    # This tells Django to serve doctor images directly
-    re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
+    # Doctor pages get the shell with their API data and meta tags already inlined
+    re_path(r'^doctor-profile/(?P<slug>[-\w]+)/?$', doctor_profile_page, name='doctor-profile-page'),
+    re_path(r'^find-doctor/?$', find_doctor_page, name='find-doctor-page'),
+
+    # This tells Django to serve doctor images directly (hashed names are cached for a year)
+    re_path(r'^media/(?P<path>.*)$', serve_media),
 
    # helps serve favicon and other root files if WhiteNoise misses them
     re_path(r'^static/(?P<path>.*)$', serve, {'document_root': settings.STATIC_ROOT}),
 
     #Sends all non-API URL refreshes directly to the React index.html
-    re_path(r'^.*$', TemplateView.as_view(template_name='index.html')),
+    re_path(r'^.*$', spa_shell),
 ]
\ No newline at end of file
@@ -10,7 +10,8 @@ class TestimonialAdmin(admin.ModelAdmin):
     list_filter = ('testimonial_type', 'is_visible', 'department')
     
     # Search bar parameters
-    search_fields = ('patient_name', 'review_text', 'department')
+    search_fields = ('patient_name', 'review_text', 'department__name')
     
     # Allows the admin to change order/visibility directly from the list view without clicking into the item!
-    list_editable = ('display_order', 'is_visible')
\ No newline at end of file
+    list_editable = ('display_order', 'is_visible')
+    list_select_related = ('department',)
\ No newline at end of file
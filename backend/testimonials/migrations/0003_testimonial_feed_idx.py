@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testimonials', '0002_remove_testimonial_media_url_testimonial_image_file_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(fields=['display_order', '-created_at', 'is_visible'], name='testimonial_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 6.0 on 2026-10-18 16:18
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _key(name):
+    # "Obstetrics & Gynaecology " and "obstetrics gynaecology" name the same department.
+    return ' '.join(re.findall(r'[a-z0-9]+', (name or '').lower().replace('&', ' and ')))
+
+
+def link_departments(apps, schema_editor):
+    """Points each testimonial at the Department its free-text name matches; unmatched ones stay empty."""
+    Department = apps.get_model('appointments', 'Department')
+    Testimonial = apps.get_model('testimonials', 'Testimonial')
+    departments = {}
+    for pk, name in Department.objects.order_by('-pk').values_list('pk', 'name'):
+        departments[_key(name)] = pk
+    for name in Testimonial.objects.values_list('department', flat=True).distinct():
+        department_id = departments.get(_key(name))
+        if department_id is not None:
+            Testimonial.objects.filter(department=name).update(department_ref=department_id)
+
+
+def unlink_departments(apps, schema_editor):
+    Testimonial = apps.get_model('testimonials', 'Testimonial')
+    for testimonial in Testimonial.objects.select_related('department_ref').only('department_ref__name'):
+        testimonial.department = testimonial.department_ref.name if testimonial.department_ref else ''
+        testimonial.save(update_fields=['department'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0012_appointment_archive'),
+        ('testimonials', '0004_testimonial_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testimonial',
+            name='department_ref',
+            field=models.ForeignKey(null=True, blank=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='appointments.department'),
+        ),
+        migrations.RunPython(link_departments, unlink_departments),
+        # A default, so that unapplying the RemoveField below can re-add the column to existing rows.
+        migrations.AlterField(
+            model_name='testimonial',
+            name='department',
+            field=models.CharField(default='', help_text='e.g., Cardiology, Oncology', max_length=100),
+        ),
+        migrations.RemoveField(
+            model_name='testimonial',
+            name='department',
+        ),
+        migrations.RenameField(
+            model_name='testimonial',
+            old_name='department_ref',
+            new_name='department',
+        ),
+        migrations.AlterField(
+            model_name='testimonial',
+            name='department',
+            field=models.ForeignKey(blank=True, help_text='e.g., Cardiology, Oncology', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='testimonials', to='appointments.department'),
+        ),
+        migrations.AlterModelOptions(
+            name='testimonial',
+            options={'ordering': ['display_order', '-created_at', 'id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='testimonial',
+            name='testimonial_feed_idx',
+        ),
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(fields=['display_order', '-created_at', 'id', 'is_visible'], name='testimonial_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(fields=['department', 'display_order', '-created_at', 'id'], name='testimonial_dept_feed_idx'),
+        ),
+    ]
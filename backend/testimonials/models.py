@@ -7,12 +7,17 @@ class Testimonial(models.Model):
     ]
 
     patient_name = models.CharField(max_length=150)
-    department = models.CharField(max_length=100, help_text="e.g., Cardiology, Oncology")
+    department = models.ForeignKey(
+        'appointments.Department', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='testimonials', help_text="e.g., Cardiology, Oncology",
+    )
     testimonial_type = models.CharField(max_length=10, choices=MEDIA_TYPE_CHOICES, default='image')
     review_text = models.TextField(blank=True, null=True, help_text="Written review content")
     
     # 👇 Dual-Field Strategy
     image_file = models.ImageField(upload_to='testimonials/', blank=True, null=True, help_text="Upload a photo if type is Image Quote")
+    # Resized/WebP derivatives of `image_file`, maintained by appointments.images.
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     video_url = models.URLField(max_length=500, blank=True, null=True, help_text="Paste YouTube link if type is YouTube Video")
     
     display_order = models.IntegerField(default=100)
@@ -20,7 +25,14 @@ class Testimonial(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ['display_order', '-created_at']
+        ordering = ['display_order', '-created_at', 'id']
+        indexes = [
+            # Public feed (is_visible=True, keyset-paginated on display_order, -created_at, id): the
+            # ordering columns lead so each page is a range scan; is_visible is checked from the index.
+            models.Index(fields=['display_order', '-created_at', 'id', 'is_visible'], name='testimonial_feed_idx'),
+            # The same feed for one department (?department=), and the join from Department.
+            models.Index(fields=['department', 'display_order', '-created_at', 'id'], name='testimonial_dept_feed_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.patient_name} - {self.department}"
\ No newline at end of file
+        return f"{self.patient_name} - {self.department or 'General'}"
\ No newline at end of file
@@ -0,0 +1,9 @@
+from django.conf import settings
+
+from appointments.pagination import KeysetPagination
+
+
+class TestimonialCursorPagination(KeysetPagination):
+    # Same order as the feed index (testimonial_feed_idx / testimonial_dept_feed_idx).
+    ordering = ('display_order', '-created_at', 'id')
+    page_size = getattr(settings, 'TESTIMONIAL_PAGE_SIZE', 12)
@@ -1,7 +1,41 @@
 from rest_framework import serializers
+from appointments import images
+from appointments.models import Department
 from .models import Testimonial
 
+class DepartmentField(serializers.PrimaryKeyRelatedField):
+    """
+    A department id, or its name as typed in the dashboard form.
+    """
+    default_error_messages = {
+        **serializers.PrimaryKeyRelatedField.default_error_messages,
+        'unknown_name': 'No department is named "{name}".',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and not data.strip().isdigit():
+            department = Department.objects.filter(name__iexact=data.strip()).order_by('pk').first()
+            if department is None:
+                self.fail('unknown_name', name=data.strip())
+            return department
+        return super().to_internal_value(data)
+
 class TestimonialSerializer(serializers.ModelSerializer):
+    department = DepartmentField(queryset=Department.objects.all(), allow_null=True, required=False)
+    department_name = serializers.CharField(source='department.name', read_only=True, default='')
+    image_sizes = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = Testimonial
-        fields = "__all__"
\ No newline at end of file
+        exclude = ['image_variants']
+
+    def _absolute_url(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_image_sizes(self, obj):
+        return images.variant_urls(obj.image_variants, self._absolute_url)[0]
+
+    def get_image_srcset(self, obj):
+        return images.variant_urls(obj.image_variants, self._absolute_url)[1]
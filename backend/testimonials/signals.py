@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from appointments import http_cache, images
+from appointments.models import Department
+from .models import Testimonial
+
+
+# Department too: the feed carries each testimonial's department_name.
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Testimonial)
+def invalidate_testimonial_cache(sender, **kwargs):
+    http_cache.invalidate('testimonials')
+
+
+@receiver(post_save, sender=Testimonial)
+def refresh_testimonial_image_variants(sender, instance, raw=False, **kwargs):
+    if not raw and images.refresh_variants(instance, 'image_file', 'image_variants'):
+        http_cache.invalidate('testimonials')
@@ -1,3 +1,72 @@
+from datetime import datetime, timezone
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from appointments.models import Department
+from .models import Testimonial
+
+
+class TestimonialFeedTests(TestCase):
+    """
+    The public feed pages through (display_order, -created_at, id) with
+    keyset cursors and filters by ?type= and ?department=.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cardiology = Department.objects.create(name="Cardiology")
+        cls.neurology = Department.objects.create(name="Neurology")
+        Testimonial.objects.bulk_create([
+            Testimonial(
+                patient_name=f"Patient {i}", department=cls.cardiology if i % 2 else cls.neurology,
+                testimonial_type='video' if i % 3 == 0 else 'image', display_order=i % 3, is_visible=i != 7,
+            )
+            for i in range(14)
+        ])
+        # Ties on display_order and created_at, so the id decides.
+        for i, testimonial in enumerate(Testimonial.objects.order_by('id')):
+            testimonial.created_at = datetime(2026, 3, 1 + i % 2, tzinfo=timezone.utc)
+            testimonial.save(update_fields=['created_at'])
+
+    def setUp(self):
+        cache.clear()
+
+    def _get(self, **params):
+        return self.client.get('/api/testimonials/', params)
+
+    def _ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()]
+
+    def test_cursor_order(self):
+        expected = list(
+            Testimonial.objects.filter(is_visible=True).order_by('display_order', '-created_at', 'id').values_list('id', flat=True)
+        )
+        seen = []
+        response = self._get(page_size=5)
+        while True:
+            seen += self._ids(response)
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                break
+            response = self._get(page_size=5, cursor=cursor)
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(expected), 13)  # the hidden one is left out
+
+    def test_type_filter(self):
+        rows = self._get(type='video').json()
+        self.assertTrue(rows)
+        self.assertEqual({row['testimonial_type'] for row in rows}, {'video'})
+        self.assertEqual(self._get(type='audio').status_code, 400)
+
+    def test_department_filter(self):
+        by_id = self._ids(self._get(department=self.cardiology.pk))
+        by_slug = self._ids(self._get(department=self.cardiology.slug))
+        self.assertEqual(by_id, by_slug)
+        self.assertEqual(set(by_id), set(
+            Testimonial.objects.filter(department=self.cardiology, is_visible=True).values_list('id', flat=True)
+        ))
+        self.assertEqual(
+            {row['department_name'] for row in self._get(department=self.neurology.pk).json()}, {"Neurology"}
+        )
@@ -1,11 +1,22 @@
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from appointments.http_cache import CachedResponseMixin
 from .models import Testimonial
+from .pagination import TestimonialCursorPagination
 from .serializers import TestimonialSerializer
 
-class TestimonialViewSet(viewsets.ModelViewSet):
+class TestimonialViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Testimonial.objects.all()
     serializer_class = TestimonialSerializer  # 👈 Fixed the typo here!
+    cache_group = 'testimonials'
+    pagination_class = TestimonialCursorPagination
+
+    def should_cache(self, request):
+        """
+        Only the public feed is cached; admins see hidden entries too.
+        """
+        return self.action == 'list' and not request.user.is_authenticated
 
     def get_permissions(self):
         """
@@ -19,6 +30,28 @@ class TestimonialViewSet(viewsets.ModelViewSet):
         """
         Filters out invisible entries for public users, but shows everything to admins.
         """
-        if self.request.user and self.request.user.is_authenticated:
-            return Testimonial.objects.all()
-        return Testimonial.objects.filter(is_visible=True)
\ No newline at end of file
+        queryset = Testimonial.objects.select_related('department')
+        if not (self.request.user and self.request.user.is_authenticated):
+            queryset = queryset.filter(is_visible=True)
+        if self.action == 'list':
+            queryset = self.filter_feed(queryset)
+        return queryset
+
+    def filter_feed(self, queryset):
+        """
+        ?type=image|video and ?department=<id or slug>, so a department or
+        doctor page fetches just the few testimonials it shows.
+        """
+        params = self.request.query_params
+        testimonial_type = params.get('type') or params.get('testimonial_type')
+        if testimonial_type:
+            if testimonial_type not in dict(Testimonial.MEDIA_TYPE_CHOICES):
+                raise ValidationError({'type': f"Choose one of: {', '.join(dict(Testimonial.MEDIA_TYPE_CHOICES))}."})
+            queryset = queryset.filter(testimonial_type=testimonial_type)
+        department = params.get('department')
+        if department:
+            if department.isdigit():
+                queryset = queryset.filter(department_id=department)
+            else:
+                queryset = queryset.filter(department__slug=department)
+        return queryset
\ No newline at end of file
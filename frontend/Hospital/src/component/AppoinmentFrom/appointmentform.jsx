@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useLocation } from 'react-router-dom';
 
 const API = import.meta.env.VITE_BACKEND_URL || "https://mallika-hospital.onrender.com";
@@ -11,6 +11,8 @@ const AppointmentForm = () => {
   const [loadingDoctors, setLoadingDoctors] = useState(false);
   const [error, setError] = useState(null);
   const [statusMessage, setStatusMessage] = useState('');
+  // One Idempotency-Key per booking: resubmitting the same details reuses it, so a retry can't book twice.
+  const idempotency = useRef({ body: null, key: null });
 
   const [formData, setFormData] = useState({
     fullName: '',
@@ -132,10 +134,16 @@ const AppointmentForm = () => {
       reason: formData.reason
     };
 
+    const body = JSON.stringify(payload);
+    if (idempotency.current.body !== body) {
+      const key = window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+      idempotency.current = { body, key };
+    }
+
     fetch(`${API}/api/appointments/`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify(payload),
+      headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotency.current.key },
+      body,
     })
     .then(async (res) => {
       if (!res.ok) {
@@ -146,6 +154,7 @@ const AppointmentForm = () => {
     })
     .then((data) => {
       setStatusMessage("Appointment booked successfully!");
+      idempotency.current = { body: null, key: null };
       setFormData({
         fullName: '', phone: '', department: '', doctor: '', 
         appointmentDate: '', appointmentTime: '', reason: ''
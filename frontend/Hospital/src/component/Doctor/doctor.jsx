@@ -6,14 +6,18 @@ import {
 import { useNavigate } from 'react-router-dom'; 
 
 import { getDoctors } from '../dashboard/api.js'; // Removed getDepartments, no longer needed!
+import { readInitialData } from '../../utils/initialData';
 
 const DoctorsList = () => {
   const navigate = useNavigate(); 
 
+  // /find-doctor is prerendered with the doctor list inlined, so the first paint needs no fetch
+  const [initialDoctors] = useState(() => readInitialData('/api/doctors/'));
+
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedDepartment, setSelectedDepartment] = useState('all');
-  const [doctors, setDoctors] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const [doctors, setDoctors] = useState(initialDoctors || []);
+  const [loading, setLoading] = useState(!initialDoctors);
 
   const uniqueDepartments = useMemo(() => {
     const depts = new Map();
@@ -29,6 +33,7 @@ const DoctorsList = () => {
   const [visibleCount, setVisibleCount] = useState(8); 
 
   useEffect(() => {
+    if (initialDoctors) return;
     const fetchData = async () => {
       try {
         const doctorsData = await getDoctors();
@@ -41,7 +46,7 @@ const DoctorsList = () => {
       }
     };
     fetchData();
-  }, []);
+  }, [initialDoctors]);
 
   const formatTime = (timeString) => {
     if (!timeString) return "Not Available";
@@ -2,6 +2,8 @@ import React, { useState, useEffect } from 'react';
 import { useLocation, useParams, useNavigate } from 'react-router-dom';
 import { FaPlus, FaMinus, FaArrowLeft, FaPhone, FaEnvelope } from 'react-icons/fa';
 import { Helmet } from 'react-helmet-async';
+import DepartmentTestimonials from '../Testimonial/DepartmentTestimonials';
+import { readInitialData } from '../../utils/initialData';
 
 // We only need getDoctors now!
 // import { getDoctors } from '../dashboard/api.js'; 
@@ -24,6 +26,11 @@ const DoctorProfile = () => {
       try {
         let currentDoc = doctor; // use location.state if available (fast nav)
 
+        if (!currentDoc) {
+          currentDoc = readInitialData(`/api/doctors/${slug}/`);
+          if (currentDoc) setDoctor(currentDoc);
+        }
+
         if (!currentDoc) {
           // Hit the single-doctor endpoint directly — much faster for Googlebot
           const res = await fetch(`https://mallikahospital.co.in/api/doctors/${slug}/`);
@@ -252,6 +259,8 @@ const DoctorProfile = () => {
                 </div>
 
             </div>
+
+            <DepartmentTestimonials department={doctor.department} />
           </>
         )}
       </div>
@@ -7,6 +7,7 @@ import { FaHeartbeat, FaUserMd, FaStethoscope, FaProcedures, FaLaptopMedical, Fa
 import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async'; // 1. IMPORT HELMET
 import { getDoctors } from '../../dashboard/api';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 import DoctorCard from '../DoctorCard';
 
 const Cardiology = () => {
@@ -175,6 +176,8 @@ const Cardiology = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={CARDIOLOGY_DEPARTMENT_ID} />
       </div>
     </div>
   );
@@ -6,6 +6,7 @@ import img5 from '../../../assets/Consultant/Derma/dermaimg4.png';
 import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import { getDoctors } from '../../dashboard/api';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 import DoctorCard from '../DoctorCard';
 import { FaUserMd, FaHandHoldingMedical, FaSearch, FaHeart, FaShieldAlt, FaCheckCircle } from 'react-icons/fa';
 
@@ -175,6 +176,8 @@ const Dermatology = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={DERMATOLOGY_DEPARTMENT_ID} />
       </div>
     </div>
   );
@@ -6,6 +6,7 @@ import img5 from '../../../assets/Consultant/Hemato/hematoimg4.avif';
 import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import { getDoctors } from '../../dashboard/api';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 import DoctorCard from '../DoctorCard';
 import { FaUserMd, FaStethoscope, FaShieldAlt, FaTint, FaMicroscope, FaHeartbeat } from 'react-icons/fa';
 
@@ -178,6 +179,8 @@ const Hematology = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={HEMATOLOGY_DEPARTMENT_ID} />
       </div>
     </div>
   );
@@ -6,6 +6,7 @@ import img5 from '../../../assets/Consultant/Nepro/neproimg4.png';
 import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import { getDoctors } from '../../dashboard/api';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 import DoctorCard from '../DoctorCard';
 import { FaUserMd, FaStethoscope, FaShieldAlt, FaTint, FaCheckCircle, FaHeartbeat } from 'react-icons/fa';
 
@@ -177,6 +178,8 @@ const NEPHROLOGY_DEPARTMENT_ID = 10;
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={NEPHROLOGY_DEPARTMENT_ID} />
       </div>
     </div>
   );
@@ -6,6 +6,7 @@ import img5 from '../../../assets/Surgery/Neuro/neuroimg4.png';
 import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import { getDoctors } from '../../dashboard/api';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 import DoctorCard from '../DoctorCard';
 import { FaBrain, FaUserMd, FaStethoscope, FaLaptopMedical, FaBolt, FaRunning, FaHeartbeat } from 'react-icons/fa';
 
@@ -176,6 +177,8 @@ const Neurology = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={NEUROLOGY_DEPARTMENT_ID} />
       </div>
     </div>
   );
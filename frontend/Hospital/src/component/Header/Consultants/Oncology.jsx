@@ -6,6 +6,7 @@ import img5 from '../../../assets/Consultant/Onco/oncoimg4.png';
 import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import { getDoctors } from '../../dashboard/api';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 import DoctorCard from '../DoctorCard';
 import { FaUserMd, FaRadiation, FaFlask, FaShieldAlt, FaUsers, FaHandHoldingMedical } from 'react-icons/fa';
 
@@ -176,6 +177,8 @@ const Oncology = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={ONCOLOGY_DEPARTMENT_ID} />
       </div>
     </div>
   );
@@ -6,6 +6,7 @@ import img5 from '../../../assets/Consultant/Pediat/pediatimg4.png';
 import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import { getDoctors } from '../../dashboard/api';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 import DoctorCard from '../DoctorCard';
 import { FaBaby, FaStethoscope, FaShieldAlt, FaNotesMedical, FaChild, FaHeart } from 'react-icons/fa';
 
@@ -176,6 +177,8 @@ const Pediatrician = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={PEDIATRICIAN_DEPARTMENT_ID} />
       </div>
     </div>
   );
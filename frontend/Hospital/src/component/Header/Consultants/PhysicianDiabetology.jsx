@@ -6,6 +6,7 @@ import img5 from '../../../assets/Consultant/Physic/physicimg4.png';
 import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import { getDoctors } from '../../dashboard/api';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 import DoctorCard from '../DoctorCard';
 import { FaUserMd, FaStethoscope, FaShieldAlt, FaNotesMedical, FaCheckCircle, FaHeartbeat } from 'react-icons/fa';
 
@@ -176,6 +177,8 @@ const InternalMedicine = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={PHYSICIAN_DIABETOLOGY_DEPARTMENT_ID} />
       </div>
     </div>
   );
@@ -9,6 +9,7 @@ import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async'; // 1. IMPORT HELMET HERE
 import DoctorCard from '../DoctorCard.jsx';
 import { getDoctors } from '../../dashboard/api.js';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 
 const Ent = () => {
   const [doctors, setDoctors] = useState([]);
@@ -119,6 +120,8 @@ const Ent = () => {
             <img src={img2} alt="ENT Exam" className="rounded-lg shadow-md w-full object-cover h-64 md:h-full" />
           </div>
         </section>
+
+        <DepartmentTestimonials department={ENT_DEPARTMENT_ID} />
       </div>
     </div>
   );
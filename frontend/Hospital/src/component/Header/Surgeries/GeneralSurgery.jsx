@@ -14,6 +14,7 @@ import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async'; // 1. IMPORT HELMET HERE
 import DoctorCard from '../DoctorCard.jsx';
 import { getDoctors } from '../../dashboard/api.js';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 
 const GeneralSurgery = () => {
   const [doctors, setDoctors] = useState([]);
@@ -277,6 +278,8 @@ const GeneralSurgery = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={GENERAL_SURGERY_DEPARTMENT_ID} />
       </div>
     </div>
   );
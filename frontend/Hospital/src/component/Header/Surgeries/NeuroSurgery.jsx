@@ -8,6 +8,7 @@ import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async'; // 1. IMPORT HELMET HERE
 import DoctorCard from '../DoctorCard.jsx';
 import { getDoctors } from '../../dashboard/api.js';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 
 const Neurosurgery = () => {
   const [doctors, setDoctors] = useState([]);
@@ -192,6 +193,8 @@ const Neurosurgery = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={NEUROLOGY_DEPARTMENT_ID} />
       </div>
     </div>
   );
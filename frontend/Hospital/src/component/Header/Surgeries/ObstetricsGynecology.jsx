@@ -12,6 +12,7 @@ import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async'; // 1. IMPORT HELMET HERE
 import DoctorCard from '../DoctorCard.jsx';
 import { getDoctors } from '../../dashboard/api.js';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 
 const ObstetricsGynecology = () => {
   const [doctors, setDoctors] = useState([]);
@@ -276,6 +277,8 @@ const ObstetricsGynecology = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={GYNECOLOGY_SURGERY_DEPARTMENT_ID} />
       </div>
     </div>
   );
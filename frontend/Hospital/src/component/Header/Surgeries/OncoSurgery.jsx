@@ -8,6 +8,7 @@ import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import DoctorCard from '../DoctorCard.jsx';
 import { getDoctors } from '../../dashboard/api.js';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 
 const OncoSurgery = () => {
   const [doctors, setDoctors] = useState([]);
@@ -228,6 +229,8 @@ const OncoSurgery = () => {
             </div>
           </div>
         </section> */}
+
+        <DepartmentTestimonials department={ONCOLOGY_SURGERY_DEPARTMENT_ID} />
       </div>
     </div>
   );
@@ -10,6 +10,7 @@ import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import DoctorCard from '../DoctorCard.jsx';
 import { getDoctors } from '../../dashboard/api.js';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 
 const Orthopedic = () => {
   const [doctors, setDoctors] = useState([]);
@@ -209,6 +210,8 @@ const Orthopedic = () => {
           </div>
         </section>
 
+        <DepartmentTestimonials department={ORTHOPAEDIC_SURGERY_DEPARTMENT_ID} />
+
       </div>
     </div>
   );
@@ -8,6 +8,7 @@ import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import DoctorCard from '../DoctorCard.jsx';
 import { getDoctors } from '../../dashboard/api.js';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 
 const PediatricSurgery = () => {
   const [doctors, setDoctors] = useState([]);
@@ -220,6 +221,8 @@ const PediatricSurgery = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={PEDIATRIC_SURGERY_DEPARTMENT_ID} />
       </div>
     </div>
   );
@@ -7,6 +7,7 @@ import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import DoctorCard from '../DoctorCard.jsx';
 import { getDoctors } from '../../dashboard/api.js';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 
 const Proctology = () => {
   const [doctors, setDoctors] = useState([]);
@@ -208,6 +209,8 @@ const Proctology = () => {
             </div>
           </div>
         </section> */}
+
+        <DepartmentTestimonials department={PROCTOLOGY_SURGERY_DEPARTMENT_ID} />
       </div>
     </div>
   );
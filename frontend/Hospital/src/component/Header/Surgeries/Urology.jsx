@@ -8,6 +8,7 @@ import { useEffect, useState } from 'react';
 import { Helmet } from 'react-helmet-async';
 import DoctorCard from '../DoctorCard.jsx';
 import { getDoctors } from '../../dashboard/api.js';
+import DepartmentTestimonials from '../../Testimonial/DepartmentTestimonials';
 
 const Urology = () => {
   const [doctors, setDoctors] = useState([]);
@@ -219,6 +220,8 @@ const Urology = () => {
             </div>
           </div>
         </section>
+
+        <DepartmentTestimonials department={UROLOGY_SURGERY_DEPARTMENT_ID} />
       </div>
     </div>
   );
@@ -0,0 +1,47 @@
+import React, { useEffect, useState } from 'react';
+import { Link } from 'react-router-dom';
+import { FaQuoteLeft } from 'react-icons/fa';
+import { getTestimonials } from '../dashboard/api';
+
+// The few testimonials of one department (id or slug), for department and doctor pages.
+// Renders nothing until there is at least one.
+const DepartmentTestimonials = ({ department, limit = 3 }) => {
+  const [testimonials, setTestimonials] = useState([]);
+
+  useEffect(() => {
+    if (!department) return;
+    let cancelled = false;
+    getTestimonials({ department, page_size: limit })
+      .then((data) => { if (!cancelled) setTestimonials(data); })
+      .catch((error) => console.error('Error loading department testimonials:', error));
+    return () => { cancelled = true; };
+  }, [department, limit]);
+
+  if (testimonials.length === 0) return null;
+
+  return (
+    <section className="mt-16">
+      <h2 className="text-3xl font-bold text-center text-gray-800 mb-8">What Our Patients Say</h2>
+      <div className="grid gap-6 md:grid-cols-3">
+        {testimonials.map((item) => (
+          <div key={item.id} className="bg-white p-6 rounded-lg shadow-lg flex flex-col justify-between">
+            <div>
+              <FaQuoteLeft className="text-blue-100 size-6 mb-2" />
+              <p className="text-gray-600 italic mb-4">
+                {item.review_text ? `"${item.review_text}"` : 'Watch their story on our testimonials page.'}
+              </p>
+            </div>
+            <h4 className="font-bold text-gray-800">{item.patient_name}</h4>
+          </div>
+        ))}
+      </div>
+      <div className="text-center mt-6">
+        <Link to="/testimonial" className="text-blue-600 font-semibold hover:underline">
+          Read more patient stories
+        </Link>
+      </div>
+    </section>
+  );
+};
+
+export default DepartmentTestimonials;
@@ -1,17 +1,21 @@
 import React, { useEffect, useState } from 'react';
-import { getTestimonials } from '../dashboard/api';
+import { getTestimonialPage } from '../dashboard/api';
 import { FaPlay, FaQuoteLeft, FaTimes, FaRegCommentDots } from 'react-icons/fa';
 
 const Testimonial = () => {
   const [testimonials, setTestimonials] = useState([]);
   const [loading, setLoading] = useState(true);
   const [activeVideo, setActiveVideo] = useState(null);
+  // The feed is cursor-paginated: null once the last page is loaded
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     const fetchReviews = async () => {
       try {
-        const data = await getTestimonials();
-        setTestimonials(data);
+        const { results, nextCursor } = await getTestimonialPage();
+        setTestimonials(results);
+        setNextCursor(nextCursor);
       } catch (error) {
         console.error('Error loading testimonials:', error);
       } finally {
@@ -21,6 +25,19 @@ const Testimonial = () => {
     fetchReviews();
   }, []);
 
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const { results, nextCursor: cursor } = await getTestimonialPage({}, nextCursor);
+      setTestimonials((current) => [...current, ...results]);
+      setNextCursor(cursor);
+    } catch (error) {
+      console.error('Error loading more testimonials:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getEmbedUrl = (url) => {
     if (!url) return '';
     let videoId = '';
@@ -122,7 +139,7 @@ const Testimonial = () => {
                       <div>
                         <h4 className="font-bold text-slate-800 text-base">{item.patient_name}</h4>
                         <p className="text-xs font-semibold text-blue-600 uppercase tracking-wider mt-0.5">
-                          {item.department} Patient
+                          {item.department_name || 'Hospital'} Patient
                         </p>
                       </div>
                     </div>
@@ -132,6 +149,18 @@ const Testimonial = () => {
             })}
           </div>
         )}
+
+        {!loading && nextCursor && (
+          <div className="text-center mt-12">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="bg-blue-600 hover:bg-blue-700 disabled:opacity-60 text-white font-bold px-8 py-3 rounded-full shadow-md transition-all duration-200"
+            >
+              {loadingMore ? 'Loading...' : 'Load more stories'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* LIGHTBOX YOUTUBE MODAL OVERLAY */}
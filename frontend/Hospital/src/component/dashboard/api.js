@@ -19,6 +19,20 @@ const handleResponse = async (response) => {
   return response.json();
 };
 
+// Cursor-paginated list endpoints return one page per call and the next
+// page's cursor in the X-Next-Cursor header; this follows it to the end.
+const fetchAllPages = async (path, params = {}, options = {}) => {
+  const query = new URLSearchParams({ page_size: 200, ...params });
+  const rows = [];
+  for (;;) {
+    const response = await fetch(`${BASE_URL}${path}?${query}`, options);
+    rows.push(...await handleResponse(response));
+    const cursor = response.headers.get('X-Next-Cursor');
+    if (!cursor) return rows;
+    query.set('cursor', cursor);
+  }
+};
+
 // --- DEPARTMENT API ---
 
 // GET all departments (Public)
@@ -114,11 +128,9 @@ export const deleteDoctor = async (slug, data) => {
 
 // --- APPOINTMENT API ---
 
-// GET all appointments (Public)
-export const getAppointments = async () => {
-  const response = await fetch(`${BASE_URL}/api/appointments/`);
-  return handleResponse(response);
-};
+// GET all appointments (Public), following the cursor through every page
+// filters: { status, doctor, department, date_from, date_to }
+export const getAppointments = async (filters = {}) => fetchAllPages('/api/appointments/', filters);
 
 // ADD an appointment (Public - patients book appointments)
 export const addAppointment = async (data) => {
@@ -158,10 +170,20 @@ export const deleteAppointment = async (id) => {
 };
 
 
-export const getTestimonials = async () => {
-  const response = await fetch(`${BASE_URL}/api/testimonials/`);
+// One page of the public feed plus the cursor of the next one (null on the last page)
+// filters: { type: 'image' | 'video', department: id or slug, page_size }
+export const getTestimonialPage = async (filters = {}, cursor = null) => {
+  const query = new URLSearchParams(filters);
+  if (cursor) query.set('cursor', cursor);
+  const response = await fetch(`${BASE_URL}/api/testimonials/?${query}`);
   if (!response.ok) {
     throw new Error('Failed to fetch testimonials');
   }
-  return await response.json();
-};
\ No newline at end of file
+  return { results: await response.json(), nextCursor: response.headers.get('X-Next-Cursor') };
+};
+
+// First page only, e.g. the few testimonials of one department
+export const getTestimonials = async (filters = {}) => (await getTestimonialPage(filters)).results;
+
+// Every testimonial, hidden ones included (Requires Auth)
+export const getAllTestimonials = async () => fetchAllPages('/api/testimonials/', {}, { headers: getAuthHeader() });
\ No newline at end of file
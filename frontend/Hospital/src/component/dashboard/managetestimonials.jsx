@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { FaTrash, FaPlus, FaArrowLeft, FaVideo, FaImage, FaCheckCircle, FaTimesCircle, FaEdit, FaTimes } from 'react-icons/fa';
 import { getAuthHeader } from '../../utils/auth';
+import { getAllTestimonials } from './api';
 
 const API_BASE = import.meta.env.VITE_BACKEND_URL || "https://mallika-hospital.onrender.com";
 
@@ -27,13 +28,7 @@ const ManageTestimonials = ({ onBack }) => {
   const fetchTestimonials = async () => {
     try {
       setLoading(true);
-      const res = await fetch(`${API_BASE}/api/testimonials/`, {
-        headers: getAuthHeader()
-      });
-      if (res.ok) {
-        const data = await res.json();
-        setTestimonials(data);
-      }
+      setTestimonials(await getAllTestimonials());
     } catch (err) {
       console.error("Failed to load testimonials:", err);
     } finally {
@@ -50,7 +45,7 @@ const ManageTestimonials = ({ onBack }) => {
     setEditingId(item.id);
     setFormData({
       patient_name: item.patient_name,
-      department: item.department,
+      department: item.department_name || '',
       testimonial_type: item.testimonial_type,
       review_text: item.review_text || '',
       video_url: item.video_url || '',
@@ -305,7 +300,7 @@ const ManageTestimonials = ({ onBack }) => {
                   <tr key={item.id} className="hover:bg-gray-50/70 transition-colors">
                     <td className="px-6 py-4">
                       <div className="font-bold text-gray-900">{item.patient_name}</div>
-                      <div className="text-xs text-blue-600 font-medium tracking-wide mt-0.5">{item.department}</div>
+                      <div className="text-xs text-blue-600 font-medium tracking-wide mt-0.5">{item.department_name}</div>
                     </td>
                     <td className="px-6 py-4">
                       {item.testimonial_type === 'video' ? (
@@ -0,0 +1,11 @@
+// initialData.js - payloads the server embeds in prerendered pages (see backend appointments/prerender.py)
+
+// The JSON the server inlined for this API path, or null when the page has none.
+export const readInitialData = (apiPath) => {
+  try {
+    const el = document.getElementById('initial-data');
+    return el ? JSON.parse(el.textContent)[apiPath] || null : null;
+  } catch {
+    return null;
+  }
+};